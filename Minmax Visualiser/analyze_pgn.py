@@ -0,0 +1,180 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from itertools import islice
+from multiprocessing import Pool
+
+# The analyzer runs without a window, and must not stream its searches to the web visualizer
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("CHESS_TREE_CAPTURE", "0")
+
+from game.game import Game
+from game.pgn import read_games, parse_san
+from game.moves import move_to_string
+from game.search_control import SearchLimits
+from players.computer_player_test import Computer, MATE_BOUND
+
+
+# Batch analysis of PGN files: every position of every game is searched, and one record per move is written as soon
+# as its game is done. Run it from this directory, like chess.py:
+#   python analyze_pgn.py games.pgn -o analysis.jsonl --depth 3 --workers 4
+
+FIELDS = ("game", "white", "black", "ply", "color", "move", "uci", "eval", "best_move", "eval_played", "cp_loss", "depth",
+          "nodes")
+
+# With a node budget, positions are searched up to this depth, or until the budget is used
+MAX_BUDGET_DEPTH = 8
+
+# Mate scores count as this many centipawns in a centipawn loss, so a missed mate costs about as much as a lost queen
+# instead of swamping its game's average with a loss of ~MATE_SCORE
+MATE_LOSS_SCORE = 1000
+
+# The engine of this worker process, whose transposition table is kept from game to game, and its search limits
+engine = None
+limits = None
+
+
+def start_worker(depth, nodes):
+  global engine, limits
+  engine = Computer("White", depth)
+  limits = SearchLimits(MAX_BUDGET_DEPTH, nodes=nodes) if nodes else SearchLimits(depth)
+
+
+def get_score(score):
+  return None if score is None else int(score)
+
+
+def get_loss_score(score):
+  if score > MATE_BOUND:
+    return MATE_LOSS_SCORE
+  if score < -MATE_BOUND:
+    return -MATE_LOSS_SCORE
+  return score
+
+
+def get_cp_loss(score, played_score, color):
+  """
+  The centipawns color's played move lost against the best move, or None if either score is unknown.
+  """
+  if get_score(score) is None or get_score(played_score) is None:
+    return None
+  sign = 1 if color == "White" else -1
+  return max(0, sign * (get_loss_score(score) - get_loss_score(played_score)))
+
+
+def analyze_position(game, color):
+  """
+  Searches the position with color to move. Returns (score from white's point of view, best move, depth, nodes).
+  """
+  engine.color = color
+  score, move, stats = engine.search(game.board, game, limits=limits)
+  # the played move is searched 1 ply less deep, so the position is searched at least 2 plies deep
+  if stats.completed_depth() < 2:
+    score, move, stats = engine.search(game.board, game, 2)
+  return score, move, stats.completed_depth(), stats.nodes
+
+
+def analyze_game(pgn_game):
+  """
+  Returns (game index, records, error) for one game; an illegal or unreadable move ends its analysis.
+  """
+  game = Game(None, "White", 0, limits.depth)
+  game.board.initiate_pieces()
+  game.computer = engine
+  board = game.board
+
+  records = []
+  color = "White"
+  score, best_move, depth, nodes = analyze_position(game, color)
+  for ply, san in enumerate(pgn_game.moves):
+    try:
+      move = parse_san(engine, game, san, color)
+    except ValueError as error:
+      return pgn_game.index, records, f"ply {ply + 1}: {error}"
+
+    engine.simulate_move(board, game, move)
+    # the game's moves are never taken back, so they don't need to stay on the undo stack
+    board.undo_stack.ply = 0
+    next_color = "Black" if color == "White" else "White"
+
+    # The played move is scored at the depth its position was searched at: the position after it is searched 1 ply
+    # less deep, since a search 1 ply deeper ends on the other side's move and scores it differently
+    played_score = score
+    if move != best_move:
+      engine.color = next_color
+      played_score, _, stats = engine.search(board, game, depth - 1)
+      nodes += stats.nodes
+
+    cp_loss = get_cp_loss(score, played_score, color)
+    records.append({
+      "game": pgn_game.index,
+      "white": pgn_game.headers.get("White", "?"),
+      "black": pgn_game.headers.get("Black", "?"),
+      "ply": ply + 1,
+      "color": color,
+      "move": san,
+      "uci": move_to_string(move),
+      "eval": get_score(score),
+      "best_move": move_to_string(best_move) if best_move is not None else None,
+      "eval_played": get_score(played_score),
+      "cp_loss": cp_loss,
+      "depth": depth,
+      "nodes": nodes,
+    })
+    color = next_color
+    # the position after the last move has no played move to score
+    if ply + 1 < len(pgn_game.moves):
+      score, best_move, depth, nodes = analyze_position(game, color)
+
+  return pgn_game.index, records, None
+
+
+def summarize(records, color):
+  losses = [record["cp_loss"] for record in records if record["color"] == color and record["cp_loss"] is not None]
+  return round(sum(losses) / len(losses)) if losses else "-"
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Analyze every position of the games in a PGN file with the engine.")
+  parser.add_argument("pgn", help="the PGN file")
+  parser.add_argument("-o", "--output", default="analysis.jsonl", help="a .jsonl or .csv file for the move records")
+  parser.add_argument("--depth", type=int, default=3, help="search depth per position")
+  parser.add_argument("--nodes", type=int, default=0,
+                      help=f"search each position until it used this many nodes (up to depth {MAX_BUDGET_DEPTH}), "
+                           "instead of to a fixed depth")
+  parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes analyzing games in parallel")
+  parser.add_argument("--max-games", type=int, default=0, help="only analyze the first games of the file")
+  args = parser.parse_args()
+  if args.depth < 2:
+    parser.error("--depth must be at least 2, so played moves can be searched 1 ply less deep")
+
+  games = read_games(args.pgn)
+  if args.max_games:
+    games = islice(games, args.max_games)
+
+  as_csv = args.output.endswith(".csv")
+  with open(args.output, "w", newline="") as output, \
+       Pool(args.workers, initializer=start_worker, initargs=(args.depth, args.nodes)) as pool:
+    writer = csv.DictWriter(output, FIELDS) if as_csv else None
+    if writer:
+      writer.writeheader()
+
+    # games are written in the order they finish
+    for index, records, error in pool.imap_unordered(analyze_game, games):
+      for record in records:
+        if writer:
+          writer.writerow(record)
+        else:
+          output.write(json.dumps(record) + "\n")
+      output.flush()
+
+      status = error or (f"average centipawn loss: white {summarize(records, 'White')}, "
+                         f"black {summarize(records, 'Black')}")
+      print(f"game {index}: {len(records)} moves analyzed, {status}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+  main()
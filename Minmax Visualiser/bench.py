@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+# The benchmark runs without a window, and must not stream its searches to the web visualizer or find its positions
+# in a position store
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("CHESS_TREE_CAPTURE", "0")
+os.environ.pop("CHESS_POSITION_STORE", None)
+
+from game.game import Game
+from game.fen import load_fen
+from players.computer_player_test import Computer, FRONTIER_EVAL_ENABLED
+
+
+# Searches a fixed set of positions to a fixed depth. The total node count is a signature of the search: it only
+# changes when the search itself changes, while nps and time tell how fast it got there. Every run is compared with
+# BASELINE_PATH, the committed results at the default depth. After a change that is meant to change the search (or to
+# compare nps on another machine), regenerate it from this directory with:
+#   python bench.py --save-baseline bench_baseline.json
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+BENCH_POSITIONS = (
+  "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+  "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10",
+  "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 11",
+  "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+  "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+  "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+  "r3k2r/2pb1ppp/2pp1q2/p7/1nP1B3/1P2P3/P2N1PPP/R2QK2R w KQkq a6 0 14",
+  "4rrk1/2p1b1p1/p1p3q1/4p3/2P2n1p/1P1NR2P/PB3PP1/3R1QK1 b - - 2 24",
+  "r3qbrk/6p1/2b2pPp/p3pP1Q/PpPpP2P/3P1B2/2PB3K/R5R1 w - - 16 42",
+  "6k1/1R3p2/6p1/2Bp3p/3P2q1/P7/1P2rQ1K/5R2 b - - 4 44",
+  "8/8/1p2k1p1/3p3p/1p1P1P1P/1P2PK2/8/8 w - - 3 54",
+  "7r/2p3k1/1p1p1qp1/1P1Bp3/p1P2r1P/P7/4R3/Q4RK1 w - - 0 36",
+  "r1bq1rk1/pp2b1pp/n1pp1n2/3P1p2/2P1p3/2N1P2N/PP2BPPP/R1BQ1RK1 b - - 2 10",
+  "3r3k/2r4p/1p1b3q/p4P2/P2Pp3/1B2P3/3BQ1RP/6K1 w - - 3 87",
+  "2r4r/1p4k1/1Pnp4/3Qb1pq/8/4BpPp/5P2/2RR1BK1 w - - 0 42",
+  "4q1bk/6b1/7p/p1p4p/PNPpP2P/KN4P1/3Q4/4R3 b - - 0 37",
+  "2q3r1/1r2pk2/pp3pp1/2pP3p/P1Pb1BbP/1P4Q1/R3NPP1/4R1K1 w - - 2 34",
+  "1r2r2k/1b4q1/pp5p/2pPp1p1/P3Pn2/1P1B1Q1P/2R3P1/4BR1K b - - 1 37",
+  "r3kbbr/pp1n1p1P/3ppnp1/q5N1/1P1pP3/P1N1B3/2P1QP2/R3KB1R b KQq b3 0 17",
+  "8/6pk/2b1Rp2/3r4/1R1B2PP/P5K1/8/2r5 b - - 16 42",
+  "1r4k1/4ppb1/2n1b1qp/pB4p1/1n1BP1P1/7P/2PNQPK1/3RN3 w - - 8 29",
+  "8/p2B4/PkP5/4p1pK/4Pb1p/5P2/8/8 w - - 29 68",
+  "3r4/ppq1ppkp/4bnp1/2pN4/2P1P3/1P4P1/PQ3PBP/R4K2 b - - 2 20",
+  "5rr1/4n2k/4q2P/P1P2n2/3B1p2/4pP2/2N1P3/1RR1K2Q w - - 1 49",
+  "1r5k/2pq2p1/3p3p/p1pP4/4QP2/PP1R3P/6PK/8 w - - 1 51",
+  "q5k1/5ppp/1r3bn1/1B6/P1N2P2/BQ2P1P1/5K1P/8 b - - 2 34",
+  "r1bqk2r/pppp1ppp/5n2/4b3/4P3/P1N5/1PP2PPP/R1BQKB1R w KQkq - 0 5",
+  "r1bqr1k1/pp1p1ppp/2p5/8/3N1Q2/P2BB3/1PP2PPP/R3K2R b KQ - 0 12",
+  "r7/6k1/1p6/2pp1p2/7Q/8/p1P2K1P/8 w - - 0 32",
+  "8/4pk2/1p1r2p1/p1p4p/Pn5P/3R4/1P3PP1/4RK2 w - - 1 33",
+)
+
+
+def bench_position(fen, depth):
+  """
+  Searches one position with a new engine, so every position starts with empty tables and the node count doesn't
+  depend on the positions before it.
+  """
+  game = Game(None, "White", 0, depth)
+  color = load_fen(game, fen)
+  engine = Computer(color, depth)
+  game.computer = engine
+
+  start = perf_counter()
+  _, move, stats = engine.search(game.board, game, depth)
+  elapsed = perf_counter() - start
+
+  # the time to reach every depth of the iterative deepening
+  time_to_depth, total_ms = [], 0
+  for iteration in stats.iterations:
+    total_ms += iteration["time_ms"]
+    time_to_depth.append(round(total_ms, 2))
+
+  return {
+    "fen": fen,
+    "best_move": engine.format_move(move),
+    "nodes": stats.nodes,
+    "time_ms": round(elapsed * 1000, 2),
+    "nps": int(stats.nodes / elapsed) if elapsed > 0 else 0,
+    "time_to_depth_ms": time_to_depth,
+    "tt_hit_rate": round(stats.tt_hit_rate(), 4),
+    "eval_cache_hit_rate": round(stats.eval_cache_hit_rate(), 4),
+  }
+
+
+def run_bench(depth):
+  positions = []
+  for index, fen in enumerate(BENCH_POSITIONS):
+    result = bench_position(fen, depth)
+    positions.append(result)
+    print(f"position {index + 1}/{len(BENCH_POSITIONS)}: {result['nodes']} nodes, {result['nps']} nps", file=sys.stderr)
+
+  nodes = sum(result["nodes"] for result in positions)
+  time_ms = sum(result["time_ms"] for result in positions)
+  return {
+    "depth": depth,
+    # the frontier evaluation doesn't count the children it skips, so it has its own node signature
+    "frontier_eval": FRONTIER_EVAL_ENABLED,
+    "positions": positions,
+    "nodes": nodes,
+    "time_ms": round(time_ms, 2),
+    "nps": int(nodes / (time_ms / 1000)) if time_ms > 0 else 0,
+    "tt_hit_rate": round(sum(result["tt_hit_rate"] for result in positions) / len(positions), 4),
+  }
+
+
+def compare(results, baseline, max_slowdown):
+  """
+  Returns the regressions of results against a baseline: a different node signature, or nps lower than the baseline
+  by more than max_slowdown (a fraction).
+  """
+  regressions = []
+  if results["depth"] != baseline["depth"]:
+    return [f"baseline was searched to depth {baseline['depth']}, not {results['depth']}"]
+  if results["frontier_eval"] != baseline.get("frontier_eval", False):
+    state = "on" if baseline.get("frontier_eval", False) else "off"
+    return [f"baseline was searched with the frontier evaluation {state} (see CHESS_FRONTIER_EVAL in the README)"]
+
+  if results["nodes"] != baseline["nodes"]:
+    regressions.append(f"node signature changed: {baseline['nodes']} -> {results['nodes']}")
+    for result, base in zip(results["positions"], baseline["positions"]):
+      if result["nodes"] != base["nodes"] or result["best_move"] != base["best_move"]:
+        regressions.append(f"  {result['fen']}: {base['nodes']} -> {result['nodes']} nodes, "
+                           f"{base['best_move']} -> {result['best_move']}")
+
+  if results["nps"] < baseline["nps"] * (1 - max_slowdown):
+    regressions.append(f"nps dropped by more than {max_slowdown:.0%}: {baseline['nps']} -> {results['nps']}")
+  return regressions
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Search a fixed set of positions and report the engine's performance.")
+  parser.add_argument("--depth", type=int, default=4, help="search depth of every position")
+  parser.add_argument("--output", help="also write the results as JSON to this file")
+  parser.add_argument("--baseline", default=BASELINE_PATH,
+                      help="compare with the results in this JSON file (default: the committed bench_baseline.json)")
+  parser.add_argument("--no-baseline", action="store_true", help="don't compare with a baseline")
+  parser.add_argument("--save-baseline", help="write the results to this JSON file as the new baseline")
+  parser.add_argument("--max-slowdown", type=float, default=0.1,
+                      help="the fraction nps may drop below the baseline's before it counts as a regression")
+  parser.add_argument("--allow-node-changes", action="store_true",
+                      help="don't count a changed node signature as a regression (for changes to the search)")
+  args = parser.parse_args()
+
+  results = run_bench(args.depth)
+  print(json.dumps({key: value for key, value in results.items() if key != "positions"}, indent=2))
+  for path in filter(None, (args.output, args.save_baseline)):
+    with open(path, "w") as f:
+      json.dump(results, f, indent=2)
+
+  if args.baseline and not args.no_baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    # the committed baseline is only searched to the default depth
+    if args.baseline == BASELINE_PATH and baseline["depth"] != args.depth:
+      print(f"Not compared with {args.baseline}, which was searched to depth {baseline['depth']}", file=sys.stderr)
+      return
+    regressions = compare(results, baseline, args.max_slowdown)
+    if args.allow_node_changes:
+      regressions = [regression for regression in regressions if not regression.startswith(("node", "  "))]
+    if regressions:
+      print("\n".join(["Regressions against " + args.baseline] + regressions), file=sys.stderr)
+      sys.exit(1)
+    print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+  main()
@@ -3,6 +3,9 @@ from PIL import Image, ImageTk
 import pygame
 from game.constants import width, height, square_size, themes
 from game.game import Game
+from game.search_control import DIFFICULTY_LEVELS
+from game.assets import get_asset_path
+from game.render_cache import get_font
 import threading
 
 
@@ -60,8 +63,8 @@ class SinglePlayer(object):
     self.root.configure(background="#DEB887")  # Light brown
     self.root.title = "Single Player Chess"
     position_window(self.root)
-    self.white_king_image = ImageTk.PhotoImage(Image.open("pieces/assets/White_King.png"))
-    self.black_king_image = ImageTk.PhotoImage(Image.open("pieces/assets/Black_King.png"))
+    self.white_king_image = ImageTk.PhotoImage(Image.open(get_asset_path("White_King.png")))
+    self.black_king_image = ImageTk.PhotoImage(Image.open(get_asset_path("Black_King.png")))
     self.difficulty = tk.StringVar(self.root)
     self.color = ""
     self.create_window()
@@ -71,8 +74,7 @@ class SinglePlayer(object):
     main_menu = tk.Button(self.root, text="Main Menu", command=self.main_menu, bg="#8B4513", fg="white")
     main_menu.place(x=150, y=20, height=40, width=100)
 
-    difficulties = [("Easy", "(Depth-2)"), ("Medium", "(Depth-3)"), ("Hard", "(Depth-4)"),
-                    ("Veteran", "(Depth-5)"), ("Expert", "(Depth-6)")]
+    difficulties = [(name, f"({limits.soft_time}s)") for name, limits in DIFFICULTY_LEVELS.items()]
     difficulty_selection = tk.OptionMenu(self.root, self.difficulty, *difficulties)
     difficulty_selection.place(x=130, y=140, height=32, width=140)
 
@@ -113,25 +115,11 @@ class SinglePlayer(object):
     if self.color != "" and self.difficulty != "PY_VAR0":
       difficulty = self.difficulty.get()
 
-      if "Easy" in difficulty:
-        single_player_game(self.color, 0, 2)
-        self.root.destroy()
-
-      elif "Medium" in difficulty:
-        single_player_game(self.color, 0, 3)
-        self.root.destroy()
-
-      elif "Hard" in difficulty:
-        single_player_game(self.color, 0, 4)
-        self.root.destroy()
-
-      elif "Veteran" in difficulty:
-        single_player_game(self.color, 0, 5)
-        self.root.destroy()
-
-      elif "Expert" in difficulty:
-        single_player_game(self.color, 0, 6)
-        self.root.destroy()
+      for level in DIFFICULTY_LEVELS:
+        if level in difficulty:
+          single_player_game(self.color, 0, level)
+          self.root.destroy()
+          break
 
 
 class Multiplayer(object):
@@ -159,8 +147,6 @@ class Multiplayer(object):
     self.root.destroy()
 
 
-pygame.font.init()
-my_font = pygame.font.SysFont("calibri", 15)
 letters = ["a", "b", "c", "d", "e", "f", "g", "h"]
 
 
@@ -185,6 +171,10 @@ def multiplayer_game(color, theme):
       if event.type == pygame.QUIT:
         running = False
 
+      # The window was uncovered, draw all of it again
+      if event.type == pygame.VIDEOEXPOSE:
+        chess_game.invalidate_screen()
+
       if event.type == pygame.MOUSEBUTTONDOWN:
         mouse_xy = pygame.mouse.get_pos()
         row, col = calc_mouse_pos(mouse_xy)
@@ -207,40 +197,54 @@ def multiplayer_game(color, theme):
   pygame.quit()
 
 
-def single_player_game(color, theme, depth):
+def single_player_game(color, theme, difficulty):
+  limits = DIFFICULTY_LEVELS[difficulty]
   pygame.init()
   game_window = pygame.display.set_mode((width, height))
-  pygame.display.set_caption(f"Chess Minimax Visualizer - (AI Depth - {depth})")
-  chess_game = Game(game_window, color, 0, depth)  # Pass depth here
+  pygame.display.set_caption(f"Chess Minimax Visualizer - (AI {difficulty} - Depth {limits.depth})")
+  chess_game = Game(game_window, color, 0, limits.depth)
+  # The difficulty's node and time budgets keep the AI's answers about equally quick in every position
+  chess_game.computer.limits = limits
   chess_game.board.initiate_pieces()
   fps = 60
   clock = pygame.time.Clock()
   running = True
   ai_thinking = False
-  
-  # Function to handle AI move generation in a separate thread
-  def multithread_minimax():
-    nonlocal ai_thinking  # Access the ai_thinking flag
-    _, move = chess_game.computer.minimax(chess_game.board, chess_game, depth,
-                                          float("-inf"), float("inf"), chess_game.computer.color)
-    chess_game.computer.computer_move(chess_game, move)
-    ai_thinking = False  # Reset the flag once AI has made its move
-          
+  ai_results = []
+  ai_threads = []
+
+  # Function to handle AI move generation in a separate thread, on a private copy of the game
+  def multithread_minimax(search_game):
+    _, move, _ = chess_game.computer.search(search_game.board, search_game)
+    ai_results.append(move)  # Played by the main loop, so the game in the window only changes on the main thread
+
+  # A search still running when the game ends (a resignation too) or the window is closed is stopped and waited for,
+  # so it never outlives its game
+  def stop_minimax():
+    for thread in ai_threads:
+      chess_game.computer.control.stop()
+      thread.join()
+    ai_threads.clear()
+
   while running:
     clock.tick(fps)
     for event in pygame.event.get():      
       if event.type == pygame.QUIT:
         running = False
 
+      # The window was uncovered, draw all of it again
+      if event.type == pygame.VIDEOEXPOSE:
+        chess_game.invalidate_screen()
+
       if event.type == pygame.MOUSEBUTTONDOWN:
         mouse_xy = pygame.mouse.get_pos()
         row, col = calc_mouse_pos(mouse_xy)
         if chess_game.game_over():
           if 1 <= row <= 3 and 3 <= col <= 4:
             if color == "White":
-              single_player_game("Black", chess_game.theme, depth)
+              single_player_game("Black", chess_game.theme, difficulty)
             else:
-              single_player_game("White", chess_game.theme, depth)
+              single_player_game("White", chess_game.theme, difficulty)
           elif 4 <= row <= 5 and 3 <= col <= 4:
             running = False
         else:
@@ -249,21 +253,45 @@ def single_player_game(color, theme, depth):
     if chess_game.turn == chess_game.computer.color and not chess_game.human.promoting and not chess_game.game_over():
       if not ai_thinking: 
         ai_thinking = True
-        threading.Thread(target=multithread_minimax).start()
+        ai_threads.append(threading.Thread(target=multithread_minimax, args=(chess_game.clone(),)))
+        ai_threads[-1].start()
+
+    # Play the AI's move once its search is done (unless the game ended meanwhile)
+    if ai_results:
+      move = ai_results.pop()
+      ai_thinking = False
+      if move is not None and not chess_game.game_over():
+        chess_game.computer.computer_move(chess_game, move)
+      # the search finds no legal move when the AI is checkmated or stalemated
+      elif move is None and not chess_game.game_over():
+        computer = chess_game.computer
+        if computer.is_in_check(chess_game.board, computer.color):
+          chess_game.checkmate_win = True
+        else:
+          chess_game.stalemate_draw = True
 
-    # If AI is thinking, freeze the screen
-    if ai_thinking:
-      continue
-    
     if chess_game.game_over():
+      stop_minimax()
       draw_end_screen(chess_game, game_window)
+    # While the AI is thinking, the window keeps running and can play back the positions it is considering
+    elif ai_thinking and chess_game.board.show_AI_calculations:
+      chess_game.draw_search_snapshot()
     else:
+      chess_game.shown_snapshot = None
       chess_game.update_screen(chess_game.human.valid_moves, chess_game.board)
 
+  stop_minimax()
   pygame.quit()
 
 
 def draw_end_screen(chess_game, game_window):
+  # The end screen never changes, so it is drawn once over the final position
+  if chess_game.end_screen_drawn:
+    return
+  chess_game.update_screen(chess_game.human.valid_moves, chess_game.board)
+  chess_game.end_screen_drawn = True
+  my_font = get_font("calibri", 15)
+
   if chess_game.checkmate_win:
     if chess_game.turn == "White":
       main_text = my_font.render("Black won by checkmate.", True, [0, 0, 0])
@@ -0,0 +1,24 @@
+import os
+import pygame
+
+
+# The piece images, found from this file so the program runs from any working directory
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pieces", "assets")
+
+# Piece images by (type, color), loaded the first time a piece is drawn
+piece_images = {}
+
+
+def get_asset_path(name):
+  return os.path.join(ASSETS_DIR, name)
+
+
+def get_piece_image(piece_type, color):
+  """
+  The image of a piece type ("Pawn" ... "King") of a color. Nothing is loaded before the first call, so the engine
+  and the command line tools never load images.
+  """
+  image = piece_images.get((piece_type, color))
+  if image is None:
+    image = piece_images[(piece_type, color)] = pygame.image.load(get_asset_path(f"{color}_{piece_type}.png"))
+  return image
@@ -0,0 +1,164 @@
+from pieces.pawn import Pawn
+
+
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+SLIDER_DIRECTIONS = {
+  "Rook": ROOK_DIRECTIONS,
+  "Bishop": BISHOP_DIRECTIONS,
+  "Queen": ROOK_DIRECTIONS + BISHOP_DIRECTIONS,
+}
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def is_square_attacked(squares, row, col, color):
+  """
+  Whether a piece of color attacks the square, looking outwards from the square instead of generating moves, which
+  is cheap enough for the search to test its king after every move.
+  """
+  for row_offset, col_offset in KNIGHT_OFFSETS:
+    attacker_row, attacker_col = row + row_offset, col + col_offset
+    if 0 <= attacker_row < 8 and 0 <= attacker_col < 8:
+      piece = squares[attacker_row][attacker_col]
+      if piece and piece.color == color and piece.type == "Knight":
+        return True
+
+  for row_offset, col_offset in KING_OFFSETS:
+    attacker_row, attacker_col = row + row_offset, col + col_offset
+    if 0 <= attacker_row < 8 and 0 <= attacker_col < 8:
+      piece = squares[attacker_row][attacker_col]
+      if piece and piece.color == color:
+        if piece.type == "King":
+          return True
+        # a pawn attacks the squares diagonally ahead of it, so it stands diagonally behind the square
+        if piece.type == "Pawn" and col_offset and row_offset == (1 if piece.direction == "Up" else -1):
+          return True
+
+  for slider, directions in (("Rook", ROOK_DIRECTIONS), ("Bishop", BISHOP_DIRECTIONS)):
+    for row_step, col_step in directions:
+      attacker_row, attacker_col = row + row_step, col + col_step
+      while 0 <= attacker_row < 8 and 0 <= attacker_col < 8:
+        piece = squares[attacker_row][attacker_col]
+        if piece:
+          if piece.color == color and (piece.type == slider or piece.type == "Queen"):
+            return True
+          break
+        attacker_row, attacker_col = attacker_row + row_step, attacker_col + col_step
+  return False
+
+
+class AttackMap(object):
+  """
+  Keeps every piece's valid_moves up to date, and which pieces can move to (attack) each square.
+
+  Every piece registers the squares its moves depend on: a slider's rays up to and including the first blocker,
+  a knight's or king's targets (plus the king's rank, for castling), a pawn's squares ahead, beside and diagonally
+  ahead. update compares the board with the squares it saw last time and only regenerates the moves of the pieces
+  on changed squares and of the pieces depending on them. Kings (whose castling depends on being in check) and
+  pawns that can capture en passant (which expires after a move anywhere) are regenerated on every update, and all
+  pawns whenever the board's en passant square changed.
+  """
+  def __init__(self):
+    self.squares = [0] * 64
+    self.dependents = [set() for _ in range(64)]
+    self.targets = [set() for _ in range(64)]
+    self.registered = {}
+    self.volatile = set()
+    self.en_passant_target = None
+
+  def update(self, board):
+    squares = board.board
+    en_passant_target = board.en_passant_target
+    stale = set(self.volatile)
+
+    # pawns are generated again whenever the en passant square changed
+    if en_passant_target != self.en_passant_target:
+      self.en_passant_target = en_passant_target
+      stale.update(piece for piece in self.registered if piece.type == "Pawn")
+
+    for index in range(64):
+      piece = squares[index >> 3][index & 7]
+      seen = self.squares[index]
+      if piece is not seen:
+        if seen:
+          stale.add(seen)
+        if piece:
+          stale.add(piece)
+        stale.update(self.dependents[index])
+        self.squares[index] = piece
+
+    for piece in stale:
+      self.forget(piece)
+      # pieces that were captured are only forgotten
+      if self.squares[piece.row * 8 + piece.col] is piece:
+        self.refresh(piece, squares, en_passant_target)
+
+  def forget(self, piece):
+    dependencies, targets = self.registered.pop(piece, ((), ()))
+    for index in dependencies:
+      self.dependents[index].discard(piece)
+    for index in targets:
+      self.targets[index].discard(piece)
+    self.volatile.discard(piece)
+
+  def refresh(self, piece, squares, en_passant_target):
+    if isinstance(piece, Pawn):
+      piece.update_valid_moves(squares, en_passant_target)
+      # a diagonal move to an empty square is an en passant capture, which is only possible for one move
+      if any(col != piece.col and squares[row][col] == 0 for row, col in piece.valid_moves):
+        self.volatile.add(piece)
+    else:
+      piece.update_valid_moves(squares)
+      if piece.type == "King":
+        self.volatile.add(piece)
+
+    dependencies = self.get_dependencies(piece, squares)
+    targets = [row * 8 + col for row, col in piece.valid_moves]
+    self.registered[piece] = (dependencies, targets)
+    for index in dependencies:
+      self.dependents[index].add(piece)
+    for index in targets:
+      self.targets[index].add(piece)
+
+  def get_dependencies(self, piece, squares):
+    """
+    The squares whose contents can change the moves of piece.
+    """
+    row, col = piece.row, piece.col
+    dependencies = []
+
+    if piece.type in SLIDER_DIRECTIONS:
+      for row_step, col_step in SLIDER_DIRECTIONS[piece.type]:
+        next_row, next_col = row + row_step, col + col_step
+        while 0 <= next_row < 8 and 0 <= next_col < 8:
+          dependencies.append(next_row * 8 + next_col)
+          if squares[next_row][next_col] != 0:
+            break
+          next_row, next_col = next_row + row_step, next_col + col_step
+      return dependencies
+
+    if piece.type == "Pawn":
+      step = -1 if piece.direction == "Up" else 1
+      offsets = ((step, -1), (step, 0), (step, 1), (2 * step, 0), (0, -1), (0, 1))
+    elif piece.type == "Knight":
+      offsets = KNIGHT_OFFSETS
+    else:
+      offsets = KING_OFFSETS
+      # castling depends on every square of the king's rank
+      dependencies.extend(row * 8 + other_col for other_col in range(8) if other_col != col)
+
+    for row_offset, col_offset in offsets:
+      if 0 <= row + row_offset < 8 and 0 <= col + col_offset < 8:
+        dependencies.append((row + row_offset) * 8 + col + col_offset)
+    return dependencies
+
+  def is_attacked(self, row, col, color):
+    """
+    Whether a piece of color can move to the square.
+    """
+    return any(piece.color == color for piece in self.targets[row * 8 + col])
+
+  def get_attacked_squares(self, color):
+    return [(index >> 3, index & 7) for index in range(64)
+            if any(piece.color == color for piece in self.targets[index])]
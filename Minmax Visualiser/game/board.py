@@ -1,24 +1,28 @@
+import copy
 import pygame
 from game.constants import square_size, num_rows, num_cols, light_gray, themes
-from pieces.pawn import Pawn, pawns
-from pieces.knight import Knight, knights
-from pieces.bishop import Bishop, bishops
-from pieces.rook import Rook, rooks
-from pieces.queen import Queen, queens
-from pieces.king import King, kings
+from pieces.pawn import Pawn
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.rook import Rook
+from pieces.queen import Queen
+from pieces.king import King
 from game.material import Material
+from game.undo_stack import UndoStack
+from game.piece_list import PieceList
+from game.render_cache import get_board_background, get_font, render_text, fit_text
+from game.moves import move_to_string
+from game.assets import get_piece_image
 
-pygame.font.init()
 
+# Principal variations listed in the AI stats
+MAX_SHOWN_LINES = 5
 
-PIECE_IMAGES = {
-    "Pawn": (pawns[0], pawns[1]),
-    "Knight": (knights[0], knights[1]),
-    "Bishop": (bishops[0], bishops[1]),
-    "Rook": (rooks[0], rooks[1]),
-    "Queen": (queens[0], queens[1]),
-    "King": (kings[0], kings[1])
-}
+# The AI stats are listed in the side panel from STATS_TOP down, and must end above the captured pieces drawn for the
+# player's side (see Material.draw_captured). Lines wider than STATS_WIDTH are cut short.
+STATS_TOP = 245
+STATS_BOTTOM = {"White": 405, "Black": 372}
+STATS_WIDTH = 215
 
 
 class Board(object):
@@ -29,13 +33,15 @@ class Board(object):
     self.show_valid_moves = True
     self.show_AI_calculations = False
     self.AI_speed = "Fast"
-    self.stored_moves = []
+    self.undo_stack = UndoStack()
+    self.pieces = {"White": PieceList(), "Black": PieceList()}
     self.previous_move = None
-    self.prev_square = None
-    self.piece = None
-    self.target = None
+    # The square a pawn skipped with its last move, where it can be captured en passant (row, col), or None
+    self.en_passant_target = None
     self.captured_piece = 0
     self.hash = None
+    # The hash of the pawns and kings only, which keys the engine's pawn structure cache
+    self.pawn_hash = None
     self.board = [
         [0, 0, 0, 0, 0, 0, 0, 0],
         [0, 0, 0, 0, 0, 0, 0, 0],
@@ -51,6 +57,22 @@ class Board(object):
     self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
     piece.move(row, col)
 
+  def clone(self):
+    """
+    An independent copy of the position (squares and pieces) for the engine to search on, so the UI can keep drawing
+    this board meanwhile. The settings are copied, and the material gets its own counts.
+    """
+    board = copy.copy(self)
+    board.material = self.material.clone()
+    board.board = [[copy.copy(piece) if piece else 0 for piece in row] for row in self.board]
+    for row in board.board:
+      for piece in row:
+        if piece:
+          piece.valid_moves = list(piece.valid_moves)
+    board.undo_stack = UndoStack()
+    board.update_piece_lists()
+    return board
+
   def get_piece(self, row, col):
     return self.board[row][col]
 
@@ -105,47 +127,70 @@ class Board(object):
       ]
 
     for piece in pieces:
-      self.board[piece.row][piece.col] = piece
+      self.add_piece(piece)
+
+  def add_piece(self, piece):
+    self.board[piece.row][piece.col] = piece
+    self.pieces[piece.color].add(piece)
+    self.material.add(piece)
+
+  def remove_piece(self, piece):
+    self.board[piece.row][piece.col] = 0
+    self.pieces[piece.color].remove(piece)
+    self.material.remove(piece)
+
+  def restore_piece(self, piece):
+    """
+    Puts back the piece taken off by the latest remove_piece, on its square and at its place in the piece list.
+    """
+    self.board[piece.row][piece.col] = piece
+    self.pieces[piece.color].restore(piece)
+    self.material.add(piece)
+
+  def update_piece_lists(self):
+    """
+    Rebuilds the piece lists and material counts from the squares, for boards whose squares were filled directly.
+    """
+    self.pieces = {"White": PieceList(), "Black": PieceList()}
+    self.material.reset_counts()
+    for row in self.board:
+      for piece in row:
+        if piece:
+          self.pieces[piece.color].add(piece)
+          self.material.add(piece)
 
   def create_board(self, window, theme):
-    my_font = pygame.font.SysFont("calibri", 15)
-    letters = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    window.blit(get_board_background(theme), (0, 0))
 
-    # Draw squares and background
-    window.fill(theme[0])
-    for row in range(num_rows):
-      for col in range(num_cols):
-        if (row + col) % 2 == 0:
-          pygame.draw.rect(
-            window, theme[1], (row * square_size, col * square_size, square_size, square_size))
+  def draw_square(self, window, theme, row, col, piece, previous_move, valid_move):
+    """
+    Redraws a single square from the cached board background, with its highlights and piece, and returns its rect.
+    """
+    rect = (col * square_size, row * square_size, square_size, square_size)
+    window.blit(get_board_background(theme), rect[:2], rect)
 
-    # Draw board letters and numbers
-    for i in range(0, 8):
-      text = my_font.render(letters[i], True, (0, 0, 0))
-      window.blit(text, (square_size * i + 2,
-                  square_size * 7 + square_size - 20))
+    if previous_move:
+      self.draw_move_square(col, row, [21, 35, 230], window)
+    if valid_move:
+      self.draw_move_square(col, row, [128, 5, 242], window)
 
-      text = my_font.render(str(8 - i), True, (0, 0, 0))
-      window.blit(text, (square_size * 0 + 2, square_size * i + 5))
+    # Drawn at the square rather than at piece.row and piece.col, which the search may be changing
+    if isinstance(piece, (Pawn, Knight, Bishop, Rook, Queen, King)):
+      window.blit(self.get_piece_image(piece), rect[:2])
+    return rect
 
-    # Draw move history
-    pygame.draw.rect(window, (255, 255, 255), (10, 490, 700, 140))
+  def get_piece_image(self, piece):
+    return get_piece_image(piece.type, piece.color)
 
   def draw(self, window, board):
     for row in board.board:
       for piece in row:
         if isinstance(piece, (Pawn, Knight, Bishop, Rook, Queen, King)):
-          piece_image = PIECE_IMAGES[type(piece).__name__]
-          image = piece_image[0] if piece.color == "White" else piece_image[1]
-          piece.draw(window, image)
+          piece.draw(window, self.get_piece_image(piece))
 
   def promotion_menu(self, color, window):
-    if color == "White":
-      self.draw_promotion_window(
-        queens[0], rooks[0], bishops[0], knights[0], window)
-    else:
-      self.draw_promotion_window(
-        queens[1], rooks[1], bishops[1], knights[1], window)
+    self.draw_promotion_window(*[get_piece_image(piece_type, color) for piece_type in ("Queen", "Rook", "Bishop", "Knight")],
+                               window)
 
   def draw_promotion_window(self, queen, rook, bishop, knight, window):
     for i, piece in enumerate([queen, rook, bishop, knight]):
@@ -155,16 +200,16 @@ class Board(object):
                           180 + i // 2 * square_size))
 
   def draw_game_buttons(self, window, theme, ai):
-      my_font = pygame.font.SysFont("calibri", 12)
+      my_font = get_font("calibri", 12)
       
       # Resign Button
-      new_game = my_font.render("Resign/Quit", True, (0, 0, 0))
+      new_game = render_text(my_font, "Resign/Quit")
       pygame.draw.rect(window, [0, 0, 0], (483, 138, 74, 39))
       pygame.draw.rect(window, [255, 255, 255], (485, 140, 70, 35))
       window.blit(new_game, (488, 150))
 
       # Visualize AI Button
-      show_thinking = my_font.render("Visualize AI", True, (0, 0, 0))
+      show_thinking = render_text(my_font, "Visualize AI")
       pygame.draw.rect(window, [0, 0, 0], (563, 138, 74, 39))
       if self.show_AI_calculations:
           pygame.draw.rect(window, theme[1], (565, 140, 70, 35))
@@ -173,7 +218,7 @@ class Board(object):
       window.blit(show_thinking, (568, 150))
 
       # Visualize AI Speed Button
-      speed = my_font.render(self.AI_speed, True, (0, 0, 0))
+      speed = render_text(my_font, self.AI_speed)
       pygame.draw.rect(window, [0, 0, 0], (563, 183, 74, 39))
       if self.show_AI_calculations:
           pygame.draw.rect(window, theme[1], (565, 185, 70, 35))
@@ -186,8 +231,8 @@ class Board(object):
           window.blit(speed, (588, 195))
 
       # Highlight Valid Moves
-      show_valid_moves1 = my_font.render("Highlight", True, (0, 0, 0))
-      show_valid_moves2 = my_font.render("Valid Moves", True, (0, 0, 0))
+      show_valid_moves1 = render_text(my_font, "Highlight")
+      show_valid_moves2 = render_text(my_font, "Valid Moves")
       pygame.draw.rect(window, [0, 0, 0], (643, 138, 74, 39))
       if self.show_valid_moves:
           pygame.draw.rect(window, theme[1], (645, 140, 70, 35))
@@ -205,14 +250,30 @@ class Board(object):
       
       # Display AI evaluation stats
       moves_evaluated_text = my_font.render(f"Moves Evaluated: {ai.moves_evaluated}", True, (0, 0, 0))
+      eval_cache_text = my_font.render(f"Eval Cache Hits: {ai.eval_cache.hits} / {ai.eval_cache.hits + ai.eval_cache.misses}",
+                                       True, (0, 0, 0))
       total_moves_found_text = my_font.render(f"Total Moves Found: {ai.total_moves_found}", True, (0, 0, 0))      
       pruned_percentage_text = my_font.render(f"% of Search Tree Pruned: {pruned_percentage}", True, (0, 0, 0))
       current_best_evaluation_text = my_font.render(f"Current Best Evaluation: {round(ai.current_best_evaluation / 100, 2)}", True, (0, 0, 0))
       
-      window.blit(moves_evaluated_text, (500, 250))
-      window.blit(total_moves_found_text, (500, 270))
-      window.blit(pruned_percentage_text, (500, 290))
-      window.blit(current_best_evaluation_text, (500, 310))
+      stats_texts = [moves_evaluated_text, eval_cache_text, total_moves_found_text, pruned_percentage_text,
+                     current_best_evaluation_text]
+      if ai.stats:
+        stats_texts.append(my_font.render(f"Search Depth: {ai.stats.depth}  NPS: {ai.stats.nps()}", True, (0, 0, 0)))
+        stats_texts.append(my_font.render(f"TT Hit Rate: {round(ai.stats.tt_hit_rate() * 100, 1)}%", True, (0, 0, 0)))
+
+      line_height = my_font.get_linesize()
+      y = STATS_TOP
+      for text in stats_texts:
+        window.blit(text, (500, y))
+        y += line_height
+
+      # The best lines found so far (more than one with Multi-PV), at most 4 moves each and as many as fit
+      shown_lines = min(MAX_SHOWN_LINES, max(0, (STATS_BOTTOM[self.player_color] - y) // line_height))
+      for i, (score, line) in enumerate(ai.principal_variations[:shown_lines]):
+        moves = " ".join(move_to_string(move) for move in line[:4])
+        line_text = render_text(my_font, fit_text(my_font, f"{i + 1}. {round(score / 100, 2):+} {moves}", STATS_WIDTH))
+        window.blit(line_text, (500, y + i * line_height))
 
   def draw_valid_moves(self, moves, window):
     for move in moves:
@@ -226,13 +287,15 @@ class Board(object):
         self.draw_move_square(col, row, [21, 35, 230], window)
 
   def draw_move_square(self, row, col, color, window):
-    pygame.draw.rect(window, color, (row * square_size, col *
-                     square_size, square_size + 1, square_size + 1), 2)
+    # Kept inside the square, so redrawing a neighbouring square doesn't cut the outline off
+    pygame.draw.rect(window, color, (row * square_size, col * square_size, square_size, square_size), 2)
 
   def get_all_pieces(self, color):
-    pieces = []
-    for row in self.board:
-      for piece in row:
-        if isinstance(piece, (Pawn, Knight, Bishop, Rook, Queen, King)) and piece.color == color:
-          pieces.append(piece)
-    return pieces
+    # The live piece list, so callers must not add or remove pieces while iterating it
+    return self.pieces[color].pieces
+
+  def get_king(self, color):
+    for piece in self.pieces[color]:
+      if isinstance(piece, King):
+        return piece
+    return None
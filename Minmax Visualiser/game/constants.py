@@ -1,5 +1,3 @@
-import pygame
-
 # The width and height of the window
 width, height = 720, 640
 
@@ -18,6 +16,10 @@ themes = [brown_theme]
 # Used for promotion menu
 light_gray = (230, 230, 230)
 
+# Game phase weights from https://www.chessprogramming.org/Tapered_Eval, 24 with all pieces on the board
+PHASE_WEIGHTS = {"Pawn": 0, "Knight": 1, "Bishop": 1, "Rook": 2, "Queen": 4, "King": 0}
+MAX_PHASE = 24
+
 # Remove background images and images list
 
 function_names = [
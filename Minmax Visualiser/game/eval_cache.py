@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+# Evaluations kept by the cache; the least recently used one is dropped beyond this
+EVAL_CACHE_MAX_ENTRIES = 1 << 16
+
+
+class EvalCache(object):
+  """
+  Evaluations keyed by a Zobrist hash, so positions reached again through transpositions (or by the next iteration of
+  iterative deepening) are not evaluated again. The engine keeps one for boards and one for pawn structures.
+
+  Entries are kept in least recently used order and the oldest is evicted once max_entries are stored, so the cache
+  stays the same size for the life of the Computer.
+  """
+  def __init__(self, max_entries=EVAL_CACHE_MAX_ENTRIES):
+    self.entries = OrderedDict()
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+
+  def __len__(self):
+    return len(self.entries)
+
+  def get(self, key):
+    """
+    Returns the cached evaluation for key, or None.
+    """
+    evaluation = self.entries.get(key)
+    if evaluation is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.entries.move_to_end(key)
+    return evaluation
+
+  def put(self, key, evaluation):
+    self.entries[key] = evaluation
+    if len(self.entries) > self.max_entries:
+      self.entries.popitem(last=False)
+
+  def hit_rate(self):
+    probes = self.hits + self.misses
+    return self.hits / probes if probes else 0.0
+
+  def reset_counters(self):
+    self.hits = 0
+    self.misses = 0
+
+  def clear(self):
+    self.entries.clear()
+    self.reset_counters()
@@ -0,0 +1,71 @@
+from pieces.pawn import Pawn
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.rook import Rook
+from pieces.queen import Queen
+from pieces.king import King
+
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+PIECE_TYPES = {"p": Pawn, "n": Knight, "b": Bishop, "r": Rook, "q": Queen, "k": King}
+FILES = "abcdefgh"
+
+# The rook square each castling right of a FEN belongs to, with white at the bottom (row 7)
+CASTLING_ROOKS = {"K": (7, 7), "Q": (7, 0), "k": (0, 7), "q": (0, 0)}
+
+
+def load_fen(game, fen):
+  """
+  Sets up the empty board of a game whose player is White (so white is at the bottom) from a FEN string, and returns
+  the color to move. Raises ValueError for a FEN it can't read.
+  """
+  fields = fen.split()
+  if len(fields) < 4:
+    raise ValueError(f"Not a FEN: {fen}")
+  placement, side, castling, en_passant = fields[:4]
+  board = game.board
+
+  ranks = placement.split("/")
+  if len(ranks) != 8:
+    raise ValueError(f"A FEN needs 8 ranks: {fen}")
+  for row, rank in enumerate(ranks):
+    col = 0
+    for char in rank:
+      if char.isdigit():
+        col += int(char)
+        continue
+      if char.lower() not in PIECE_TYPES or col > 7:
+        raise ValueError(f"Bad rank {rank} in FEN: {fen}")
+      color = "White" if char.isupper() else "Black"
+      piece_type = PIECE_TYPES[char.lower()]
+      if piece_type is Pawn:
+        piece = Pawn(row, col, color, "Up" if color == "White" else "Down")
+      else:
+        piece = piece_type(row, col, color)
+      board.add_piece(piece)
+      col += 1
+    if col != 8:
+      raise ValueError(f"Bad rank {rank} in FEN: {fen}")
+
+  # Kings and rooks start out able to castle, so only the ones the castling rights name keep it. Kings off their
+  # starting square never can, since King.get_valid_moves looks for the rooks 3 and 4 squares away.
+  for color, home_row in (("White", 7), ("Black", 0)):
+    king = board.get_king(color)
+    if king is None:
+      raise ValueError(f"No {color} king in FEN: {fen}")
+    king.can_castle = (king.row, king.col) == (home_row, 4) and \
+                      any(CASTLING_ROOKS[right][0] == home_row for right in castling if right in CASTLING_ROOKS)
+  for color in ("White", "Black"):
+    for piece in board.get_all_pieces(color):
+      if piece.type == "Rook":
+        piece.can_castle = any(CASTLING_ROOKS[right] == (piece.row, piece.col) and right.isupper() == (color == "White")
+                               for right in castling if right in CASTLING_ROOKS)
+
+  if en_passant != "-":
+    board.en_passant_target = (8 - int(en_passant[1]), FILES.index(en_passant[0]))
+
+  game.turn = "White" if side == "w" else "Black"
+  if len(fields) >= 6:
+    game.half_moves, game.full_moves = int(fields[4]), int(fields[5])
+  game.update_all_valid_moves()
+  return game.turn
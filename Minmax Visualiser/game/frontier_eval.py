@@ -0,0 +1,140 @@
+import importlib.util
+from game.constants import MAX_PHASE, PHASE_WEIGHTS
+from game.moves import KING_CASTLE, QUEEN_CASTLE, EP_CAPTURE, PROMOTION, PROMOTION_PIECES
+
+# NumPy is optional: without it the search evaluates every leaf on its own. It is only imported by a FrontierEvaluator,
+# so the engine starts without it.
+FRONTIER_EVAL_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+# Packed moves are 16 bit ints (see game/moves.py)
+MOVE_LIMIT = 1 << 16
+
+
+class FrontierEvaluator(object):
+  """
+  Evaluates all the children of a depth 1 node at once, with the same result as Computer.calculate_evaluation, without
+  making their moves.
+
+  Every piece type and color has a code, and the position is a list of 64 codes (EMPTY for an empty square). What a
+  move does to the evaluation only depends on the code of the piece it moves and the packed move itself, apart from
+  the piece it captures: the change of material and square tables (with a castling rook or a promotion), of the game
+  phase, of the pawn hash and of the king's square. Those are tables indexed by code * MOVE_LIMIT + move, made once, so
+  scoring the children is a few lookups in them and in per (code, square) tables for the captured pieces, over the
+  array of all the moves at once.
+  """
+  def __init__(self, piece_tables, king_endgame_tables, colors, zobrist_table):
+    import numpy
+    self.numpy = numpy
+    white, black = colors
+    self.codes = {}
+    for key in piece_tables:
+      self.codes[key] = len(self.codes)
+    self.empty = len(self.codes)
+    code_count = self.empty + 1
+    self.king_codes = (self.codes[(white, "King")], self.codes[(black, "King")])
+
+    # per (code, square): signed material plus square table (0 for the kings, whose table is tapered), phase weight
+    # and pawn hash key (see ZobristHashing.calculate_pawn_hash)
+    values = numpy.zeros((code_count, 64), dtype=numpy.int64)
+    phase_weights = numpy.zeros((code_count, 64), dtype=numpy.int64)
+    pawn_keys = numpy.zeros((code_count, 64), dtype=numpy.uint64)
+    rook_codes = numpy.full(code_count, self.empty)
+    promotion_codes = numpy.full((code_count, 4), self.empty)
+    for (color, piece_type), (material, table) in piece_tables.items():
+      code = self.codes[(color, piece_type)]
+      if piece_type != "King":
+        values[code] = [(1 if color == white else -1) * (material + value) for value in table]
+      phase_weights[code] = PHASE_WEIGHTS[piece_type]
+      if piece_type == "Pawn" or piece_type == "King":
+        pawn_keys[code] = [zobrist_table[(square >> 3, square & 7, piece_type, color)] for square in range(64)]
+      rook_codes[code] = self.codes[(color, "Rook")]
+      promotion_codes[code] = [self.codes[(color, promoted)] for promoted in PROMOTION_PIECES]
+    self.values = values.ravel()
+    self.capture_phase_weights = phase_weights.ravel()
+    self.capture_pawn_keys = pawn_keys.ravel()
+    self.squares = numpy.arange(64)
+
+    # every (code, move) at once; most of them aren't moves of the piece at all, but are never looked up
+    codes = numpy.arange(self.empty)[:, None]
+    moves = numpy.arange(MOVE_LIMIT)[None, :]
+    from_squares, to_squares, flags = moves & 63, (moves >> 6) & 63, moves >> 12
+    promoted = (flags & PROMOTION) != 0
+    added = numpy.where(promoted, promotion_codes[codes, flags & 3], codes)
+    kingside = flags == KING_CASTLE
+    rooks = numpy.where(kingside | (flags == QUEEN_CASTLE), rook_codes[codes], self.empty)
+    ranks = from_squares & 56
+    self.move_values = (values[added, to_squares] - values[codes, from_squares]
+                        + values[rooks, ranks | numpy.where(kingside, 5, 3)]
+                        - values[rooks, ranks | numpy.where(kingside, 7, 0)]).ravel().astype(numpy.int32)
+    self.move_phase_weights = numpy.where(promoted, phase_weights[added, 0] - phase_weights[codes, 0], 0).ravel().astype(numpy.int8)
+    self.move_pawn_keys = (pawn_keys[codes, from_squares] ^
+                           numpy.where(promoted, numpy.uint64(0), pawn_keys[codes, to_squares])).ravel()
+    # how far a king moves, in rows of king_values below
+    is_king = (codes == self.king_codes[0]) | (codes == self.king_codes[1])
+    self.king_moves = (numpy.where(is_king, to_squares - from_squares, 0) * (MAX_PHASE + 1)).ravel().astype(numpy.int16)
+    # en passant captures the pawn beside the moving pawn; every other move's target square is empty or captured
+    self.capture_squares = numpy.where(flags == EP_CAPTURE, ranks | (to_squares & 7), to_squares).ravel()
+
+    # the tapered king square table (see Computer.get_king_value) by square * (MAX_PHASE + 1) + phase
+    phases = numpy.arange(MAX_PHASE + 1)
+    self.king_values = []
+    for color in colors:
+      middlegame = numpy.array(piece_tables[(color, "King")][1], dtype=numpy.int64)[:, None]
+      endgame = numpy.array(king_endgame_tables[color], dtype=numpy.int64)[:, None]
+      self.king_values.append(((middlegame * phases + endgame * (MAX_PHASE - phases)) // MAX_PHASE).ravel())
+    # the kings' material cancels out, only their square tables remain
+    self.king_material = piece_tables[(white, "King")][0] - piece_tables[(black, "King")][0]
+
+  def get_position(self, board, colors):
+    """
+    The codes of the 64 squares of board.
+    """
+    codes = self.codes
+    position = [self.empty] * 64
+    for color in colors:
+      for piece in board.get_all_pieces(color):
+        position[piece.row * 8 + piece.col] = codes[(piece.color, piece.type)]
+    return position
+
+  def evaluate(self, position, moves, kings, phase_weight, pawn_hash, pawn_structure, pawn_cache, white_to_move):
+    """
+    Scores the children of position, the moves' parent, where kings are the white and black kings' squares. A child
+    whose pawn structure isn't in pawn_cache is scored with pawn_structure, its parent's, and has a pending entry
+    (its pawn hash, its phase, pawn_structure) for Computer.resolve_frontier_score; the others' entry is None.
+    Returns (order, scores, pending): the children's positions in moves best first for the side to move, and the
+    others by child.
+    """
+    numpy = self.numpy
+    position = numpy.array(position)
+    moves = numpy.array(moves)
+    pieces = position[moves & 63]
+    indices = pieces * MOVE_LIMIT + moves
+    capture_squares = self.capture_squares[moves]
+    captures = position[capture_squares] * 64 + capture_squares
+
+    phases = numpy.minimum(phase_weight + self.move_phase_weights[indices] - self.capture_phase_weights[captures],
+                           MAX_PHASE)
+    side = 0 if white_to_move else 1
+    own_kings = self.king_values[side][kings[side] * (MAX_PHASE + 1) + self.king_moves[indices] + phases]
+    other_kings = self.king_values[1 - side][kings[1 - side] * (MAX_PHASE + 1) + phases]
+    structure, shield = pawn_structure
+    scores = (self.move_values[indices] - self.values[captures] + shield * phases // MAX_PHASE
+              + (own_kings - other_kings if white_to_move else other_kings - own_kings))
+    scores += self.values[position * 64 + self.squares].sum() + self.king_material + structure
+    scores = scores.tolist()
+
+    # Only the children whose pawn hash changed can have another pawn structure
+    pawn_hash = numpy.uint64(pawn_hash)
+    child_hashes = pawn_hash ^ self.move_pawn_keys[indices] ^ self.capture_pawn_keys[captures]
+    pending = [None] * len(scores)
+    changed = numpy.flatnonzero(child_hashes != pawn_hash)
+    for index, child_hash, phase in zip(changed.tolist(), child_hashes[changed].tolist(), phases[changed].tolist()):
+      child_structure = pawn_cache.get(child_hash)
+      if child_structure is None:
+        pending[index] = (child_hash, phase, pawn_structure)
+      else:
+        scores[index] += (child_structure[0] - structure + child_structure[1] * phase // MAX_PHASE
+                          - shield * phase // MAX_PHASE)
+
+    order = sorted(range(len(scores)), key=scores.__getitem__, reverse=white_to_move)
+    return order, scores, pending
@@ -1,3 +1,4 @@
+import copy
 import pygame
 from game.board import Board
 from pieces.pawn import Pawn
@@ -7,7 +8,9 @@ from pieces.rook import Rook
 from pieces.queen import Queen
 from pieces.king import King
 from game.move_history import MoveHistory
-from game.constants import themes
+from game.attack_map import AttackMap
+from game.constants import width, height, square_size, num_rows, num_cols, themes
+from game.render_cache import get_board_background
 from players.human_player import Human
 from players.computer_player_test import Computer
 
@@ -19,12 +22,15 @@ class Game(object):
     self.move_history = MoveHistory()
     self.human = Human(player_color, self)
     self.board = Board(player_color)
+    self.attack_map = AttackMap()
     self.computer = Computer("Black" if player_color == "White" else "White", depth)
     self.turn = "White"
-    self.en_passant_target = None
     self.half_moves = 0
     self.full_moves = 1
 
+    # The game shown in the window; a copy made by clone() still refers to it
+    self.live_game = self
+
     # Game Over Conditions
     self.checkmate_win = False
     self.stalemate_draw = False
@@ -33,43 +39,119 @@ class Game(object):
     self.insufficient_material_draw = False
     self.resign = False
 
+    # What is currently on the screen, so update_screen only redraws what changed
+    self.full_redraw = True
+    self.drawn_theme = None
+    self.square_signatures = [[None] * num_cols for _ in range(num_rows)]
+    self.panel_signature = None
+    self.move_log_signature = None
+    self.end_screen_drawn = False
+    self.shown_snapshot = None
+
   def game_over(self):
     return any([self.checkmate_win, self.stalemate_draw, self.threefold_draw,
                 self.no_captures_50, self.insufficient_material_draw, self.resign])
 
-  def update_screen(self, valid_moves, board):
-    # Draw Board
-    self.board.create_board(self.window, themes[self.theme])
-
-    # Draw Previous Move
-    self.board.draw_previous_move(self.window)
+  def clone(self):
+    """
+    A copy of the game for the engine to search on while the window keeps running: the board and move log are
+    private copies, the players, window and settings are shared.
+    """
+    game = copy.copy(self)
+    game.board = self.board.clone()
+    game.attack_map = AttackMap()
+    game.move_history = copy.copy(self.move_history)
+    game.move_history.move_log = list(self.move_history.move_log)
+    return game
 
-    # Draw all valid moves for selected piece
-    if self.board.show_valid_moves:
-      self.board.draw_valid_moves(valid_moves, self.window)
-
-    # Draw Game Buttons
-    self.board.draw_game_buttons(self.window, themes[self.theme], self.computer)
+  def update_screen(self, valid_moves, board):
+    """
+    Redraws only what changed since the last frame. Every square, the side panel and the move log keep a
+    signature of what they show; parts whose signature is unchanged are left alone, and nothing at all is
+    drawn or flipped while the game is idle.
+    """
+    # games without a window (played by match.py or replayed by analyze_pgn.py) are never drawn
+    if self.window is None:
+      return
+
+    theme = themes[self.theme]
+    full_redraw = self.full_redraw or self.drawn_theme != theme
+    dirty_rects = []
+
+    if full_redraw:
+      self.board.create_board(self.window, theme)
+      dirty_rects.append((0, 0, width, height))
+      self.full_redraw = False
+      self.drawn_theme = theme
+
+    # Draw the squares that changed, with the previous move, valid moves and the chess pieces on them
+    previous_move = set(board.previous_move or ())
+    highlighted = set(valid_moves) if self.board.show_valid_moves else set()
+    for row in range(num_rows):
+      for col in range(num_cols):
+        piece = board.board[row][col]
+        signature = ((piece.type, piece.color) if piece else None, (row, col) in previous_move, (row, col) in highlighted)
+        if full_redraw or self.square_signatures[row][col] != signature:
+          self.square_signatures[row][col] = signature
+          dirty_rects.append(self.board.draw_square(self.window, theme, row, col, piece, signature[1], signature[2]))
+
+    # Draw Game Buttons, captured pieces, advantages and the Promotion Menu
+    panel_signature = self.get_panel_signature()
+    if full_redraw or self.panel_signature != panel_signature:
+      self.panel_signature = panel_signature
+      panel_rect = (square_size * num_cols, 0, width - square_size * num_cols, square_size * num_rows)
+      self.window.blit(get_board_background(theme), panel_rect[:2], panel_rect)
+
+      self.board.draw_game_buttons(self.window, theme, self.computer)
+      self.board.material.draw_captured(self.window, self.human.color)
+      self.board.material.draw_advantages(self.window, self.human.color)
+      if self.human.promoting:
+        self.board.promotion_menu(self.human.color, self.window)
+      dirty_rects.append(panel_rect)
 
     # Draw Move Log
-    self.move_history.draw_move_log(self.window)
-
-    # Draw captured and advantages
-    self.board.material.draw_captured(self.window, self.human.color)
-    self.board.material.draw_advantages(self.window, self.human.color)
-
-    # Draw the chess pieces
-    self.board.draw(self.window, board)
-
-    # Draw Promotion Menu
-    if self.human.promoting:
-      self.board.promotion_menu(self.human.color, self.window)
-
-    # Update the screen
-    pygame.display.update()
+    move_log_signature = (len(self.move_history.move_log), self.move_history.move_log[-1:])
+    if full_redraw or self.move_log_signature != move_log_signature:
+      self.move_log_signature = move_log_signature
+      move_log_rect = (0, square_size * num_rows, width, height - square_size * num_rows)
+      self.window.blit(get_board_background(theme), move_log_rect[:2], move_log_rect)
+      self.move_history.draw_move_log(self.window)
+      dirty_rects.append(move_log_rect)
+
+    # Update the parts of the screen that changed
+    if full_redraw:
+      pygame.display.update()
+    elif dirty_rects:
+      pygame.display.update(dirty_rects)
+
+  def draw_search_snapshot(self):
+    """
+    Shows the next position published by the search for the Visualize AI feature, at the chosen speed.
+    """
+    snapshot = self.computer.snapshots.take(self.board.AI_speed)
+    if snapshot is not None:
+      self.shown_snapshot = snapshot
+    if self.shown_snapshot is not None:
+      self.update_screen([], self.shown_snapshot)
+
+  def get_panel_signature(self):
+    ai = self.computer
+    material = self.board.material
+    stats = (ai.stats.depth, ai.stats.nps(), ai.stats.tt_hit_rate()) if ai.stats else None
+    return (self.board.show_valid_moves, self.board.show_AI_calculations, self.board.AI_speed,
+            self.human.promoting, ai.moves_evaluated, ai.eval_cache.hits, ai.eval_cache.misses,
+            ai.total_moves_found, ai.current_best_evaluation, stats,
+            tuple((score, tuple(line)) for score, line in ai.principal_variations),
+            tuple(material.captured_black_pieces), tuple(material.captured_white_pieces),
+            material.white_advantage, material.black_advantage)
+
+  def invalidate_screen(self):
+    # Something else was drawn over the window, so the next update_screen redraws all of it
+    self.full_redraw = True
+    self.end_screen_drawn = False
 
   def update_game(self):
-    self.board.material.update_advantages(self.board)
+    self.board.material.update_advantages()
     self.change_turn()
     self.update_all_valid_moves()
 
@@ -82,37 +164,17 @@ class Game(object):
     self.no_captures_in_50()
 
   def update_all_valid_moves(self):
-    for row in self.board.board:
-      for piece in row:
-        if isinstance(piece, (Knight, Bishop, Rook, Queen, King)):
-          piece.update_valid_moves(self.board.board)
-        elif isinstance(piece, Pawn):
-          piece.update_valid_moves(
-            self.board.board, self.move_history.move_log)
+    # Only the moves that the changes since the last call can affect are generated again
+    self.attack_map.update(self.board)
 
   def get_dangerous_squares(self):
-    dangerous_squares = []
-    for row in self.board.board:
-      for piece in row:
-        if isinstance(piece, (Pawn, Knight, Bishop, Rook, Queen, King)):
-          if piece.color != self.turn:
-            dangerous_squares.extend(piece.valid_moves)
-
-    return dangerous_squares
+    return self.attack_map.get_attacked_squares("Black" if self.turn == "White" else "White")
 
   def king_checked(self):
     self.update_all_valid_moves()
-    king = None
-    dangerous_squares = self.get_dangerous_squares()
-    king_pos = (None, None)
-    for row in self.board.board:
-      for piece in row:
-        if isinstance(piece, King) and piece.color == self.turn:
-          king_pos = (piece.row, piece.col)
-          king = piece
-          break
-
-    if king_pos in dangerous_squares:
+    king = self.board.get_king(self.turn)
+
+    if self.attack_map.is_attacked(king.row, king.col, "Black" if self.turn == "White" else "White"):
       king.is_checked = True
       return True
 
@@ -120,45 +182,42 @@ class Game(object):
     return False
 
   def checkmate(self):
-    for row in self.board.board:
-      for piece in row:
-
-        # Get all pieces that are the same color as the king in check
-        if isinstance(piece, (Pawn, Knight, Bishop, Rook, Queen, King)) and piece.color == self.turn:
-          prev_row, prev_col = piece.row, piece.col
-
-          # Try all the moves available for each piece to see if they can escape check
-          for move in piece.valid_moves:
-            target = self.board.board[move[0]][move[1]]
-
-            # If capturing an enemy piece
-            if isinstance(target, (Pawn, Knight, Bishop, Rook, Queen, King)) and target.color != self.turn:
-              self.board.board[move[0]][move[1]] = 0
-              self.board.move(piece, move[0], move[1])
-
-              # If king is still checked, undo move and go next
-              if self.king_checked():
-                self.board.move(piece, prev_row, prev_col)
-                self.board.board[move[0]][move[1]] = target
-
-              # If king is no longer checked, then there is no checkmate yet
-              else:
-                self.board.move(piece, prev_row, prev_col)
-                self.board.board[move[0]][move[1]] = target
-                return False
-
-            # If moving to an empty square
-            else:
-              self.board.move(piece, move[0], move[1])
-
-              # If king is still checked, undo move and go next
-              if self.king_checked():
-                self.board.move(piece, prev_row, prev_col)
-
-              # If king is no longer checked, then there is no checkmate yet
-              else:
-                self.board.move(piece, prev_row, prev_col)
-                return False
+    # Get all pieces that are the same color as the king in check
+    for piece in self.board.get_all_pieces(self.turn):
+      prev_row, prev_col = piece.row, piece.col
+
+      # Try all the moves available for each piece to see if they can escape check
+      for move in piece.valid_moves:
+        target = self.board.board[move[0]][move[1]]
+
+        # If capturing an enemy piece
+        if isinstance(target, (Pawn, Knight, Bishop, Rook, Queen, King)) and target.color != self.turn:
+          self.board.remove_piece(target)
+          self.board.move(piece, move[0], move[1])
+
+          # If king is still checked, undo move and go next
+          if self.king_checked():
+            self.board.move(piece, prev_row, prev_col)
+            self.board.restore_piece(target)
+
+          # If king is no longer checked, then there is no checkmate yet
+          else:
+            self.board.move(piece, prev_row, prev_col)
+            self.board.restore_piece(target)
+            return False
+
+        # If moving to an empty square
+        else:
+          self.board.move(piece, move[0], move[1])
+
+          # If king is still checked, undo move and go next
+          if self.king_checked():
+            self.board.move(piece, prev_row, prev_col)
+
+          # If king is no longer checked, then there is no checkmate yet
+          else:
+            self.board.move(piece, prev_row, prev_col)
+            return False
 
     self.update_screen(self.human.valid_moves, self.board)
     self.checkmate_win = True
@@ -174,19 +233,17 @@ class Game(object):
     all_valid_moves = []
     dangerous_squares = self.get_dangerous_squares()
 
-    for row in self.board.board:
-      for piece in row:
-        # Get all pieces that are the same color as the current player's team
-        if isinstance(piece, (Pawn, Knight, Bishop, Rook, Queen, King)) and piece.color == self.turn:
+    # Get all pieces that are the same color as the current player's team
+    for piece in self.board.get_all_pieces(self.turn):
 
-          # Go through all possible moves to see if any are legal
-          if isinstance(piece, King):
-            for move in piece.valid_moves:
-              if move not in dangerous_squares:
-                all_valid_moves.append(move)
-          else:
-            for move in piece.valid_moves:
-              all_valid_moves.append(move)
+      # Go through all possible moves to see if any are legal
+      if isinstance(piece, King):
+        for move in piece.valid_moves:
+          if move not in dangerous_squares:
+            all_valid_moves.append(move)
+      else:
+        for move in piece.valid_moves:
+          all_valid_moves.append(move)
 
     # If there were no legal moves for the current player, its a stalemate
     if not all_valid_moves:
@@ -201,25 +258,15 @@ class Game(object):
         self.no_captures_50 = True
 
   def insufficient_material(self):
-    white_material = {"Knights": 0, "Bishops": 0}
-    black_material = {"Knights": 0, "Bishops": 0}
-
-    for row in self.board.board:
-      for piece in row:
-
-        # If there is a pawn, rook, or queen on the board, the game is still winnable
-        if isinstance(piece, (Pawn, Rook, Queen)):
-          return False
+    counts = self.board.material.counts
 
-        if isinstance(piece, Knight):
-          white_material["Knights"] += 1 if piece.color == "White" else 0
-          black_material["Knights"] += 1 if piece.color == "Black" else 0
-        if isinstance(piece, Bishop):
-          white_material["Bishops"] += 1 if piece.color == "White" else 0
-          black_material["Bishops"] += 1 if piece.color == "Black" else 0
+    # If there is a pawn, rook, or queen on the board, the game is still winnable
+    for color in ("White", "Black"):
+      if counts[color]["Pawn"] or counts[color]["Rook"] or counts[color]["Queen"]:
+        return False
 
-    white_pieces = sum(white_material.values())
-    black_pieces = sum(black_material.values())
+    white_pieces = counts["White"]["Knight"] + counts["White"]["Bishop"]
+    black_pieces = counts["Black"]["Knight"] + counts["Black"]["Bishop"]
 
     if white_pieces * 3 <= 3 and black_pieces * 3 <= 3:
       self.update_screen(self.human.valid_moves, self.board)
@@ -1,14 +1,19 @@
-from pieces.pawn import Pawn, pawns
-from pieces.knight import Knight, knights
-from pieces.bishop import Bishop, bishops
-from pieces.rook import Rook, rooks
-from pieces.queen import Queen, queens
+from pieces.pawn import Pawn
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.rook import Rook
+from pieces.queen import Queen
 from pieces.king import King
-import pygame
+import copy
+from game.constants import PHASE_WEIGHTS, MAX_PHASE
+from game.assets import get_piece_image
+from game.render_cache import get_scaled_image, get_font
 
 
-pygame.font.init()
-my_font = pygame.font.SysFont("calibri", 15)
+# Points shown as the material advantage
+PIECE_POINTS = {"Pawn": 1, "Knight": 3, "Bishop": 3, "Rook": 4, "Queen": 9, "King": 0}
+
+CAPTURE_PRIORITY = {Pawn: 0, Knight: 1, Bishop: 2, Rook: 3, Queen: 4, King: 5}
 
 
 class Material(object):
@@ -17,18 +22,46 @@ class Material(object):
     self.white_advantage = 0
     self.captured_black_pieces = []
     self.captured_white_pieces = []
-    self.priority = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+    # Pieces on the board per side and type, kept up to date by Board.add_piece, remove_piece and restore_piece
+    self.counts = {"White": dict.fromkeys(PIECE_POINTS, 0), "Black": dict.fromkeys(PIECE_POINTS, 0)}
+    self.points = {"White": 0, "Black": 0}
+    self.phase_weight = 0
+
+  def add(self, piece):
+    self.counts[piece.color][piece.type] += 1
+    self.points[piece.color] += PIECE_POINTS[piece.type]
+    self.phase_weight += PHASE_WEIGHTS[piece.type]
+
+  def remove(self, piece):
+    self.counts[piece.color][piece.type] -= 1
+    self.points[piece.color] -= PIECE_POINTS[piece.type]
+    self.phase_weight -= PHASE_WEIGHTS[piece.type]
+
+  def reset_counts(self):
+    self.counts = {"White": dict.fromkeys(PIECE_POINTS, 0), "Black": dict.fromkeys(PIECE_POINTS, 0)}
+    self.points = {"White": 0, "Black": 0}
+    self.phase_weight = 0
+
+  def clone(self):
+    """
+    A copy with its own counts, for the search's private board. The captured piece lists are shared.
+    """
+    material = copy.copy(self)
+    material.counts = {color: dict(counts) for color, counts in self.counts.items()}
+    material.points = dict(self.points)
+    return material
+
+  def phase(self):
+    """
+    The game phase from MAX_PHASE (all pieces on the board) down to 0 (only kings and pawns left).
+    """
+    return min(self.phase_weight, MAX_PHASE)
 
   def get_image(self, piece, color_index):
-    image_map = {
-      Pawn: pawns[color_index],
-      Knight: knights[color_index],
-      Bishop: bishops[color_index],
-      Rook: rooks[color_index],
-      Queen: queens[color_index]
-    }
-    image = image_map.get(type(piece))
-    return pygame.transform.scale(image, (32, 32)) if image else None
+    if piece.type == "King":
+      return None
+    return get_scaled_image(get_piece_image(piece.type, ("White", "Black")[color_index]), (32, 32))
 
   def draw_captured(self, window, color):
     positions = {
@@ -52,7 +85,7 @@ class Material(object):
 
   def draw_advantages(self, window, color):
     def draw_text(pieces_list, advantage, y_offsets):
-      text = my_font.render(f"+{advantage}", True, (0, 0, 0))
+      text = get_font("calibri", 15).render(f"+{advantage}", True, (0, 0, 0))
       pieces_list.append(text)
       for piece in range(len(pieces_list)):
         if not isinstance(pieces_list[piece], (Pawn, Knight, Bishop, Rook, Queen)):
@@ -68,27 +101,16 @@ class Material(object):
       draw_text(self.captured_white_pieces, self.black_advantage,
                 (35 if color == "White" else 410, 60 if color == "White" else 435))
 
-  def update_advantages(self, board):
-    value_map = {Pawn: 1, Knight: 3, Bishop: 3, Rook: 4, Queen: 9}
-    black_adv, white_adv = 0, 0
-
-    for row in board.board:
-      for piece in row:
-        if type(piece) in value_map:
-          if piece.color == "White":
-            white_adv += value_map[type(piece)]
-          else:
-            black_adv += value_map[type(piece)]
-
+  def update_advantages(self):
+    white_adv, black_adv = self.points["White"], self.points["Black"]
     self.white_advantage = max(0, white_adv - black_adv)
     self.black_advantage = max(0, black_adv - white_adv)
 
   def add_to_captured_pieces(self, piece, captured_pieces):
-    priority = [Pawn, Knight, Bishop, Rook, Queen, King]
-    piece_priority = priority.index(type(piece))
+    piece_priority = CAPTURE_PRIORITY[type(piece)]
 
     for i, curr in enumerate(captured_pieces):
-      if priority.index(type(curr)) > piece_priority:
+      if CAPTURE_PRIORITY[type(curr)] > piece_priority:
         captured_pieces.insert(i, piece)
         return
     captured_pieces.append(piece)
\ No newline at end of file
@@ -1,13 +1,12 @@
-import pygame
-
-pygame.font.init()
-my_font = pygame.font.SysFont("calibri", 15)
+from game.render_cache import get_font
 
 
 class MoveHistory(object):
   def __init__(self):
     self.move_log = []
     self.letters = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    self.rendered_log_key = None
+    self.rendered_log_lines = []
 
   def get_file(self, col):
     return self.letters[col]
@@ -26,27 +25,28 @@ class MoveHistory(object):
       self.show_move_log(100, window)
 
   def show_move_log(self, start, window):
+    # Lines are only rendered again when a move was added, not every frame
+    log_key = (start, len(self.move_log), self.move_log[-1] if self.move_log else None)
+    if self.rendered_log_key != log_key:
+      self.rendered_log_key = log_key
+      my_font = get_font("calibri", 15)
+      self.rendered_log_lines = [my_font.render(line, True, (0, 0, 0)) for line in self.get_log_lines(start)]
+
+    for line_ind, text in enumerate(self.rendered_log_lines):
+      window.blit(text, (10, 490 + 20 * line_ind))
+
+  def get_log_lines(self, start):
     move_list = []
     move_string = []
-    text = my_font.render("".join(move_string), True, (0, 0, 0))
 
     for i in range(start, len(self.move_log)):
       move = str(i + 1) + "." + self.move_log[i] + ", "
       move_string.append(move)
-      text = my_font.render("".join(move_string), True, (0, 0, 0))
 
       # Every 11th move added to move string, append it to move list
       if i != 0 and i % 11 == 0:
         move_list.append("".join(move_string))
         move_string = []
-        text = my_font.render("".join(move_string), True, (0, 0, 0))
-
-    if len(move_list) == 0:
-      window.blit(text, (10, 490))
-
-    elif len(move_list) > 0:
-      for move_ind in range(len(move_list)):
-        list_text = my_font.render(move_list[move_ind], True, (0, 0, 0))
-        window.blit(list_text, (10, 490 + 20 * move_ind))
 
-      window.blit(text, (10, 490 + 20 * len(move_list)))
+    move_list.append("".join(move_string))
+    return move_list
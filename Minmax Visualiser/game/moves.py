@@ -0,0 +1,58 @@
+# Moves are packed into 16 bit ints, as in https://www.chessprogramming.org/Encoding_Moves:
+# bits 0-5 hold the from square, bits 6-11 the to square (square = row * 8 + col) and bits 12-15 the flags below.
+QUIET = 0
+DOUBLE_PAWN_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EP_CAPTURE = 5
+
+# Promotions set this flag plus the promoted piece in the two low flag bits (and CAPTURE when they capture)
+PROMOTION = 8
+PROMOTION_PIECES = ("Knight", "Bishop", "Rook", "Queen")
+PROMOTION_LETTERS = "nbrq"
+PROMOTE_TO_QUEEN = 3
+
+FILES = "abcdefgh"
+
+
+def encode_move(from_square, to_square, flags=QUIET):
+  return from_square | (to_square << 6) | (flags << 12)
+
+
+def move_from(move):
+  return move & 63
+
+
+def move_to(move):
+  return (move >> 6) & 63
+
+
+def move_flags(move):
+  return move >> 12
+
+
+def is_capture(move):
+  return bool((move >> 12) & CAPTURE)
+
+
+def is_promotion(move):
+  return bool((move >> 12) & PROMOTION)
+
+
+def promotion_piece(move):
+  return PROMOTION_PIECES[(move >> 12) & 3]
+
+
+def square_name(square):
+  return FILES[square & 7] + str(8 - (square >> 3))
+
+
+def move_to_string(move):
+  """
+  The move in coordinate notation, e.g. "e2e4" or "e7e8q".
+  """
+  move_string = square_name(move & 63) + square_name((move >> 6) & 63)
+  if is_promotion(move):
+    move_string += PROMOTION_LETTERS[(move >> 12) & 3]
+  return move_string
@@ -0,0 +1,80 @@
+# Pawn structure terms in centipawns, from https://www.chessprogramming.org/Pawn_Structure
+DOUBLED_PAWN_PENALTY = 10
+ISOLATED_PAWN_PENALTY = 15
+# indexed by how many rows a passed pawn has advanced from its starting row
+PASSED_PAWN_BONUS = (5, 10, 15, 25, 45, 75)
+
+# Pawn shield of a king on its back row: per file next to or in front of the king, a pawn one or two rows ahead of
+# the king, or no pawn at all
+SHIELD_PAWN_BONUS = (10, 5)
+MISSING_SHIELD_PENALTY = 10
+
+
+def get_pawn_rows(board, color):
+  """
+  The rows of color's pawns on every file.
+  """
+  files = [[] for _ in range(8)]
+  for piece in board.get_all_pieces(color):
+    if piece.type == "Pawn":
+      files[piece.col].append(piece.row)
+  return files
+
+
+def evaluate_pawns(files, enemy_files, forward):
+  """
+  The doubled, isolated and passed pawn terms of one side, whose pawns move forward (-1 or 1) rows per move.
+  """
+  score = 0
+  start_row = 6 if forward == -1 else 1
+  for col in range(8):
+    rows = files[col]
+    if not rows:
+      continue
+    score -= DOUBLED_PAWN_PENALTY * (len(rows) - 1)
+
+    neighbours = range(max(0, col - 1), min(7, col + 1) + 1)
+    if not any(files[other] for other in neighbours if other != col):
+      score -= ISOLATED_PAWN_PENALTY * len(rows)
+
+    for row in rows:
+      # passed: no enemy pawn ahead of it on its own or a neighbouring file
+      if not any((enemy_row - row) * forward > 0 for other in neighbours for enemy_row in enemy_files[other]):
+        score += PASSED_PAWN_BONUS[(row - start_row) * forward]
+  return score
+
+
+def evaluate_pawn_shield(king, files, forward):
+  home_row = 7 if forward == -1 else 0
+  if king is None or king.row != home_row:
+    return 0
+
+  score = 0
+  for col in range(max(0, king.col - 1), min(7, king.col + 1) + 1):
+    rows = files[col]
+    if king.row + forward in rows:
+      score += SHIELD_PAWN_BONUS[0]
+    elif king.row + 2 * forward in rows:
+      score += SHIELD_PAWN_BONUS[1]
+    else:
+      score -= MISSING_SHIELD_PENALTY
+  return score
+
+
+def evaluate_pawn_structure(board):
+  """
+  Returns (structure, shield), both from white's point of view: the doubled, isolated and passed pawn terms, and the
+  pawn shields of the kings, which only matter in the middlegame and are tapered by the caller.
+  The result only depends on where the pawns and kings are, so it can be cached by ZobristHashing.calculate_pawn_hash.
+  """
+  white_files = get_pawn_rows(board, "White")
+  black_files = get_pawn_rows(board, "Black")
+  # the player's pawns move up the screen
+  white_forward = -1 if board.player_color == "White" else 1
+  black_forward = -white_forward
+
+  structure = evaluate_pawns(white_files, black_files, white_forward) - \
+              evaluate_pawns(black_files, white_files, black_forward)
+  shield = evaluate_pawn_shield(board.get_king("White"), white_files, white_forward) - \
+           evaluate_pawn_shield(board.get_king("Black"), black_files, black_forward)
+  return structure, shield
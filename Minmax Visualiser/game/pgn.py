@@ -0,0 +1,135 @@
+import re
+from game.moves import KING_CASTLE, QUEEN_CASTLE, FILES, is_promotion, promotion_piece
+
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+PIECE_LETTERS = {"N": "Knight", "B": "Bishop", "R": "Rook", "Q": "Queen", "K": "King"}
+
+TAG_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+# piece, from file, from rank, target square and promotion piece of a SAN move, after check and annotation marks are
+# stripped
+SAN_PATTERN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+
+
+class PGNGame(object):
+  """
+  One game of a PGN file: its tag pairs and its main line of moves in SAN.
+  """
+  def __init__(self, index, headers, moves):
+    self.index = index
+    self.headers = headers
+    self.moves = moves
+
+
+def read_games(path):
+  """
+  Yields the games of a PGN file one at a time, so files with thousands of games are never loaded at once.
+  """
+  index = 0
+  headers = {}
+  movetext = []
+  with open(path, encoding="utf-8", errors="replace") as f:
+    for line in f:
+      line = line.strip()
+      tag = TAG_PATTERN.match(line)
+      # a tag pair after movetext starts the next game
+      if tag and movetext:
+        yield PGNGame(index, headers, split_movetext("\n".join(movetext)))
+        index += 1
+        headers, movetext = {}, []
+      if tag:
+        headers[tag.group(1)] = tag.group(2)
+      elif line and not line.startswith("%"):
+        movetext.append(line)
+
+  if headers or movetext:
+    yield PGNGame(index, headers, split_movetext("\n".join(movetext)))
+
+
+def split_movetext(text):
+  """
+  The SAN moves of the main line, without move numbers, comments, variations, NAGs and the result.
+  """
+  main_line = []
+  depth = 0
+  in_comment = False
+  in_line_comment = False
+  for char in text + " ":
+    if in_comment:
+      in_comment = char != "}"
+    elif in_line_comment:
+      in_line_comment = char != "\n"
+    elif char == "{":
+      in_comment = True
+    elif char == ";":
+      in_line_comment = True
+    elif char == "(":
+      depth += 1
+    elif char == ")":
+      depth -= 1
+    elif depth == 0:
+      main_line.append(char)
+
+  moves = []
+  for token in "".join(main_line).split():
+    # "12." and "12..." are move numbers, and "12.e4" has its number attached
+    token = token.split(".")[-1]
+    if token and not token.startswith("$") and token not in RESULTS:
+      moves.append(token)
+  return moves
+
+
+def parse_san(computer, game, san, color):
+  """
+  The packed move of color that a SAN move stands for. Raises ValueError if it doesn't match exactly one legal move.
+  """
+  board = game.board
+  other = computer.BLACK if color == computer.WHITE else computer.WHITE
+  king = board.get_king(color)
+  in_check = computer.is_in_check(board, color)
+
+  # Even a single match is tested, so a move that leaves the king in check (or castles through it) is rejected
+  candidates = []
+  for move in find_moves(san, computer.get_all_moves(board, game, color), board):
+    if computer.make_legal_move(board, game, move, king, in_check, other):
+      computer.undo_move(board, game, move)
+      candidates.append(move)
+  if len(candidates) != 1:
+    raise ValueError(f"{san} matches {len(candidates)} moves")
+  return candidates[0]
+
+
+def find_moves(san, moves, board):
+  """
+  The packed moves (from Computer.get_all_moves) that match a SAN move. There can be more than one when one of the
+  pieces SAN did not need to tell apart is pinned, since the engine's moves may leave the king in check.
+  """
+  san = san.rstrip("+#!?")
+  if san in ("O-O", "0-0"):
+    return [move for move in moves if move >> 12 == KING_CASTLE]
+  if san in ("O-O-O", "0-0-0"):
+    return [move for move in moves if move >> 12 == QUEEN_CASTLE]
+
+  match = SAN_PATTERN.match(san)
+  if match is None:
+    raise ValueError(f"Not a SAN move: {san}")
+  letter, from_file, from_rank, target, promotion = match.groups()
+  piece_type = PIECE_LETTERS[letter] if letter else "Pawn"
+  to_square = (8 - int(target[1])) * 8 + FILES.index(target[0])
+
+  candidates = []
+  for move in moves:
+    from_square = move & 63
+    piece = board.board[from_square >> 3][from_square & 7]
+    if (move >> 6) & 63 != to_square or piece.type != piece_type or move >> 12 in (KING_CASTLE, QUEEN_CASTLE):
+      continue
+    if from_file and FILES[from_square & 7] != from_file:
+      continue
+    if from_rank and str(8 - (from_square >> 3)) != from_rank:
+      continue
+    if is_promotion(move) != bool(promotion):
+      continue
+    if promotion and promotion_piece(move) != PIECE_LETTERS[promotion]:
+      continue
+    candidates.append(move)
+  return candidates
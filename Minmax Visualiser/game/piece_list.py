@@ -0,0 +1,41 @@
+class PieceList(object):
+  """
+  The pieces of one side, so nothing has to scan the 64 squares to find them.
+
+  Every piece knows its index in the list (piece.list_index). A removed piece is replaced by the last piece of the
+  list, so add and remove are O(1), and restore puts both back where they were, which keeps the order identical
+  across the search's make/unmake pairs.
+  """
+  def __init__(self):
+    self.pieces = []
+
+  def __iter__(self):
+    return iter(self.pieces)
+
+  def __len__(self):
+    return len(self.pieces)
+
+  def add(self, piece):
+    piece.list_index = len(self.pieces)
+    self.pieces.append(piece)
+
+  def remove(self, piece):
+    index = piece.list_index
+    last = self.pieces.pop()
+    if last is not piece:
+      self.pieces[index] = last
+      last.list_index = index
+
+  def restore(self, piece):
+    """
+    Undoes the latest remove of piece. Removes and restores have to be undone in reverse order.
+    """
+    index = piece.list_index
+    if index == len(self.pieces):
+      self.pieces.append(piece)
+      return
+
+    displaced = self.pieces[index]
+    displaced.list_index = len(self.pieces)
+    self.pieces.append(displaced)
+    self.pieces[index] = piece
@@ -0,0 +1,110 @@
+import atexit
+import queue
+import sqlite3
+import threading
+
+
+# Bumped whenever the hash keys change or the search or the evaluation scores positions differently, which empties
+# stores of older versions
+POSITION_STORE_VERSION = 2
+
+# Only positions searched at least this many plies deep are stored; shallower ones are quick to search again
+POSITION_STORE_MIN_DEPTH = 2
+
+# The deepest entries of the store loaded into a new Computer's transposition table
+POSITION_STORE_WARM_ENTRIES = 1 << 16
+
+# The stores opened by this process, by path, so every Computer shares one writer per file
+stores = {}
+
+
+def get_position_store(path):
+  if path not in stores:
+    stores[path] = PositionStore(path)
+  return stores[path]
+
+
+def to_signed(key):
+  # SQLite integers are signed 64 bit, Zobrist hashes unsigned
+  return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def to_unsigned(key):
+  return key + (1 << 64) if key < 0 else key
+
+
+class PositionStore(object):
+  """
+  Transposition table entries (depth, score, flag, best move) of deep searches, kept in an SQLite file so the engine
+  remembers positions it analysed across sessions. The Zobrist keys have a fixed seed, so a hash means the same
+  position in every run.
+
+  A new Computer warms its transposition table with load. save only queues the entries: one writer thread per store
+  writes them in batches with its own connection, so a search never waits for the disk. A position already stored
+  is only replaced by a search at least as deep.
+  """
+  def __init__(self, path):
+    self.path = path
+    self.pending = queue.Queue()
+
+    with self.connect() as connection:
+      connection.execute("CREATE TABLE IF NOT EXISTS meta (version INTEGER)")
+      connection.execute("CREATE TABLE IF NOT EXISTS positions "
+                         "(key INTEGER PRIMARY KEY, depth INTEGER, score INTEGER, flag INTEGER, move INTEGER)")
+      row = connection.execute("SELECT version FROM meta").fetchone()
+      if row is None or row[0] != POSITION_STORE_VERSION:
+        connection.execute("DELETE FROM positions")
+        connection.execute("DELETE FROM meta")
+        connection.execute("INSERT INTO meta VALUES (?)", (POSITION_STORE_VERSION,))
+    connection.close()
+
+    self.writer = threading.Thread(target=self.write_entries, daemon=True)
+    self.writer.start()
+    atexit.register(self.close)
+
+  def connect(self):
+    # several processes (the batch analyzer, matches) can share a file; a writer waits for another one's lock
+    return sqlite3.connect(self.path, timeout=30)
+
+  def load(self, limit=POSITION_STORE_WARM_ENTRIES):
+    """
+    Returns the deepest limit entries as a transposition table: {hash: (depth, score, flag, best move)}.
+    """
+    connection = self.connect()
+    rows = connection.execute("SELECT key, depth, score, flag, move FROM positions ORDER BY depth DESC LIMIT ?",
+                              (limit,)).fetchall()
+    connection.close()
+    return {to_unsigned(key): (depth, score, flag, move) for key, depth, score, flag, move in rows}
+
+  def save(self, entries):
+    """
+    Queues [(hash, (depth, score, flag, best move))] to be written by the writer thread.
+    """
+    if entries:
+      self.pending.put(entries)
+
+  def write_entries(self):
+    connection = self.connect()
+    while True:
+      entries = self.pending.get()
+      if entries is None:
+        break
+      rows = [(to_signed(key), depth, score, flag, move) for key, (depth, score, flag, move) in entries]
+      with connection:
+        connection.executemany(
+          "INSERT INTO positions VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET depth = excluded.depth, "
+          "score = excluded.score, flag = excluded.flag, move = excluded.move WHERE excluded.depth >= positions.depth",
+          rows)
+      self.pending.task_done()
+    connection.close()
+
+  def flush(self):
+    """
+    Waits until every queued entry is written.
+    """
+    self.pending.join()
+
+  def close(self):
+    if self.writer.is_alive():
+      self.pending.put(None)
+      self.writer.join()
@@ -1,46 +1,163 @@
-import time
+import json
+import os
+import threading
+from time import perf_counter_ns
 from functools import wraps
 from game.constants import function_names
 from collections import defaultdict
 
 
+# The profiling mode is read once, when the engine modules are imported:
+#   CHESS_PROFILE=off     (default) profile_function returns the undecorated function, so profiling costs nothing
+#   CHESS_PROFILE=full    every call of a profiled function is timed and recorded as a trace event
+#   CHESS_PROFILE=sample  only one call in CHESS_PROFILE_SAMPLE_RATE is timed, the totals are extrapolated
+PROFILE_MODE = os.environ.get("CHESS_PROFILE", "off").lower()
+PROFILE_SAMPLE_RATE = max(1, int(os.environ.get("CHESS_PROFILE_SAMPLE_RATE", "64")))
+PROFILING_ENABLED = PROFILE_MODE in ("full", "sample")
+
+# Optional export paths, written after every computer move when profiling is enabled
+PROFILE_JSON_PATH = os.environ.get("CHESS_PROFILE_JSON")
+PROFILE_TRACE_PATH = os.environ.get("CHESS_PROFILE_TRACE")
+
+# Upper bound on the number of recorded trace events, so a long search can't exhaust memory
+MAX_TRACE_EVENTS = 500000
+
+
 class Profiler():
   def __init__(self):
     self.reset_profiler()
 
   def profile_function(func):
+    """
+    Decorator for Computer methods. When profiling is disabled the function is returned untouched,
+    otherwise every (or every sampled) call records its inclusive and exclusive time in nanoseconds.
+    """
+    if not PROFILING_ENABLED:
+      return func
+
+    name = func.__name__
+    sampling = PROFILE_MODE == "sample"
+
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-      start_time = time.time()
-      result = func(self,*args, **kwargs)
-      elapsed_time = time.time() - start_time
+      profiler = self.profiler
+      data = profiler.profile_data[name]
+      data["call_count"] += 1
 
-      if not self.profiler.start_time:
-        self.profiler.start_time = start_time
+      # calls nested inside a timed call are always timed, otherwise the parent's exclusive time would be wrong
+      if sampling and not profiler.child_times and data["call_count"] % PROFILE_SAMPLE_RATE:
+        return func(self, *args, **kwargs)
 
-      self.profiler.profile_data[func.__name__]["total_time"] += elapsed_time
-      self.profiler.profile_data[func.__name__]["call_count"] += 1
-
-      return result
+      profiler.child_times.append(0)
+      start_time = perf_counter_ns()
+      try:
+        return func(self, *args, **kwargs)
+      finally:
+        end_time = perf_counter_ns()
+        profiler.record_call(name, data, start_time, end_time)
 
     return wrapper
 
-  def print_profile_summary(self, moves_evaluated):
-    print(f"\n{'-' * 10} Chess Engine Profiling Summary {'-' * 10}")
-    print(f"Total time to calculate move: {(time.time() - self.start_time):.2f}s.")
-    print(f"Moves evaluated per second: {int(moves_evaluated // (time.time() - self.start_time))}")
-    print("-" * 52)
+  def record_call(self, name, data, start_time, end_time):
+    elapsed_time = end_time - start_time
+    children_time = self.child_times.pop()
+    if self.child_times:
+      self.child_times[-1] += elapsed_time
+
+    if not self.start_time:
+      self.start_time = start_time
+
+    data["sampled_calls"] += 1
+    data["inclusive_ns"] += elapsed_time
+    data["exclusive_ns"] += elapsed_time - children_time
+
+    if len(self.trace_events) < MAX_TRACE_EVENTS:
+      self.trace_events.append((name, start_time, elapsed_time, threading.get_ident()))
+
+  def count_node(self, ply):
+    """
+    Count a search node at the given distance from the root. Callers guard this with PROFILING_ENABLED.
+    """
+    if not self.start_time:
+      self.start_time = perf_counter_ns()
+    self.nodes_per_depth[ply] += 1
 
-    print("{:<20} {:<15} {:<15}".format("Function Name", "Call Count", "Total Time (s)"))
-    print("-" * 52)
+  def elapsed_seconds(self):
+    if not self.start_time:
+      return 0.0
+    return (perf_counter_ns() - self.start_time) / 1e9
 
+  def get_summary(self):
+    """
+    Returns the collected profile as a JSON-serialisable dictionary.
+    In sampling mode the times are extrapolated from the sampled calls to the full call count.
+    """
+    functions = {}
     for func_name, data in self.profile_data.items():
-      print("{:<20} {:<15} {:<15.3f}".format(func_name, data["call_count"], data["total_time"]))
+      scale = data["call_count"] / data["sampled_calls"] if data["sampled_calls"] else 0
+      functions[func_name] = {
+        "call_count": data["call_count"],
+        "sampled_calls": data["sampled_calls"],
+        "inclusive_ms": data["inclusive_ns"] * scale / 1e6,
+        "exclusive_ms": data["exclusive_ns"] * scale / 1e6,
+      }
+
+    return {
+      "mode": PROFILE_MODE,
+      "sample_rate": PROFILE_SAMPLE_RATE if PROFILE_MODE == "sample" else 1,
+      "wall_time_s": self.elapsed_seconds(),
+      "nodes": sum(self.nodes_per_depth.values()),
+      "nodes_per_depth": {str(ply): count for ply, count in sorted(self.nodes_per_depth.items())},
+      "functions": functions,
+    }
+
+  def export_json(self, path):
+    with open(path, "w") as f:
+      json.dump(self.get_summary(), f, indent=2)
+
+  def export_chrome_trace(self, path):
+    """
+    Writes the recorded calls in the Chrome trace event format, viewable in chrome://tracing or Perfetto.
+    """
+    origin = self.start_time or 0
+    events = [{"name": name, "ph": "X", "pid": os.getpid(), "tid": tid,
+               "ts": (start_time - origin) / 1000, "dur": elapsed_time / 1000}
+              for name, start_time, elapsed_time, tid in self.trace_events]
+
+    with open(path, "w") as f:
+      json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+  def print_profile_summary(self, moves_evaluated):
+    if not PROFILING_ENABLED:
+      return
+
+    summary = self.get_summary()
+    wall_time = max(summary["wall_time_s"], 1e-9)
+
+    print(f"\n{'-' * 18} Chess Engine Profiling Summary ({summary['mode']}) {'-' * 18}")
+    print(f"Total time to calculate move: {wall_time:.2f}s.")
+    print(f"Moves evaluated per second: {int(moves_evaluated // wall_time)}")
+    print(f"Nodes per depth: {summary['nodes_per_depth']}")
+    print("-" * 74)
+
+    print("{:<20} {:<15} {:<20} {:<20}".format("Function Name", "Call Count", "Inclusive Time (ms)", "Exclusive Time (ms)"))
+    print("-" * 74)
+
+    for func_name, data in summary["functions"].items():
+      print("{:<20} {:<15} {:<20.3f} {:<20.3f}".format(func_name, data["call_count"], data["inclusive_ms"], data["exclusive_ms"]))
+
+    if PROFILE_JSON_PATH:
+      self.export_json(PROFILE_JSON_PATH)
+    if PROFILE_TRACE_PATH:
+      self.export_chrome_trace(PROFILE_TRACE_PATH)
 
   def reset_profiler(self):
     self.start_time = None
+    self.child_times = []
+    self.trace_events = []
+    self.nodes_per_depth = defaultdict(int)
 
     def default_profiling_data():
-      return {"total_time": 0, "call_count": 0}
+      return {"call_count": 0, "sampled_calls": 0, "inclusive_ns": 0, "exclusive_ns": 0}
 
-    self.profile_data = defaultdict(default_profiling_data, {name: default_profiling_data() for name in function_names})
\ No newline at end of file
+    self.profile_data = defaultdict(default_profiling_data, {name: default_profiling_data() for name in function_names})
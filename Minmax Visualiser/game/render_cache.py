@@ -0,0 +1,88 @@
+import pygame
+from game.constants import width, height, square_size, num_rows, num_cols
+
+
+# Everything in here is created on first use and then reused for every frame
+fonts = {}
+scaled_images = {}
+board_backgrounds = {}
+text_surfaces = {}
+
+# Rendered labels are cached by their text, so the cache is cleared if it ever grows this large
+MAX_CACHED_TEXTS = 512
+
+letters = ["a", "b", "c", "d", "e", "f", "g", "h"]
+
+
+def get_font(name, size):
+  font = fonts.get((name, size))
+  if font is None:
+    # fonts are only set up when the first text is drawn
+    if not pygame.font.get_init():
+      pygame.font.init()
+    font = fonts[(name, size)] = pygame.font.SysFont(name, size)
+  return font
+
+
+def fit_text(font, text, max_width):
+  """
+  The text, cut short with ".." if it would be wider than max_width pixels in font.
+  """
+  if font.size(text)[0] <= max_width:
+    return text
+  while text and font.size(text + "..")[0] > max_width:
+    text = text[:-1]
+  return text + ".."
+
+
+def get_scaled_image(image, size):
+  scaled_image = scaled_images.get((image, size))
+  if scaled_image is None:
+    scaled_image = scaled_images[(image, size)] = pygame.transform.scale(image, size)
+  return scaled_image
+
+
+def render_text(font, text, color=(0, 0, 0)):
+  """
+  Renders a text that is drawn again and again (button labels, move log lines) only once.
+  """
+  surface = text_surfaces.get((font, text, color))
+  if surface is None:
+    if len(text_surfaces) >= MAX_CACHED_TEXTS:
+      text_surfaces.clear()
+    surface = text_surfaces[(font, text, color)] = font.render(text, True, color)
+  return surface
+
+
+def get_board_background(theme):
+  """
+  The static part of the window for a theme: background, squares, board coordinates and the move history box.
+  """
+  background = board_backgrounds.get(theme)
+  if background is not None:
+    return background
+
+  background = pygame.Surface((width, height))
+  my_font = get_font("calibri", 15)
+
+  # Draw squares and background
+  background.fill(theme[0])
+  for row in range(num_rows):
+    for col in range(num_cols):
+      if (row + col) % 2 == 0:
+        pygame.draw.rect(
+          background, theme[1], (row * square_size, col * square_size, square_size, square_size))
+
+  # Draw board letters and numbers
+  for i in range(0, 8):
+    text = my_font.render(letters[i], True, (0, 0, 0))
+    background.blit(text, (square_size * i + 2, square_size * 7 + square_size - 20))
+
+    text = my_font.render(str(8 - i), True, (0, 0, 0))
+    background.blit(text, (square_size * 0 + 2, square_size * i + 5))
+
+  # Draw move history
+  pygame.draw.rect(background, (255, 255, 255), (10, 490, 700, 140))
+
+  board_backgrounds[theme] = background
+  return background
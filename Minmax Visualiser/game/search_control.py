@@ -0,0 +1,117 @@
+from time import perf_counter
+
+
+# Nodes searched between two looks at the clock
+TIME_CHECK_INTERVAL = 1024
+
+# How much longer than its soft time limit a search may run while its best move keeps changing
+UNSTABLE_MOVE_EXTENSION = 2.0
+
+
+class SearchAborted(Exception):
+  """
+  Raised inside minimax when a limit is reached or the search is stopped; Computer.search takes back the moves of the
+  unfinished iteration.
+  """
+
+
+class SearchLimits(object):
+  """
+  How long one search may run: the deepest iteration, a node budget, and soft and hard time limits in seconds. None
+  means no limit. The node budget and the hard time limit stop the search wherever it is; the soft time limit only
+  keeps another iteration from starting.
+  """
+  def __init__(self, depth, nodes=None, soft_time=None, hard_time=None):
+    self.depth = depth
+    self.nodes = nodes
+    self.soft_time = soft_time
+    self.hard_time = hard_time
+
+
+# The computer's difficulty levels: the depth keeps easy levels weak, the budgets keep every move quick to answer
+DIFFICULTY_LEVELS = {
+  "Easy": SearchLimits(2, nodes=5000, soft_time=0.25, hard_time=0.5),
+  "Medium": SearchLimits(3, nodes=20000, soft_time=0.5, hard_time=1.0),
+  "Hard": SearchLimits(4, nodes=60000, soft_time=1.0, hard_time=2.0),
+  "Veteran": SearchLimits(5, nodes=150000, soft_time=2.0, hard_time=4.0),
+  "Expert": SearchLimits(6, nodes=400000, soft_time=4.0, hard_time=8.0),
+}
+
+
+class SearchControl(object):
+  """
+  Enforces the limits of the running search. minimax only compares its node count with next_check, and check does
+  the rest (the node budget, the clock, a stop from another thread) when it is reached.
+  """
+  def __init__(self):
+    self.limits = None
+    self.start_time = 0
+    self.next_check = float("inf")
+    self.soft_deadline = float("inf")
+    self.stopped = False
+
+  def start(self, limits):
+    self.limits = limits
+    self.start_time = perf_counter()
+    # the first iteration always finishes, so there is a move to play (unless the search is stopped)
+    self.set_next_check(float("inf"))
+    self.soft_deadline = self.start_time + limits.soft_time if limits.soft_time is not None else float("inf")
+
+  def iteration_done(self, nodes, best_move_changed):
+    """
+    Called after every finished iteration. Returns whether another iteration may start.
+    """
+    limits = self.limits
+    now = perf_counter()
+    if best_move_changed and limits.soft_time is not None:
+      # an unstable best move gets more time, up to the hard limit
+      extended = self.start_time + limits.soft_time * UNSTABLE_MOVE_EXTENSION
+      if limits.hard_time is not None:
+        extended = min(extended, self.start_time + limits.hard_time)
+      self.soft_deadline = max(self.soft_deadline, extended)
+
+    if self.stopped or now >= self.soft_deadline or (limits.nodes is not None and nodes >= limits.nodes):
+      return False
+    self.schedule_check(nodes)
+    return True
+
+  def schedule_check(self, nodes):
+    limits = self.limits
+    next_check = nodes + TIME_CHECK_INTERVAL if limits.hard_time is not None else float("inf")
+    if limits.nodes is not None:
+      next_check = min(next_check, limits.nodes)
+    self.set_next_check(next_check)
+
+  def set_next_check(self, next_check):
+    # stopped is read after next_check is written: a stop from another thread in between is seen here, and one that
+    # comes later writes its 0 over this value, so a stop is never lost
+    self.next_check = next_check
+    if self.stopped:
+      self.next_check = 0
+
+  def check(self, nodes):
+    """
+    Raises SearchAborted if the search was stopped, or the node budget or the hard time limit is used up.
+    """
+    if self.stopped:
+      raise SearchAborted()
+    limits = self.limits
+    if limits.nodes is not None and nodes >= limits.nodes:
+      raise SearchAborted()
+    if limits.hard_time is not None and perf_counter() - self.start_time >= limits.hard_time:
+      raise SearchAborted()
+    self.schedule_check(nodes)
+
+  def stop(self):
+    """
+    Stops the running search at its next node, from any thread. The stop holds until resume, so a search that had not
+    started yet when it was stopped ends right away too.
+    """
+    self.stopped = True
+    self.next_check = 0
+
+  def resume(self):
+    self.stopped = False
+
+  def elapsed(self):
+    return perf_counter() - self.start_time
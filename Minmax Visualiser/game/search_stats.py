@@ -0,0 +1,128 @@
+import json
+from time import perf_counter
+from game.moves import move_to_string
+
+
+class SearchStats(object):
+  """
+  Statistics of a single computer search, filled in by Computer.search while it runs.
+  Counters are plain attributes so the search can increment them with almost no overhead.
+  """
+  def __init__(self, color, max_depth):
+    self.color = color
+    self.max_depth = max_depth
+    self.start_time = perf_counter()
+    self.end_time = None
+
+    self.nodes = 0
+    # Unsupported: the engine has no quiescence search, so this stays 0. It is kept in to_dict so the schema doesn't
+    # change once there is one.
+    self.qnodes = 0
+
+    self.tt_probes = 0
+    self.tt_hits = 0
+    self.tt_cutoffs = 0
+
+    # evaluation cache probes at the leaves, copied from the Computer's EvalCache when the search finishes
+    self.eval_cache_hits = 0
+    self.eval_cache_misses = 0
+
+    # beta cutoffs, and how many of them were caused by the first move searched at that node
+    self.cutoffs = 0
+    self.first_move_cutoffs = 0
+
+    self.depth = 0
+    # the deepest finished iteration is self.iterations[-1]; aborted is set when a limit stopped the search
+    self.aborted = False
+    self.best_score = None
+    self.best_move = None
+    # the best root move (and its score) the unfinished iteration found so far, which progress listeners can show
+    self.root_move = None
+    self.root_score = None
+    # the best lines of the deepest iteration, more than one with Multi-PV
+    self.lines = []
+    self.iterations = []
+    self._iteration_start_time = None
+    self._iteration_start_nodes = 0
+
+  def start_iteration(self, depth):
+    self.depth = depth
+    self.root_move = None
+    self.root_score = None
+    self._iteration_start_time = perf_counter()
+    self._iteration_start_nodes = self.nodes
+
+  def end_iteration(self, depth, score, best_move):
+    nodes = self.nodes - self._iteration_start_nodes
+    previous_nodes = self.iterations[-1]["nodes"] if self.iterations else 0
+
+    self.best_score = score
+    self.best_move = best_move
+    self.iterations.append({
+      "depth": depth,
+      "nodes": nodes,
+      "time_ms": (perf_counter() - self._iteration_start_time) * 1000,
+      "score": score,
+      "best_move": best_move,
+      # effective branching factor: how many times more nodes this iteration needed than the previous one
+      "ebf": nodes / previous_nodes if previous_nodes else None,
+    })
+
+  def finish(self):
+    self.end_time = perf_counter()
+
+  def elapsed(self):
+    return (self.end_time or perf_counter()) - self.start_time
+
+  def nps(self):
+    elapsed = self.elapsed()
+    return int((self.nodes + self.qnodes) / elapsed) if elapsed > 0 else 0
+
+  def completed_depth(self):
+    return self.iterations[-1]["depth"] if self.iterations else 0
+
+  def tt_hit_rate(self):
+    return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+  def eval_cache_hit_rate(self):
+    probes = self.eval_cache_hits + self.eval_cache_misses
+    return self.eval_cache_hits / probes if probes else 0.0
+
+  def first_move_cutoff_rate(self):
+    return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+  def to_dict(self):
+    return {
+      "color": self.color,
+      "max_depth": self.max_depth,
+      "depth": self.depth,
+      "finished": self.end_time is not None,
+      "aborted": self.aborted,
+      "completed_depth": self.completed_depth(),
+      "time_ms": self.elapsed() * 1000,
+      "nodes": self.nodes,
+      "qnodes": self.qnodes,
+      "nps": self.nps(),
+      "tt_probes": self.tt_probes,
+      "tt_hits": self.tt_hits,
+      "tt_cutoffs": self.tt_cutoffs,
+      "tt_hit_rate": self.tt_hit_rate(),
+      "eval_cache_hits": self.eval_cache_hits,
+      "eval_cache_misses": self.eval_cache_misses,
+      "eval_cache_hit_rate": self.eval_cache_hit_rate(),
+      "cutoffs": self.cutoffs,
+      "first_move_cutoff_rate": self.first_move_cutoff_rate(),
+      "best_score": self.best_score,
+      "best_move": self.best_move,
+      "root_move": move_to_string(self.root_move) if self.root_move is not None else None,
+      "root_score": self.root_score,
+      "lines": list(self.lines),
+      "iterations": list(self.iterations),
+    }
+
+  def append_to_log(self, path):
+    """
+    Appends this search as one JSON line to the given file.
+    """
+    with open(path, "a") as f:
+      f.write(json.dumps(self.to_dict()) + "\n")
@@ -0,0 +1,55 @@
+from collections import deque
+from time import perf_counter
+
+
+# Seconds between two positions shown by the Visualize AI playback; Fast always shows the newest position
+PLAYBACK_INTERVALS = {"Fast": 0, "Medium": 0.1, "Slow": 0.25}
+
+
+class PositionSnapshot(object):
+  """
+  A copy of the squares of a searched position, drawn by Game.update_screen in place of the live board.
+  """
+  __slots__ = ("board", "previous_move")
+
+  def __init__(self, board, previous_move):
+    self.board = board
+    self.previous_move = previous_move
+
+
+class SnapshotQueue(object):
+  """
+  Bounded ring of positions published by the search thread and played back by the main thread.
+
+  deque.append and deque.popleft are atomic, so neither side takes a lock, and a full ring silently drops its
+  oldest position. The search therefore never waits for the screen; the screen just skips positions.
+  """
+  def __init__(self, capacity=64):
+    self.ring = deque(maxlen=capacity)
+    self.next_take = 0
+
+  def publish(self, board, previous_move):
+    self.ring.append(PositionSnapshot([row[:] for row in board.board], previous_move))
+
+  def take(self, speed):
+    """
+    Returns the next position to show at the given Visualize AI speed, or None if it isn't time for one yet.
+    """
+    now = perf_counter()
+    if now < self.next_take:
+      return None
+    interval = PLAYBACK_INTERVALS[speed]
+    self.next_take = now + interval
+
+    try:
+      if interval == 0:
+        snapshot = self.ring.pop()
+        self.ring.clear()
+        return snapshot
+      return self.ring.popleft()
+    except IndexError:
+      return None
+
+  def clear(self):
+    self.ring.clear()
+    self.next_take = 0
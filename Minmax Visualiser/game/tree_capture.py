@@ -0,0 +1,159 @@
+import json
+from array import array
+from game.moves import move_to_string
+
+
+# Node flags
+FLAG_SCORED = 1      # the search finished the node and stored its score
+FLAG_PRUNED = 2      # alpha-beta pruning skipped the remaining siblings after this node
+FLAG_TT_CUTOFF = 4   # the score came from the transposition table
+FLAG_TRUNCATED = 8   # the node has children that were not captured because of max_depth or max_nodes
+FLAG_PV = 16         # the node is on the principal variation
+
+# Scores are stored as 32 bit ints, so the infinite scores of nodes without moves are clamped
+SCORE_LIMIT = 10 ** 9
+
+
+class TreeCapture(object):
+  """
+  Bounded capture of the minimax search tree for the web visualizer.
+
+  Nodes are kept in parallel arrays (parent index, packed move from game/moves.py, score, flags, ply) instead of one dict per node, and
+  the capture stops below max_depth plies or after max_nodes nodes. When the tree is serialized only the principal
+  variation and the top_k best siblings at every level are kept, so the payload stays small for deep searches.
+  While the search runs, take_delta hands out only what changed since its previous call, for streaming.
+  """
+  def __init__(self, max_depth=3, max_nodes=50000, top_k=3):
+    self.max_depth = max_depth
+    self.max_nodes = max_nodes
+    self.top_k = top_k
+    self.seq = 0
+    self.reset(None, True)
+
+  def reset(self, search_id, root_maximizing, iteration=0):
+    """
+    Starts a new tree and returns the index of its root node.
+    """
+    if search_id != getattr(self, "search_id", None):
+      self.seq = 0
+    self.search_id = search_id
+    self.iteration = iteration
+    self.root_maximizing = root_maximizing
+    self.parent = array("i", [-1])
+    self.move = array("H", [0])
+    self.score = array("i", [0])
+    self.flags = array("B", [0])
+    self.ply = array("B", [0])
+
+    # streaming state: how many nodes were already sent, and the nodes scored or flagged since the last delta
+    self.sent_nodes = 0
+    self.changed = array("i")
+    return 0
+
+  def __len__(self):
+    return len(self.parent)
+
+  def add_node(self, parent, move_code):
+    """
+    Adds a child of parent and returns its index, or -1 if it falls outside the capture bounds.
+    """
+    ply = self.ply[parent] + 1
+    if ply > self.max_depth or len(self.parent) >= self.max_nodes:
+      self.flags[parent] |= FLAG_TRUNCATED
+      return -1
+
+    self.parent.append(parent)
+    self.move.append(move_code)
+    self.score.append(0)
+    self.flags.append(0)
+    self.ply.append(ply)
+    return len(self.parent) - 1
+
+  def set_score(self, node, score, flags=0):
+    self.score[node] = int(max(-SCORE_LIMIT, min(SCORE_LIMIT, score)))
+    self.flags[node] |= FLAG_SCORED | flags
+    self.changed.append(node)
+
+  def mark(self, node, flags):
+    self.flags[node] |= flags
+    self.changed.append(node)
+
+  def take_delta(self, done=False):
+    """
+    Returns the nodes added and the [node, score, flags] updates since the previous call, tagged with the search id
+    and a sequence number, or None if nothing changed. The first delta of every iteration has reset set, because
+    each iteration starts a new tree.
+    """
+    node_count = len(self.ply)
+    if node_count == self.sent_nodes and not self.changed and not done:
+      return None
+
+    first = self.sent_nodes
+    updated = sorted(set(self.changed))
+    self.seq += 1
+    self.sent_nodes = node_count
+    self.changed = array("i")
+
+    return {
+      "search_id": self.search_id,
+      "seq": self.seq,
+      "iteration": self.iteration,
+      "root_maximizing": self.root_maximizing,
+      "reset": first == 0,
+      "done": done,
+      "first": first,
+      "parent": self.parent[first:node_count].tolist(),
+      "move": [move_to_string(code) if code else "Root" for code in self.move[first:node_count]],
+      "updates": [[node, self.score[node], self.flags[node]] for node in updated],
+    }
+
+  def children(self):
+    children = [[] for _ in range(len(self.parent))]
+    for node in range(1, len(self.parent)):
+      children[self.parent[node]].append(node)
+    return children
+
+  def sample(self):
+    """
+    Returns the sorted indices of the nodes to keep: the principal variation and the top_k best children of every
+    kept node, judged from the point of view of the player to move at that node. Marks the PV nodes.
+    """
+    children = self.children()
+    keep = [0]
+    stack = [0]
+    while stack:
+      node = stack.pop()
+      scored = [child for child in children[node] if self.flags[child] & FLAG_SCORED]
+      if not scored:
+        continue
+
+      maximizing = self.root_maximizing == (self.ply[node] % 2 == 0)
+      scored.sort(key=lambda child: self.score[child], reverse=maximizing)
+      if node == 0 or self.flags[node] & FLAG_PV:
+        self.flags[scored[0]] |= FLAG_PV
+
+      for child in scored[:max(1, self.top_k)]:
+        keep.append(child)
+        stack.append(child)
+
+    keep.sort()
+    return keep
+
+  def to_dict(self):
+    """
+    Compact column-oriented form of the sampled tree. Parent indices refer to positions in the returned arrays.
+    """
+    keep = self.sample()
+    new_index = {node: index for index, node in enumerate(keep)}
+    return {
+      "search_id": self.search_id,
+      "root_maximizing": self.root_maximizing,
+      "captured_nodes": len(self.parent),
+      "parent": [new_index.get(self.parent[node], -1) for node in keep],
+      "move": [move_to_string(self.move[node]) if node else "Root" for node in keep],
+      "score": [self.score[node] if self.flags[node] & FLAG_SCORED else None for node in keep],
+      "flags": [self.flags[node] for node in keep],
+    }
+
+  def serialize(self):
+    return json.dumps(self.to_dict(), separators=(",", ":"))
@@ -0,0 +1,66 @@
+import json
+import queue
+import threading
+from time import perf_counter
+
+
+# The payloads waiting to be posted. While the web server is down or slow, further deltas are dropped instead of
+# piling up: the server rejects deltas after a gap until the reset delta that starts the next iteration.
+TREE_OUTBOX_SIZE = 256
+
+
+class TreePublisher(object):
+  """
+  Streams the tree capture to the web visualizer while the search runs.
+
+  Registered as a search listener, it cuts a delta from the capture on the search thread at most every interval
+  seconds (and at the end of every iteration), and a background thread posts the deltas in order, so the search
+  never waits on the network. When the search is done the sampled tree is posted before the final delta.
+  """
+  def __init__(self, capture, url="http://127.0.0.1:5000", interval=0.2):
+    self.capture = capture
+    self.url = url
+    self.interval = interval
+    self.next_publish = 0
+    self.outbox = queue.Queue(maxsize=TREE_OUTBOX_SIZE)
+    self.thread = None
+    self.connection_warning_shown = False
+
+  def __call__(self, event, stats):
+    now = perf_counter()
+    if event == "progress" and now < self.next_publish:
+      return
+    self.next_publish = now + self.interval
+
+    if event == "done":
+      self.enqueue("/minimax_data", self.capture.serialize())
+
+    delta = self.capture.take_delta(done=event == "done")
+    if delta is None:
+      return
+
+    self.enqueue("/minimax_delta", json.dumps(delta, separators=(",", ":")))
+    if self.thread is None:
+      self.thread = threading.Thread(target=self.send_deltas, daemon=True)
+      self.thread.start()
+
+  def enqueue(self, path, payload):
+    # dropped while the outbox is full, see TREE_OUTBOX_SIZE
+    try:
+      self.outbox.put_nowait((path, payload))
+    except queue.Full:
+      pass
+
+  def send_deltas(self):
+    # imported by the sending thread, so only a search that is streamed pays for importing requests
+    import requests
+    session = requests.Session()
+    while True:
+      path, payload = self.outbox.get()
+      try:
+        session.post(self.url + path, data=payload, headers={"Content-Type": "application/json"}, timeout=2)
+        self.connection_warning_shown = False
+      except requests.exceptions.RequestException:
+        if not self.connection_warning_shown:
+          print("Could not stream minimax data. Make sure the Flask server is running at http://127.0.0.1:5000")
+          self.connection_warning_shown = True
@@ -0,0 +1,25 @@
+from array import array
+
+
+# The longest line of moves the search can make on a board before undoing them
+MAX_PLY = 128
+
+
+class UndoStack(object):
+  """
+  What undo_move needs to take back the moves made by the search, one preallocated slot per ply.
+
+  The search makes and undoes a move at every node, so instead of a new dict per move the state is written into
+  parallel arrays (and two lists for the piece objects) indexed by ply.
+  """
+  def __init__(self, size=MAX_PLY):
+    self.moves = array("H", [0]) * size         # the packed move, so an aborted search can take its moves back
+    self.moved = [0] * size                     # the piece that moved (the pawn, for promotions)
+    self.captured = [0] * size                  # the captured piece, or 0
+    self.castling = array("B", [0]) * size      # bit 0: the moved piece could castle, bit 1: the castling rook could
+    self.en_passant = array("b", [-1]) * size   # the en passant square before the move, or -1
+    self.half_moves = array("H", [0]) * size
+    self.full_moves = array("H", [0]) * size
+    self.hash = array("Q", [0]) * size
+    self.pawn_hash = array("Q", [0]) * size
+    self.ply = 0
@@ -2,12 +2,19 @@ import random
 
 
 class ZobristHashing:
-  def __init__(self, rows, cols, piece_types, colors):
+  def __init__(self, rows, cols, piece_types, colors, seed=2024):
     self.rows = rows
     self.cols = cols
     self.piece_types = piece_types
     self.colors = colors
+    # a fixed seed keeps the keys identical between runs, so hashes can be compared across sessions
+    self.random = random.Random(seed)
     self.zobrist_table = self._initialize_zobrist_table()
+    self.black_to_move = self.random.getrandbits(64)
+    # keyed by the file of the en passant square
+    self.en_passant = [self.random.getrandbits(64) for _ in range(cols)]
+    # keyed by (color, file of the rook), for each castling right; drawn last so the other keys keep their values
+    self.castling = {(color, col): self.random.getrandbits(64) for color in colors for col in (0, cols - 1)}
 
   def _initialize_zobrist_table(self):
     table = {}
@@ -15,7 +22,7 @@ class ZobristHashing:
       for col in range(self.cols):
         for piece_type in self.piece_types:
           for color in self.colors:
-            table[(row, col, piece_type, color)] = random.getrandbits(64)
+            table[(row, col, piece_type, color)] = self.random.getrandbits(64)
     return table
 
   def calculate_hash(self, board):
@@ -25,6 +32,33 @@ class ZobristHashing:
         if piece != 0:
           h ^= self.zobrist_table[(
             piece.row, piece.col, type(piece).__name__, piece.color)]
+    return h ^ self.calculate_castling_hash(board)
+
+  def calculate_castling_hash(self, board):
+    """
+    The keys of the castling rights left: a king that can still castle and a rook of its color that can too, in a corner
+    of the king's row.
+    """
+    h = 0
+    for color in self.colors:
+      king = board.get_king(color)
+      if king is None or not king.can_castle:
+        continue
+      for col in (0, self.cols - 1):
+        rook = board.board[king.row][col]
+        if rook != 0 and rook.type == "Rook" and rook.color == color and rook.can_castle:
+          h ^= self.castling[(color, col)]
+    return h
+
+  def calculate_pawn_hash(self, board):
+    """
+    The hash of only the pawns and kings, which is all the pawn structure evaluation looks at.
+    """
+    h = 0
+    for color in self.colors:
+      for piece in board.get_all_pieces(color):
+        if piece.type == "Pawn" or piece.type == "King":
+          h ^= self.zobrist_table[(piece.row, piece.col, piece.type, piece.color)]
     return h
 
   def update_hash(self, h, piece, old_position, new_position):
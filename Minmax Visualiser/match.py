@@ -0,0 +1,256 @@
+import argparse
+import json
+import math
+import os
+import sys
+from multiprocessing import Pool
+
+# Matches are played without a window, and must not stream their searches to the web visualizer
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("CHESS_TREE_CAPTURE", "0")
+
+from game.game import Game
+from game.pgn import read_games, parse_san
+from game.search_control import SearchLimits
+from players.computer_player_test import Computer
+
+
+# Engine-vs-engine matches between two Computer configurations, with a sequential probability ratio test (SPRT) that
+# stops the match as soon as it is clear whether engine 1 is stronger. Run it from this directory, like chess.py:
+#   python match.py --engine1 depth=3 --engine2 depth=2 --games 200 --pgn match.pgn
+#   python match.py --engine1 depth=6,nodes=20000 --engine2 depth=6,hard_ms=500
+
+# Both engines play every opening once with each color
+OPENINGS = (
+  "e4 e5 Nf3 Nc6 Bb5",
+  "e4 e5 Nf3 Nc6 Bc4",
+  "e4 c5 Nf3 d6 d4",
+  "e4 e6 d4 d5 Nc3",
+  "e4 c6 d4 d5 e5",
+  "d4 d5 c4 e6 Nc3",
+  "d4 d5 c4 c6 Nf3",
+  "d4 Nf6 c4 g6 Nc3",
+  "d4 Nf6 c4 e6 Nf3",
+  "c4 e5 Nc3 Nf6 g3",
+  "Nf3 d5 g3 Nf6 Bg2",
+  "e4 d5 exd5 Qxd5 Nc3",
+)
+
+# The search limits an engine configuration can set (see SearchLimits); times are in milliseconds
+LIMIT_OPTIONS = ("depth", "nodes", "soft_ms", "hard_ms")
+
+# Games still running after this many plies are adjudicated as draws
+MAX_PLIES = 300
+
+RESULTS = {"White": "1-0", "Black": "0-1", None: "1/2-1/2"}
+DRAWS = (("stalemate_draw", "stalemate"), ("threefold_draw", "threefold repetition"), ("no_captures_50", "50 moves"),
+         ("insufficient_material_draw", "insufficient material"))
+
+
+def parse_engine(spec):
+  """
+  An engine configuration like "depth=3" or "depth=6,nodes=20000,multi_pv=2": the search limits (LIMIT_OPTIONS),
+  and any Computer attributes to set before the game (feature flags, cache sizes).
+  """
+  config = {"depth": 3}
+  for option in filter(None, spec.split(",")):
+    name, _, value = option.partition("=")
+    config[name.strip()] = int(value)
+  return config
+
+
+def create_engine(config, color):
+  engine = Computer(color, config["depth"])
+  soft_ms, hard_ms = config.get("soft_ms"), config.get("hard_ms")
+  engine.limits = SearchLimits(config["depth"], config.get("nodes"), soft_ms and soft_ms / 1000, hard_ms and hard_ms / 1000)
+  for name, value in config.items():
+    if name not in LIMIT_OPTIONS:
+      if not hasattr(engine, name):
+        raise ValueError(f"Computer has no attribute {name}")
+      setattr(engine, name, value)
+  return engine
+
+
+def play_game(task):
+  """
+  Plays one game from an opening. Returns (round, white engine number, result, termination, moves in SAN).
+  """
+  round_number, opening, white, configs = task
+  game = Game(None, "White", 0, configs[0]["depth"])
+  game.board.initiate_pieces()
+  game.update_all_valid_moves()
+  engines = {"White": create_engine(configs[white], "White"), "Black": create_engine(configs[1 - white], "Black")}
+
+  for san in opening:
+    engine = engines[game.turn]
+    engine.computer_move(game, parse_san(engine, game, san, game.turn))
+
+  winner, termination = None, "adjudication: move limit"
+  while len(game.move_history.move_log) < MAX_PLIES:
+    color = game.turn
+    engine = engines[color]
+    _, move, _ = engine.search(game.board, game)
+    # the search only plays legal moves, and finds none when the side to move is checkmated or stalemated
+    if move is None:
+      if engine.is_in_check(game.board, color):
+        winner, termination = ("Black" if color == "White" else "White"), "checkmate"
+      else:
+        termination = "stalemate"
+      break
+
+    engine.computer_move(game, move)
+    if game.checkmate_win:
+      winner, termination = color, "checkmate"
+    elif game.game_over():
+      termination = next(name for flag, name in DRAWS if getattr(game, flag))
+    if game.game_over():
+      break
+
+  return round_number, white, RESULTS[winner], termination, list(game.move_history.move_log)
+
+
+def expected_score(elo):
+  return 1 / (1 + 10 ** (-elo / 400))
+
+
+def get_elo(score):
+  score = min(max(score, 1e-6), 1 - 1e-6)
+  return -400 * math.log10(1 / score - 1)
+
+
+def get_match_score(wins, draws, losses):
+  """
+  Engine 1's mean score per game, its variance per game and the number of games. Half a game of every result is
+  added, so the variance of a one-sided start isn't zero: it can't end the SPRT or shrink the Elo interval to a point.
+  """
+  wins, draws, losses = wins + 0.5, draws + 0.5, losses + 0.5
+  games = wins + draws + losses
+  score = (wins + draws / 2) / games
+  return score, (wins + draws / 4) / games - score ** 2, games
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+  """
+  The log likelihood ratio of elo1 against elo0 for engine 1's results, with the normal approximation of the
+  trinomial (win/draw/loss) model.
+  """
+  if not wins + draws + losses:
+    return 0.0
+  score, variance, games = get_match_score(wins, draws, losses)
+  score0, score1 = expected_score(elo0), expected_score(elo1)
+  return (score1 - score0) * (2 * score - score0 - score1) / (2 * variance / games)
+
+
+class MatchResult(object):
+  """
+  The running score of engine 1 against engine 2, and its SPRT and Elo estimate.
+  """
+  def __init__(self, elo0, elo1, alpha, beta):
+    self.wins = self.draws = self.losses = 0
+    self.elo0, self.elo1 = elo0, elo1
+    self.lower_bound = math.log(beta / (1 - alpha))
+    self.upper_bound = math.log((1 - beta) / alpha)
+
+  def add(self, result, engine1_white):
+    if result == "1/2-1/2":
+      self.draws += 1
+    elif (result == "1-0") == engine1_white:
+      self.wins += 1
+    else:
+      self.losses += 1
+
+  def games(self):
+    return self.wins + self.draws + self.losses
+
+  def llr(self):
+    return sprt_llr(self.wins, self.draws, self.losses, self.elo0, self.elo1)
+
+  def decision(self):
+    llr = self.llr()
+    if llr >= self.upper_bound:
+      return "H1"
+    if llr <= self.lower_bound:
+      return "H0"
+    return None
+
+  def elo(self):
+    """
+    Engine 1's Elo difference to engine 2, and its 95% confidence interval.
+    """
+    score, variance, games = get_match_score(self.wins, self.draws, self.losses)
+    deviation = math.sqrt(variance / games)
+    return get_elo(score), get_elo(score - 1.96 * deviation), get_elo(score + 1.96 * deviation)
+
+  def to_dict(self):
+    elo, elo_low, elo_high = self.elo() if self.games() else (0, 0, 0)
+    return {
+      "games": self.games(), "wins": self.wins, "draws": self.draws, "losses": self.losses,
+      "elo": round(elo, 1), "elo_95": [round(elo_low, 1), round(elo_high, 1)],
+      "sprt": {"elo0": self.elo0, "elo1": self.elo1, "llr": round(self.llr(), 3),
+               "bounds": [round(self.lower_bound, 3), round(self.upper_bound, 3)], "decision": self.decision()},
+    }
+
+
+def format_pgn(round_number, white, black, result, termination, moves):
+  headers = [("Event", "Engine match"), ("Round", round_number), ("White", white), ("Black", black),
+             ("Result", result), ("Termination", termination)]
+  lines = [f'[{name} "{value}"]' for name, value in headers]
+  movetext = []
+  for ply, move in enumerate(moves):
+    if ply % 2 == 0:
+      movetext.append(f"{ply // 2 + 1}.")
+    movetext.append(move)
+  movetext.append(result)
+  return "\n".join(lines) + "\n\n" + " ".join(movetext) + "\n\n"
+
+
+def load_openings(path, plies):
+  if not path:
+    return [opening.split() for opening in OPENINGS]
+  return [pgn_game.moves[:plies] for pgn_game in read_games(path)]
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Play two engine configurations against each other.")
+  parser.add_argument("--engine1", default="depth=3", help='the engine under test, e.g. "depth=3"')
+  parser.add_argument("--engine2", default="depth=2", help="the engine it is compared with")
+  parser.add_argument("--games", type=int, default=2 * len(OPENINGS), help="the most games to play")
+  parser.add_argument("--openings", help="a PGN file whose games are the openings (default: a built in suite)")
+  parser.add_argument("--opening-plies", type=int, default=8, help="plies played from every PGN opening")
+  parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes playing games in parallel")
+  parser.add_argument("--elo0", type=float, default=0, help="SPRT: Elo difference of the null hypothesis")
+  parser.add_argument("--elo1", type=float, default=10, help="SPRT: Elo difference of the alternative hypothesis")
+  parser.add_argument("--alpha", type=float, default=0.05, help="SPRT: false positive rate")
+  parser.add_argument("--beta", type=float, default=0.05, help="SPRT: false negative rate")
+  parser.add_argument("--pgn", default="match.pgn", help="the PGN file the games are written to")
+  parser.add_argument("--summary", default="match.json", help="the JSON file the match summary is written to")
+  args = parser.parse_args()
+
+  configs = (parse_engine(args.engine1), parse_engine(args.engine2))
+  openings = load_openings(args.openings, args.opening_plies)
+  # every opening is played twice in a row, once with each engine as white
+  tasks = [(number + 1, openings[number // 2 % len(openings)], number % 2, configs) for number in range(args.games)]
+
+  match = MatchResult(args.elo0, args.elo1, args.alpha, args.beta)
+  with open(args.pgn, "w") as pgn, Pool(args.workers) as pool:
+    for round_number, white, result, termination, moves in pool.imap_unordered(play_game, tasks):
+      names = (f"engine1 ({args.engine1})", f"engine2 ({args.engine2})")
+      pgn.write(format_pgn(round_number, names[white], names[1 - white], result, termination, moves))
+      pgn.flush()
+
+      match.add(result, white == 0)
+      print(f"game {round_number}: {result} ({termination}), engine1 +{match.wins} ={match.draws} -{match.losses}, "
+            f"LLR {match.llr():.2f}", file=sys.stderr)
+      # leaving the with block terminates the games still being played
+      if match.decision():
+        break
+
+  summary = {"engine1": args.engine1, "engine2": args.engine2, **match.to_dict()}
+  with open(args.summary, "w") as f:
+    json.dump(summary, f, indent=2)
+  print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -1,9 +1,5 @@
 from pieces.piece import Piece
-import pygame
 
-white_bishop = pygame.image.load("pieces/assets/White_Bishop.png")
-black_bishop = pygame.image.load("pieces/assets/Black_Bishop.png")
-bishops = [white_bishop, black_bishop]
 
 # Piece Square Table
 white_bishop_eval_table = [
@@ -1,12 +1,7 @@
 from pieces.piece import Piece
 from pieces.rook import Rook
-import pygame
 
 
-white_king = pygame.image.load("pieces/assets/White_King.png")
-black_king = pygame.image.load("pieces/assets/Black_King.png")
-kings = [white_king, black_king]
-
 # Piece Square Table
 white_king_eval_table = [
   -30, -40, -40, -50, -50, -40, -40, -30,
@@ -21,6 +16,20 @@ white_king_eval_table = [
 
 black_king_eval_table = white_king_eval_table[::-1]
 
+# Used instead of the table above as pieces come off the board, see Computer.get_king_value
+white_king_endgame_eval_table = [
+  -50, -40, -30, -20, -20, -30, -40, -50,
+  -30, -20, -10, 0, 0, -10, -20, -30,
+  -30, -10, 20, 30, 30, 20, -10, -30,
+  -30, -10, 30, 40, 40, 30, -10, -30,
+  -30, -10, 30, 40, 40, 30, -10, -30,
+  -30, -10, 20, 30, 30, 20, -10, -30,
+  -30, -30, 0, 0, 0, 0, -30, -30,
+  -50, -30, -30, -30, -30, -30, -30, -50
+]
+
+black_king_endgame_eval_table = white_king_endgame_eval_table[::-1]
+
 
 class King(Piece):
   def __init__(self, row, col, color):
@@ -52,13 +61,13 @@ class King(Piece):
 
     if self.can_castle and not self.is_checked:
       # Queenside Castle
-      if all(board[self.row][self.col - i] == 0 for i in range(1, 3)):
+      if all(board[self.row][self.col - i] == 0 for i in range(1, 4)):
         rook = board[self.row][self.col - 4]
         if isinstance(rook, Rook) and rook.can_castle:
           moves.append((self.row, self.col - 4))
 
       # Kingside Castle
-      if all(board[self.row][self.col + i] == 0 for i in range(1, 2)):
+      if all(board[self.row][self.col + i] == 0 for i in range(1, 3)):
         rook = board[self.row][self.col + 3]
         if isinstance(rook, Rook) and rook.can_castle:
           moves.append((self.row, self.col + 3))
@@ -1,9 +1,5 @@
 from pieces.piece import Piece
-import pygame
 
-white_knight = pygame.image.load("pieces/assets/White_Knight.png")
-black_knight = pygame.image.load("pieces/assets/Black_Knight.png")
-knights = [white_knight, black_knight]
 
 # Piece Square Table
 white_knight_eval_table = [
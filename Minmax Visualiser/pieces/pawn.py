@@ -1,9 +1,5 @@
 from pieces.piece import Piece
-import pygame
 
-white_pawn = pygame.image.load("pieces/assets/White_Pawn.png")
-black_pawn = pygame.image.load("pieces/assets/Black_Pawn.png")
-pawns = [white_pawn, black_pawn]
 
 # Piece Square Table
 white_pawn_eval_table = [
@@ -24,15 +20,14 @@ class Pawn(Piece):
   def __init__(self, row, col, color, direction):
     super().__init__(row, col, color)
     self.direction = direction
-    self.vulnerable_to_en_passant = False
     self.valid_moves = []
     self.letter = "P"
 
-  def update_valid_moves(self, board, move_log):
-    self.valid_moves = self.get_valid_moves(board, move_log)
+  def update_valid_moves(self, board, en_passant_target=None):
+    self.valid_moves = self.get_valid_moves(board, en_passant_target)
     return self.valid_moves
 
-  def get_valid_moves(self, board, move_log):
+  def get_valid_moves(self, board, en_passant_target=None):
     moves = []
 
     # Direction mapping for Up and Down
@@ -58,17 +53,10 @@ class Pawn(Piece):
         if target != 0 and target.color != self.color:
           moves.append((new_row, new_col))
 
-    # En Passant
-    if move_log:
-      for dx in [-1, 1]:
-        new_col = self.col + dx
-        if 0 <= new_col < 8:
-          adjacent = board[self.row][new_col]
-          if isinstance(adjacent, Pawn) and adjacent.color != self.color and adjacent.vulnerable_to_en_passant \
-          and new_col == self.get_row(move_log[-1][0]) and self.row == abs(int(move_log[-1][-1]) - 8):
-            moves.append((self.row + move, new_col))
+    # En Passant, onto the square skipped by the enemy pawn that just moved 2 squares beside this one
+    if en_passant_target and en_passant_target[0] == self.row + move and abs(en_passant_target[1] - self.col) == 1:
+      adjacent = board[self.row][en_passant_target[1]]
+      if isinstance(adjacent, Pawn) and adjacent.color != self.color:
+        moves.append(en_passant_target)
 
     return moves
-
-  def get_row(self, letter):
-    return {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}.get(letter)
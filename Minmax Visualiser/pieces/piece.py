@@ -9,6 +9,7 @@ class Piece(object):
     self.color = color
     self.selected = False
     self.valid_moves = []
+    self.list_index = -1
 
   def is_selected(self):
     return self.selected
@@ -1,11 +1,7 @@
 from pieces.piece import Piece
 from pieces.rook import Rook
 from pieces.bishop import Bishop
-import pygame
 
-white_queen = pygame.image.load("pieces/assets/White_Queen.png")
-black_queen = pygame.image.load("pieces/assets/Black_Queen.png")
-queens = [white_queen, black_queen]
 
 # Piece Square Table
 white_queen_eval_table = [
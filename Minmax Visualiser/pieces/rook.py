@@ -1,9 +1,4 @@
 from pieces.piece import Piece
-import pygame
-
-white_rook = pygame.image.load("pieces/assets/White_Rook.png")
-black_rook = pygame.image.load("pieces/assets/Black_Rook.png")
-rooks = [white_rook, black_rook]
 
 
 # Piece Square Table
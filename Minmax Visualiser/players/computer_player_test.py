@@ -1,28 +1,57 @@
-import pygame
+import os
 from pieces import pawn, knight, bishop, rook, queen, king
-from game.profiler import Profiler
-import requests
-import json
-import threading
-
-# Global variable to store the root of the minimax tree for visualization
-minimax_root_node = None
-
-def send_minimax_tree_to_webapp(tree_data):
-    try:
-        # Ensure the Flask server is running on http://127.0.0.1:5000
-        requests.post('http://127.0.0.1:5000/minimax_data', json=tree_data)
-        # print("Minimax tree data sent to web app.")
-    except requests.exceptions.ConnectionError:
-        print("Could not connect to the Flask server. Make sure it's running at http://127.0.0.1:5000")
-    except Exception as e:
-        print(f"Error sending minimax data: {e}")
+from game.profiler import Profiler, PROFILING_ENABLED
+from game.search_stats import SearchStats
+from game.eval_cache import EvalCache
+from game.pawn_structure import evaluate_pawn_structure
+from game.search_control import SearchControl, SearchLimits, SearchAborted
+from game.frontier_eval import FrontierEvaluator, FRONTIER_EVAL_AVAILABLE
+from game.position_store import get_position_store, POSITION_STORE_MIN_DEPTH
+from game.zobrist import ZobristHashing
+from game.tree_capture import TreeCapture, FLAG_PRUNED, FLAG_TT_CUTOFF
+from game.tree_stream import TreePublisher
+from game.snapshot_queue import SnapshotQueue
+from game.constants import MAX_PHASE
+from game.attack_map import is_square_attacked
+from game.moves import (QUIET, DOUBLE_PAWN_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EP_CAPTURE, PROMOTION,
+                        PROMOTE_TO_QUEEN, move_to_string)
+import uuid
+
+# The bounded minimax tree capture for the web visualizer can be switched off with CHESS_TREE_CAPTURE=0
+TREE_CAPTURE_ENABLED = os.environ.get("CHESS_TREE_CAPTURE", "1") != "0"
+
+# How many of the best lines (principal variations) a search reports, set with CHESS_MULTI_PV for analysis
+MULTI_PV = max(1, int(os.environ.get("CHESS_MULTI_PV", "1")))
+
+# Transposition table entry flags, and the table size at which it is cleared
+TT_EXACT, TT_LOWER_BOUND, TT_UPPER_BOUND = 0, 1, 2
+TT_MAX_ENTRIES = 1 << 20
+
+# Checkmate scores MATE_SCORE minus the plies from the root to the mate, so a quicker mate scores higher. Scores
+# beyond MATE_BOUND are mates, which the transposition table stores relative to their position instead of the root.
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000
+
+# Search listeners receive a "progress" event every 4096 nodes
+PROGRESS_INTERVAL_MASK = 4096 - 1
+
+# Depth 1 nodes score all their children at once with NumPy, when it is installed (see game/frontier_eval.py).
+# CHESS_FRONTIER_EVAL=0 scores every leaf on its own instead.
+FRONTIER_EVAL_ENABLED = os.environ.get("CHESS_FRONTIER_EVAL", "1") == "1" and FRONTIER_EVAL_AVAILABLE
+
+# Pawn structures kept by the pawn cache; far fewer than positions, since pawns and kings move rarely
+PAWN_CACHE_MAX_ENTRIES = 1 << 14
+
+# Promotions are searched queen first
+PROMOTION_ORDER = (PROMOTE_TO_QUEEN, 0, 2, 1)
 
 
 class Computer(object):
   WHITE = "White"
   BLACK = "Black"
 
+  PROMOTION_TYPES = (knight.Knight, bishop.Bishop, rook.Rook, queen.Queen)
+
   # Piece Evaluations from https://www.chessprogramming.org/Simplified_Evaluation_Function
   PIECE_TYPES = (pawn.Pawn, knight.Knight, bishop.Bishop, rook.Rook, queen.Queen, king.King)
   PIECE_EVALUATION_TABLES = {
@@ -40,12 +69,22 @@ class Computer(object):
     (BLACK, "Queen"): (900, queen.black_queen_eval_table),
     (BLACK, "King"): (20000, king.black_king_eval_table),
   }
+  KING_ENDGAME_EVALUATION_TABLES = {
+    WHITE: king.white_king_endgame_eval_table,
+    BLACK: king.black_king_endgame_eval_table,
+  }
 
   def __init__(self, color, initial_depth=0):
     self.profiler = Profiler()
     self.color = color
+    self.zobrist = ZobristHashing(8, 8, [piece_type.__name__ for piece_type in self.PIECE_TYPES], (self.WHITE, self.BLACK))
     self.transposition_table = {}
     self.piece_value_cache = {}
+    self.eval_cache = EvalCache()
+    self.pawn_cache = EvalCache(PAWN_CACHE_MAX_ENTRIES)
+    # the FrontierEvaluator's tables are made by the first search that uses them
+    self.frontier_eval = FRONTIER_EVAL_ENABLED
+    self.frontier = None
     self.initial_depth = initial_depth
 
     # These values provide the user valuable information about the current state of the minimax search
@@ -53,76 +92,415 @@ class Computer(object):
     self.total_moves_found = 0
     self.current_best_evaluation = 0
 
-  def minimax(self, board, game, depth, alpha, beta, max_player, node_data=None):
+    # The best lines of the last finished iteration as (score, moves), best first; replaced as a whole so the main
+    # thread can read it while searching
+    self.multi_pv = MULTI_PV
+    self.principal_variations = []
+
+    # Positions published for the Visualize AI feature, played back by the main thread
+    self.snapshots = SnapshotQueue()
+
+    # Statistics of the current (or last) search, callables notified while searching, and an optional JSONL log
+    self.stats = None
+    self.search_listeners = []
+    # The default limits of a search (only a depth unless a difficulty level sets budgets), enforced by control
+    self.limits = SearchLimits(initial_depth)
+    self.control = SearchControl()
+    self.stats_log_path = os.environ.get("CHESS_SEARCH_STATS_LOG")
+
+    # An optional SQLite file of deep search results shared across sessions, set with CHESS_POSITION_STORE. Entries of
+    # at least persist_depth plies are collected in persisted_entries and handed to the store after every search.
+    self.position_store = None
+    self.persist_depth = float("inf")
+    self.persisted_entries = []
+    if os.environ.get("CHESS_POSITION_STORE"):
+      self.open_position_store(os.environ["CHESS_POSITION_STORE"])
+
+    # Bounded capture of the searched tree, streamed to the web visualizer while searching and sent again when done
+    self.tree_capture = TreeCapture() if TREE_CAPTURE_ENABLED else None
+    if self.tree_capture:
+      self.add_search_listener(TreePublisher(self.tree_capture))
+
+  def open_position_store(self, path):
+    """
+    Warms the transposition table with the deepest positions of the store at path, and saves deep results to it.
+    """
+    self.position_store = get_position_store(path)
+    self.persist_depth = POSITION_STORE_MIN_DEPTH
+    self.transposition_table.update(self.position_store.load())
+
+  def search(self, board, game, depth=None, limits=None):
+    """
+    Iterative deepening around minimax: searches to depth 1, 2, ... up to depth, so that every iteration can order its
+    moves with the transposition table entries left by the previous one. Returns (best_score, best_move, stats).
+    limits (default self.limits) can end the search earlier; depth, if given, replaces their depth. The move of the
+    deepest finished iteration is returned, and the first iteration always finishes unless the search is stopped with
+    self.control.stop(). best_move is None when the side to move is checkmated or stalemated, or was stopped before
+    it searched a root move.
+    """
+    limits = limits or self.limits
+    depth = depth if depth is not None else limits.depth
+    stats = SearchStats(self.color, depth)
+    self.stats = stats
+    self.control.start(limits)
+
+    board.hash = self.zobrist.calculate_hash(board)
+    if self.color == self.BLACK:
+      board.hash ^= self.zobrist.black_to_move
+    if board.en_passant_target:
+      board.hash ^= self.zobrist.en_passant[board.en_passant_target[1]]
+    board.pawn_hash = self.zobrist.calculate_pawn_hash(board)
+
+    if len(self.transposition_table) >= TT_MAX_ENTRIES:
+      self.transposition_table.clear()
+
+    self.snapshots.clear()
+    self.eval_cache.reset_counters()
+    search_id = uuid.uuid4().hex[:12]
+    best_score, best_move = None, None
+    start_ply = board.undo_stack.ply
+    try:
+      for current_depth in range(1, depth + 1):
+        self.initial_depth = current_depth
+        stats.start_iteration(current_depth)
+        # only the tree of the deepest iteration is kept
+        root = self.tree_capture.reset(search_id, self.color == self.WHITE, current_depth) if self.tree_capture else -1
+        score, move = self.minimax(board, game, current_depth, float("-inf"), float("inf"), self.color, root)
+        best_move_changed = move != best_move
+        if move is not None:
+          best_score, best_move = score, move
+          self.principal_variations = self.search_lines(board, game, current_depth, score, move)
+          self.current_best_evaluation = score
+          stats.lines = [{"score": line_score, "pv": [self.format_move(line_move) for line_move in line]}
+                         for line_score, line in self.principal_variations]
+        else:
+          # checkmate or stalemate: there is no move to search deeper
+          best_score = score
+        stats.end_iteration(current_depth, score, self.format_move(move))
+        self.notify_search_listeners("iteration")
+        if move is None or not self.control.iteration_done(stats.nodes, best_move_changed):
+          break
+    except SearchAborted:
+      # the unfinished iteration is dropped; its moves are still on the board
+      undo = board.undo_stack
+      while undo.ply > start_ply:
+        self.undo_move(board, game, undo.moves[undo.ply - 1])
+      stats.aborted = True
+      # a search stopped during its first iteration plays the best root move that iteration found so far
+      if best_move is None and stats.root_move is not None:
+        best_score, best_move = stats.root_score, stats.root_move
+
+    if self.position_store:
+      self.position_store.save(self.persisted_entries)
+      self.persisted_entries = []
+
+    stats.eval_cache_hits = self.eval_cache.hits
+    stats.eval_cache_misses = self.eval_cache.misses
+    stats.finish()
+    self.notify_search_listeners("done")
+    if self.stats_log_path:
+      stats.append_to_log(self.stats_log_path)
+
+    return best_score, best_move, stats
+
+  def search_lines(self, board, game, depth, best_score, best_move):
+    """
+    Multi-PV: after the root search found best_move, the root is searched again without the moves of the lines found
+    so far until there are multi_pv lines. The searches share the transposition table, so every search after the
+    first mostly finds its positions already there. Returns [(score, principal variation)], best first.
+    """
+    lines = [(best_score, self.get_principal_variation(board, game, best_move, depth))]
+    excluded_moves = [best_move]
+    while len(lines) < self.multi_pv:
+      score, move = self.minimax(board, game, depth, float("-inf"), float("inf"), self.color,
+                                 excluded_moves=excluded_moves)
+      if move is None:
+        break
+      lines.append((score, self.get_principal_variation(board, game, move, depth)))
+      excluded_moves.append(move)
+    return lines
+
+  def get_principal_variation(self, board, game, move, depth):
+    """
+    The line starting with move that the search expects, read from the best moves in the transposition table.
+    """
+    line = [move]
+    self.simulate_move(board, game, move)
+    color = self.BLACK if self.color == self.WHITE else self.WHITE
+    while len(line) < depth:
+      entry = self.transposition_table.get(board.hash)
+      # a stale entry (from a hash collision or an older search) may hold a move that is not possible here
+      if entry is None or entry[3] not in self.get_all_moves(board, game, color):
+        break
+      line.append(entry[3])
+      self.simulate_move(board, game, entry[3])
+      color = self.BLACK if color == self.WHITE else self.WHITE
+
+    for played in reversed(line):
+      self.undo_move(board, game, played)
+    return line
+
+  def add_search_listener(self, listener):
+    """
+    Registers listener(event, stats), called from the search thread with the events "progress", "iteration" and "done".
+    On "progress" stats has the depth being searched, the nodes so far, the best move of the deepest finished iteration
+    (best_move) and the best root move of the current one yet (root_move).
+    """
+    self.search_listeners.append(listener)
+
+  def remove_search_listener(self, listener):
+    self.search_listeners.remove(listener)
+
+  def notify_search_listeners(self, event):
+    for listener in self.search_listeners:
+      listener(event, self.stats)
+
+  def format_move(self, move):
+    return move_to_string(move) if move is not None else None
+
+  def minimax(self, board, game, depth, alpha, beta, max_player, node=-1, excluded_moves=None):
     """
     Implements the Minimax algorithm to calculate the move that would maximize the AI's positional evaluation.
     Includes alpha-beta pruning to reduce the size of the search tree and reduce redundant computations.
+    node is this position's index in the tree capture, or -1 if it is not captured. excluded_moves are root moves
+    that are not searched (see search_lines).
     """
-    global minimax_root_node
+    if PROFILING_ENABLED:
+      self.profiler.count_node(self.initial_depth - depth)
 
-    if node_data is None:
-        # This is the root call, initialize the tree structure
-        node_data = {"move": "Root", "evaluation": None, "pruned": False, "children": []}
-        minimax_root_node = node_data
+    stats = self.stats
+    stats.nodes += 1
+    if stats.nodes >= self.control.next_check:
+      self.control.check(stats.nodes)
+    if self.search_listeners and not stats.nodes & PROGRESS_INTERVAL_MASK:
+      self.notify_search_listeners("progress")
 
+    capture = self.tree_capture
     if depth == 0 or game.game_over():
       evaluation = self.evaluate_board(board)
-      node_data["evaluation"] = evaluation
-      return evaluation, board
+      if node >= 0:
+        capture.set_score(node, evaluation)
+      return evaluation, None
+
+    # Mate distance pruning: a mate found closer to the root scores better than any mate from here can, so the window
+    # is narrowed to the scores still possible at this ply (https://www.chessprogramming.org/Mate_Distance_Pruning)
+    ply = self.initial_depth - depth
+    if ply > 0:
+      if max_player == self.WHITE:
+        alpha, beta = max(alpha, ply - MATE_SCORE), min(beta, MATE_SCORE - ply - 1)
+      else:
+        alpha, beta = max(alpha, ply + 1 - MATE_SCORE), min(beta, MATE_SCORE - ply)
+      if alpha >= beta:
+        if node >= 0:
+          capture.set_score(node, alpha, FLAG_PRUNED)
+        return alpha, None
+
+    # Probe the transposition table. Its move is searched first, and at inner nodes a deep enough entry can
+    # end the search of this position right away (the root always searches, because it has to return a move).
+    is_root = depth == self.initial_depth
+    original_alpha, original_beta = alpha, beta
+    tt_move = None
+    stats.tt_probes += 1
+    entry = self.transposition_table.get(board.hash)
+    if entry is not None:
+      stats.tt_hits += 1
+      entry_depth, entry_score, entry_flag, tt_move = entry
+      entry_score = self.score_from_table(entry_score, ply)
+      if entry_depth >= depth and not is_root:
+        if entry_flag == TT_EXACT:
+          alpha = beta = entry_score
+        elif entry_flag == TT_LOWER_BOUND:
+          alpha = max(alpha, entry_score)
+        else:
+          beta = min(beta, entry_score)
+
+        if beta <= alpha:
+          stats.tt_cutoffs += 1
+          if node >= 0:
+            capture.set_score(node, entry_score, FLAG_TT_CUTOFF)
+          return entry_score, None
 
     best_move = None
     best_score = float("-inf") if max_player == self.WHITE else float("inf")
     other_player = self.BLACK if max_player == self.WHITE else self.WHITE
+    squares = board.board
+    king = board.get_king(max_player)
+    in_check = king is not None and is_square_attacked(squares, king.row, king.col, other_player)
+    legal_moves = 0
 
     all_moves = self.get_all_moves(board, game, max_player)
     # Only update total_moves_found for the root call
-    if depth == self.initial_depth:
+    if is_root:
         self.total_moves_found += len(all_moves)
 
-    for piece, move in all_moves:
-      child_node_data = {
-          "move": f"{piece.letter}{piece.col}{piece.row}->{move[1]}{move[0]}",
-          "evaluation": None,
-          "pruned": False,
-          "children": []
-      }
-      node_data["children"].append(child_node_data)
+    if excluded_moves:
+      all_moves = [move for move in all_moves if move not in excluded_moves]
+
+    if tt_move is not None and tt_move in all_moves:
+      all_moves.remove(tt_move)
+      all_moves.insert(0, tt_move)
+
+    # The children of a depth 1 node are all leaves, which can be scored at once without making their moves. They are
+    # then searched best first, so only the moves up to the first legal one are made.
+    frontier_scores = None
+    if depth == 1 and self.frontier_eval and node < 0 and not is_root:
+      frontier = self.evaluate_frontier(board, game, all_moves, max_player)
+      if frontier is not None:
+        all_moves, frontier_scores, pending = frontier
+
+    for move_index, move in enumerate(all_moves):
+      child = -1
+      if frontier_scores is not None:
+        current_score = frontier_scores[move_index]
+        if pending[move_index] is not None:
+          current_score = self.resolve_frontier_score(board, game, move, current_score, pending[move_index])
+        # only a child that would become the best move has to be made
+        if current_score <= best_score if max_player == self.WHITE else current_score >= best_score:
+          continue
+        if not self.make_legal_move(board, game, move, king, in_check, other_player):
+          continue
+        legal_moves += 1
+        stats.nodes += 1
+        if stats.nodes >= self.control.next_check:
+          self.control.check(stats.nodes)
+        if self.search_listeners and not stats.nodes & PROGRESS_INTERVAL_MASK:
+          self.notify_search_listeners("progress")
+        self.draw_AI_calculations(game, move, board)
+        self.undo_move(board, game, move)
+      else:
+        if not self.make_legal_move(board, game, move, king, in_check, other_player):
+          continue
+        legal_moves += 1
+        child = capture.add_node(node, move) if node >= 0 else -1
 
-      position = self.simulate_move(piece, board, game, move, max_player)
-      self.draw_AI_calculations(game, piece, position)
-      current_score, _ = self.minimax(position, game, depth - 1, alpha, beta, other_player, child_node_data)
-      self.undo_move(board, game)
+        self.draw_AI_calculations(game, move, board)
+        current_score, _ = self.minimax(board, game, depth - 1, alpha, beta, other_player, child)
+        self.undo_move(board, game, move)
 
       if max_player == self.WHITE:
         if current_score > best_score:
           best_score = current_score
-          best_move = (piece, move)
+          best_move = move
           alpha = max(alpha, best_score)
 
       if max_player == self.BLACK:
         if current_score < best_score:
           best_score = current_score
-          best_move = (piece, move)
+          best_move = move
           beta = min(beta, best_score)
 
       self.current_best_evaluation = best_score
-      child_node_data["evaluation"] = current_score
+      if is_root and best_move is move and not excluded_moves:
+        stats.root_move, stats.root_score = move, best_score
 
       # if beta <= alpha, it means that the maximizing player already has a move with a better outcome than the current branch's best possible outcome
       # this means that we can can prune this branch to reduce unneccessary computations since we know that the maximizing player will never choose this branch
       # ASIDE: alpha-beta pruning assumes that both players are making optimal moves to maximize or minimize their respective scores
       if beta <= alpha:
-        child_node_data["pruned"] = True
+        if child >= 0:
+          capture.mark(child, FLAG_PRUNED)
+        stats.cutoffs += 1
+        if legal_moves == 1:
+          stats.first_move_cutoffs += 1
         break
 
-    node_data["evaluation"] = best_score
-    
-    if depth == self.initial_depth: # This is the top-level call
-        # Send the entire minimax tree to the web app in a separate thread
-        threading.Thread(target=send_minimax_tree_to_webapp, args=(minimax_root_node,)).start()
+    # Without a legal move the side to move is checkmated, or it is stalemate. Excluded root moves (see search_lines)
+    # can leave no moves to search in a position that has them.
+    if not legal_moves and not excluded_moves:
+      best_score = 0
+      if in_check:
+        best_score = ply - MATE_SCORE if max_player == self.WHITE else MATE_SCORE - ply
+
+    if node >= 0:
+      capture.set_score(node, best_score)
+
+    # the best move of a root search without some moves isn't the best move of the position
+    if (best_move is not None or not legal_moves) and not excluded_moves:
+      if best_score <= original_alpha:
+        flag = TT_UPPER_BOUND
+      elif best_score >= original_beta:
+        flag = TT_LOWER_BOUND
+      else:
+        flag = TT_EXACT
+      # moves are stored by square, so entries stay valid when the piece objects are recreated
+      entry = (depth, self.score_to_table(best_score, ply), flag, best_move)
+      self.transposition_table[board.hash] = entry
+      if depth >= self.persist_depth:
+        self.persisted_entries.append((board.hash, entry))
 
     return best_score, best_move
 
+  def make_legal_move(self, board, game, move, king, in_check, other_player):
+    """
+    Makes move unless it is illegal, and returns whether it was made. get_all_moves doesn't know about checks: the king
+    may not castle out of or through check, and moves that leave the king attacked are taken back after they are made.
+    """
+    squares = board.board
+    flags = move >> 12
+    if flags == KING_CASTLE or flags == QUEEN_CASTLE:
+      if in_check or is_square_attacked(squares, king.row, 5 if flags == KING_CASTLE else 3, other_player):
+        return False
+
+    self.simulate_move(board, game, move)
+    if king is not None and is_square_attacked(squares, king.row, king.col, other_player):
+      self.undo_move(board, game, move)
+      return False
+    return True
+
+  def evaluate_frontier(self, board, game, moves, max_player):
+    """
+    Scores all the children of a depth 1 node at once (see game/frontier_eval.py), from the position and the moves
+    alone. The scores are the ones calculate_evaluation gives, except for the pending children whose pawn structure
+    isn't cached yet (see resolve_frontier_score). Returns (moves, scores, pending) best first for max_player, with
+    the moves still pseudo-legal, or None for the usual search when a king is missing.
+    """
+    if not moves:
+      return moves, [], []
+    white_king, black_king = board.get_king(self.WHITE), board.get_king(self.BLACK)
+    if white_king is None or black_king is None:
+      return None
+
+    frontier = self.frontier
+    if frontier is None:
+      frontier = self.frontier = FrontierEvaluator(self.PIECE_EVALUATION_TABLES, self.KING_ENDGAME_EVALUATION_TABLES,
+                                                   (self.WHITE, self.BLACK), self.zobrist.zobrist_table)
+    position = frontier.get_position(board, (self.WHITE, self.BLACK))
+    kings = (white_king.row * 8 + white_king.col, black_king.row * 8 + black_king.col)
+    order, scores, pending = frontier.evaluate(position, moves, kings, board.material.phase_weight, board.pawn_hash,
+                                               self.get_pawn_structure(board), self.pawn_cache, max_player == self.WHITE)
+    return [moves[index] for index in order], [scores[index] for index in order], [pending[index] for index in order]
+
+  def resolve_frontier_score(self, board, game, move, score, pending):
+    """
+    The score of a frontier child whose pawn structure evaluate_frontier didn't have, and scored with its parent's
+    instead. pending is (the child's pawn hash, its phase, the parent's pawn structure).
+    """
+    pawn_hash, phase, parent_structure = pending
+    self.simulate_move(board, game, move)
+    structure = evaluate_pawn_structure(board)
+    self.undo_move(board, game, move)
+    self.pawn_cache.put(pawn_hash, structure)
+    return (score - parent_structure[0] - parent_structure[1] * phase // MAX_PHASE
+            + structure[0] + structure[1] * phase // MAX_PHASE)
+
+  def score_to_table(self, score, ply):
+    """
+    Mate scores count the plies from the root, but a position can be reached at any ply: the transposition table
+    keeps them as the plies from the position itself.
+    """
+    if score > MATE_BOUND:
+      return score + ply
+    if score < -MATE_BOUND:
+      return score - ply
+    return score
+
+  def score_from_table(self, score, ply):
+    if score > MATE_BOUND:
+      return score - ply
+    if score < -MATE_BOUND:
+      return score + ply
+    return score
+
   def get_piece_value(self, piece):
     """
     Calculate the value of a piece using material and positional evaluation.
@@ -139,15 +517,38 @@ class Computer(object):
     self.piece_value_cache[piece_key] = piece_value
     return piece_value
 
+  def get_king_value(self, piece, phase):
+    """
+    The king's square table is tapered from the middlegame table to the endgame table as the material's game phase
+    goes down (https://www.chessprogramming.org/Tapered_Eval).
+    """
+    piece_material, middlegame_table = self.PIECE_EVALUATION_TABLES[(piece.color, "King")]
+    piece_index = (piece.row * 8) + piece.col
+    middlegame = middlegame_table[piece_index]
+    endgame = self.KING_ENDGAME_EVALUATION_TABLES[piece.color][piece_index]
+    return piece_material + (middlegame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+
   @Profiler.profile_function
   def evaluate_board(self, board):
     """
-    Evaluate the board state, considering material and positional advantages.
+    Evaluate the board state, considering material and positional advantages. Evaluations are cached by the board's
+    hash.
     """
-    position_eval = 0
-    for row in board.board:
-      for piece in row:
-        if not piece:
+    position_eval = self.eval_cache.get(board.hash)
+    if position_eval is None:
+      position_eval = self.calculate_evaluation(board)
+      self.eval_cache.put(board.hash, position_eval)
+    return position_eval
+
+  def calculate_evaluation(self, board):
+    phase = board.material.phase()
+    structure, shield = self.get_pawn_structure(board)
+    position_eval = structure + shield * phase // MAX_PHASE
+    for color in (self.WHITE, self.BLACK):
+      for piece in board.get_all_pieces(color):
+        if piece.type == "King":
+          king_value = self.get_king_value(piece, phase)
+          position_eval += king_value if color == self.WHITE else -king_value
           continue
 
         piece_key = (piece.color, piece.type, piece.row, piece.col)
@@ -161,28 +562,77 @@ class Computer(object):
 
     return position_eval
 
+  def get_pawn_structure(self, board):
+    """
+    The pawn structure terms (see game/pawn_structure.py), cached by the hash of the pawns and kings.
+    """
+    pawn_structure = self.pawn_cache.get(board.pawn_hash)
+    if pawn_structure is None:
+      pawn_structure = evaluate_pawn_structure(board)
+      self.pawn_cache.put(board.pawn_hash, pawn_structure)
+    return pawn_structure
+
+  def leaves_king_attacked(self, board, game, move, color):
+    """
+    Whether a move of color leaves color's king where the other side can capture it. get_all_moves doesn't check this.
+    """
+    self.simulate_move(board, game, move)
+    attacked = self.is_in_check(board, color)
+    self.undo_move(board, game, move)
+    return attacked
+
+  def is_in_check(self, board, color):
+    king = board.get_king(color)
+    opponent = self.BLACK if color == self.WHITE else self.WHITE
+    return king is not None and is_square_attacked(board.board, king.row, king.col, opponent)
+
   @Profiler.profile_function
   def get_all_moves(self, board, game, color):
     """
-    Generates all possible moves for each piece that the player owns.
+    Generates all possible moves for each piece that the player owns, as packed moves (see game/moves.py).
     """
     all_moves = []
     passive_moves = []
     moves_with_capture = []
+    squares = board.board
 
     for piece in board.get_all_pieces(color):
-      if isinstance(piece, pawn.Pawn):
-        piece.update_valid_moves(board.board, game.move_history.move_log)
+      is_pawn = isinstance(piece, pawn.Pawn)
+      if is_pawn:
+        piece.update_valid_moves(squares, board.en_passant_target)
       else:
-        piece.update_valid_moves(board.board)
+        piece.update_valid_moves(squares)
 
+      from_square = piece.row * 8 + piece.col
       for row, col in piece.valid_moves:
-        if board.board[row][col] != 0 and board.get_piece(row, col).color != color:
-          moves_with_capture.append((piece, (row, col)))
+        target = squares[row][col]
+        move = from_square | ((row * 8 + col) << 6)
+
+        if target != 0 and target.color == color:
+          # The king's valid moves mark castling by targeting its own rook; the move goes to the king's square
+          if col > piece.col:
+            passive_moves.append(from_square | ((piece.row * 8 + 6) << 6) | (KING_CASTLE << 12))
+          else:
+            passive_moves.append(from_square | ((piece.row * 8 + 2) << 6) | (QUEEN_CASTLE << 12))
+          continue
+
+        flags = QUIET if target == 0 else CAPTURE
+        if is_pawn:
+          if col != piece.col and target == 0:
+            flags = EP_CAPTURE
+          elif abs(row - piece.row) == 2:
+            flags = DOUBLE_PAWN_PUSH
+          elif row == 0 or row == 7:
+            moves = moves_with_capture if target != 0 else passive_moves
+            moves.extend(move | ((flags | PROMOTION | promotion) << 12) for promotion in PROMOTION_ORDER)
+            continue
+
+        if flags & CAPTURE:
+          moves_with_capture.append(move | (flags << 12))
         else:
-          passive_moves.append((piece, (row, col)))
+          passive_moves.append(move | (flags << 12))
 
-    moves_with_capture = self.order_moves(moves_with_capture, board.board)
+    moves_with_capture = self.order_moves(moves_with_capture, squares)
 
     # by using move ordering and putting moves where the AI captured a piece first, we evaluate the moves
     # that are likely to be the strongest earlier in the search tree, making alpha-beta pruning more efficient.
@@ -193,13 +643,16 @@ class Computer(object):
   @Profiler.profile_function
   def order_moves(self, moves, board):
     def mvv_lva(move):  # https://www.chessprogramming.org/MVV-LVA
-      piece, (targetRow, targetCol) = move
+      from_row, from_col = (move & 63) >> 3, move & 7
+      target_row, target_col = (move >> 9) & 7, (move >> 6) & 7
+      piece = board[from_row][from_col]
 
       piece_key = (piece.color, piece.type, piece.row, piece.col)
       if piece_key not in self.piece_value_cache:
         self.piece_value_cache[piece_key] = self.get_piece_value(piece)
-      
-      target = board[targetRow][targetCol]
+
+      # an en passant capture takes the pawn beside the moving pawn
+      target = board[target_row][target_col] or board[from_row][target_col]
       target_key = (target.color, target.type, target.row, target.col)
       if target_key not in self.piece_value_cache:
         self.piece_value_cache[target_key] = self.get_piece_value(target)
@@ -208,154 +661,233 @@ class Computer(object):
 
     return sorted(moves, key=mvv_lva, reverse=True)
 
-  def draw_AI_calculations(self, game, piece, board):
+  def draw_AI_calculations(self, game, move, board):
     """
-    If the user has enabled the visualize AI feature, show the current position that the AI is considering after every move.
+    If the user has enabled the visualize AI feature, publish the position that the AI is considering after every move.
+    The main thread plays the published positions back at the chosen speed, so the search itself never waits.
     """
     self.moves_evaluated += 1
 
-    if not game.board.show_AI_calculations:
+    # game is usually the search's private copy, the setting is read from the game in the window
+    if not game.live_game.board.show_AI_calculations:
       return
 
-    if game.board.AI_speed == "Medium":
-      pygame.time.delay(20)
-    elif game.board.AI_speed == "Slow":
-      pygame.time.delay(50)
-
-    self.draw_moves(piece, game, board)
+    from_square, to_square = move & 63, (move >> 6) & 63
+    self.snapshots.publish(board, [(from_square >> 3, from_square & 7), (to_square >> 3, to_square & 7)])
 
   @Profiler.profile_function
-  def simulate_move(self, piece, board, game, move, color):
+  def simulate_move(self, board, game, move):
     """
-    Simulates a move on the board.
+    Makes a packed move on the board, updating the board's Zobrist hash incrementally. What undo_move needs is
+    written into the board's preallocated undo stack, so making a move allocates nothing.
     """
-    target = board.get_piece(move[0], move[1])
-
-    board.prev_square = (piece.row, piece.col)
-    board.piece = piece
-    board.target = (move[0], move[1])
+    undo = board.undo_stack
+    ply = undo.ply
+    undo.ply = ply + 1
+    undo.moves[ply] = move
+
+    flags = move >> 12
+    from_row, from_col = (move & 63) >> 3, move & 7
+    to_row, to_col = (move >> 9) & 7, (move >> 6) & 7
+    squares = board.board
+    piece = squares[from_row][from_col]
+    zobrist = self.zobrist
 
     # Save state for undoing the move
-    board.stored_moves.append({
-      'piece': piece,
-      'from': board.prev_square,
-      'to': move,
-      'captured': target,
-      'can_castle': getattr(piece, 'can_castle', None),
-      'en_passant_target': game.en_passant_target,
-      'half_moves': game.half_moves,
-      'full_moves': game.full_moves
-    })
+    en_passant_target = board.en_passant_target
+    undo.moved[ply] = piece
+    undo.captured[ply] = 0
+    undo.castling[ply] = getattr(piece, 'can_castle', False)
+    undo.en_passant[ply] = en_passant_target[0] * 8 + en_passant_target[1] if en_passant_target else -1
+    undo.half_moves[ply] = game.half_moves
+    undo.full_moves[ply] = game.full_moves
+    undo.hash[ply] = board.hash
+    undo.pawn_hash[ply] = board.pawn_hash
 
     # Update game state based on the move
-    game.en_passant_target = None
+    board.en_passant_target = None
     game.half_moves += 1
     game.full_moves += 1
-
-    # Handle castling
-    if isinstance(piece, king.King) and abs(piece.col - move[1]) == 2:
-      rook_col = 7 if move[1] > piece.col else 0
-      new_rook_col = 5 if move[1] > piece.col else 3
-      rook = board.get_piece(piece.row, rook_col)
-      board.move(rook, piece.row, new_rook_col)
-      rook.can_castle = False
-
-    # Handle en passant
-    if isinstance(piece, pawn.Pawn) and abs(piece.row - move[0]) == 2:
-      game.en_passant_target = (move[0] + 1 if piece.color == "Black" else move[0] - 1, move[1])
-
-    elif isinstance(piece, pawn.Pawn) and move == game.en_passant_target:
-      captured_pawn_row = piece.row
-      if piece.color == "White":
-        captured_pawn_row += 1
-      else:
-        captured_pawn_row -= 1
-      board.board[captured_pawn_row][move[1]] = 0
-      board.material.add_to_captured_pieces(target, board.material.captured_black_pieces if target.color == "Black" else board.material.captured_white_pieces)
-
-    # Check for capture, reset half moves if capture occurs
-    if target != 0:
+    board_hash = board.hash ^ zobrist.black_to_move
+    if en_passant_target:
+      board_hash ^= zobrist.en_passant[en_passant_target[1]]
+    pawn_hash = board.pawn_hash
+
+    # Castling rights are lost when a king or rook that can castle moves, or such a rook is captured. Their keys are
+    # taken out here and the ones left are put back after the move.
+    target = squares[to_row][to_col]
+    castling_changes = undo.castling[ply] or (target != 0 and target.type == "Rook" and target.can_castle)
+    if castling_changes:
+      board_hash ^= zobrist.calculate_castling_hash(board)
+
+    # Handle castling by moving the rook; the king moves below like any other piece
+    if flags == KING_CASTLE or flags == QUEEN_CASTLE:
+      rook_col, rook_to_col = (7, 5) if flags == KING_CASTLE else (0, 3)
+      castling_rook = squares[from_row][rook_col]
+      undo.castling[ply] |= castling_rook.can_castle << 1
+      board_hash = zobrist.update_hash(board_hash, castling_rook, (from_row, rook_col), (from_row, rook_to_col))
+      squares[from_row][rook_col] = 0
+      castling_rook.move(from_row, rook_to_col)
+      squares[from_row][rook_to_col] = castling_rook
+      castling_rook.can_castle = False
+
+    # Check for capture, reset half moves if capture occurs. En passant captures the pawn beside the moving pawn.
+    elif flags & CAPTURE:
+      captured_row = from_row if flags == EP_CAPTURE else to_row
+      captured = squares[captured_row][to_col]
+      undo.captured[ply] = captured
+      board.remove_piece(captured)
+      board_hash = zobrist.update_hash(board_hash, captured, (captured_row, to_col), None)
+      if captured.type == "Pawn" or captured.type == "King":
+        pawn_hash = zobrist.update_hash(pawn_hash, captured, (captured_row, to_col), None)
       game.half_moves = 0
-      board.material.add_to_captured_pieces(target, board.material.captured_black_pieces if target.color == "Black" else board.material.captured_white_pieces)
 
     # Check for pawn move, reset half moves if pawn moves
-    if isinstance(piece, pawn.Pawn):
+    if piece.type == "Pawn":
       game.half_moves = 0
-
-    board.move(piece, move[0], move[1])
-    piece.has_moved = True
+      if flags == DOUBLE_PAWN_PUSH:
+        board.en_passant_target = ((from_row + to_row) // 2, to_col)
+        board_hash ^= zobrist.en_passant[to_col]
+
+    board_hash = zobrist.update_hash(board_hash, piece, (from_row, from_col), (to_row, to_col))
+    if piece.type == "Pawn" or piece.type == "King":
+      pawn_hash = zobrist.update_hash(pawn_hash, piece, (from_row, from_col), (to_row, to_col))
+    squares[from_row][from_col] = 0
+    piece.move(to_row, to_col)
+    squares[to_row][to_col] = piece
+
+    if flags & PROMOTION:
+      promoted = self.PROMOTION_TYPES[flags & 3](to_row, to_col, piece.color)
+      if promoted.type == "Rook":
+        # a new rook never castles; on the other side's corner the other king would take it for its own rook
+        promoted.can_castle = False
+      board.remove_piece(piece)
+      board.add_piece(promoted)
+      board_hash = zobrist.update_hash(board_hash, piece, (to_row, to_col), None)
+      board_hash = zobrist.update_hash(board_hash, promoted, None, (to_row, to_col))
+      pawn_hash = zobrist.update_hash(pawn_hash, piece, (to_row, to_col), None)
+
+    if piece.type == "Rook" or piece.type == "King":
+      piece.can_castle = False
+    if castling_changes:
+      board_hash ^= zobrist.calculate_castling_hash(board)
+
+    board.hash = board_hash
+    board.pawn_hash = pawn_hash
     return board
 
   @Profiler.profile_function
-  def undo_move(self, board, game):
-    # Restore previous move data
-    previous_move_data = board.stored_moves.pop()
-    piece = previous_move_data['piece']
-    from_pos = previous_move_data['from']
-    to_pos = previous_move_data['to']
-    captured_piece = previous_move_data['captured']
-    original_can_castle = previous_move_data['can_castle']
-    game.en_passant_target = previous_move_data['en_passant_target']
-    game.half_moves = previous_move_data['half_moves']
-    game.full_moves = previous_move_data['full_moves']
-
-    # Restore piece to its original position
-    board.board[from_pos[0]][from_pos[1]] = piece
-    board.board[to_pos[0]][to_pos[1]] = 0
-    piece.row, piece.col = from_pos[0], from_pos[1]
-
-    # Restore captured piece if any
-    if captured_piece != 0:
-      if isinstance(piece, pawn.Pawn) and to_pos == game.en_passant_target:
-        captured_pawn_row = piece.row
-        if piece.color == "White":
-          captured_pawn_row += 1
-        else:
-          captured_pawn_row -= 1
-        board.board[captured_pawn_row][to_pos[1]] = captured_piece
-      else:
-        board.board[to_pos[0]][to_pos[1]] = captured_piece
-
-    # Restore castling rights
-    if original_can_castle is not None:
-      piece.can_castle = original_can_castle
-
-    # Restore castling (move rook back)
-    if isinstance(piece, king.King) and abs(from_pos[1] - to_pos[1]) == 2:
-      if to_pos[1] == 6:  # Kingside castle
-        rook = board.get_piece(from_pos[0], 5)
-        board.move(rook, from_pos[0], 7)
-      elif to_pos[1] == 2:  # Queenside castle
-        rook = board.get_piece(from_pos[0], 3)
-        board.move(rook, from_pos[0], 0)
-
-    # Remove captured piece from material list
-    if captured_piece != 0:
-      if captured_piece.color == "Black":
-        board.material.captured_black_pieces.pop()
-      else:
-        board.material.captured_white_pieces.pop()
-
-    board.prev_square = None
-    board.piece = None
-    board.target = None
-
-  def draw_moves(self, piece, game, board):
+  def undo_move(self, board, game, move):
     """
-    This function was removed because it is only used for debugging the minimax algorithm.
+    Takes back the last move made by simulate_move, from the board's undo stack.
     """
-    pass
+    undo = board.undo_stack
+    undo.ply -= 1
+    ply = undo.ply
+
+    flags = move >> 12
+    from_row, from_col = (move & 63) >> 3, move & 7
+    to_row, to_col = (move >> 9) & 7, (move >> 6) & 7
+    squares = board.board
+
+    # Restore piece to its original position (a promoted pawn replaces its promotion piece)
+    piece = undo.moved[ply]
+    if flags & PROMOTION:
+      board.remove_piece(squares[to_row][to_col])
+      board.restore_piece(piece)
+    squares[to_row][to_col] = 0
+    piece.move(from_row, from_col)
+    squares[from_row][from_col] = piece
+
+    # Restore captured piece if any; it still knows its square and its place in the piece list
+    captured = undo.captured[ply]
+    if captured != 0:
+      board.restore_piece(captured)
+
+    # Restore castling rights, and move a castled rook back
+    castling = undo.castling[ply]
+    if piece.type == "Rook" or piece.type == "King":
+      piece.can_castle = bool(castling & 1)
+    if flags == KING_CASTLE or flags == QUEEN_CASTLE:
+      rook_col, rook_to_col = (7, 5) if flags == KING_CASTLE else (0, 3)
+      castling_rook = squares[from_row][rook_to_col]
+      squares[from_row][rook_to_col] = 0
+      castling_rook.move(from_row, rook_col)
+      squares[from_row][rook_col] = castling_rook
+      castling_rook.can_castle = bool(castling & 2)
+
+    # Restore previous move data
+    en_passant = undo.en_passant[ply]
+    board.en_passant_target = (en_passant >> 3, en_passant & 7) if en_passant >= 0 else None
+    game.half_moves = undo.half_moves[ply]
+    game.full_moves = undo.full_moves[ply]
+    board.hash = undo.hash[ply]
+    board.pawn_hash = undo.pawn_hash[ply]
 
   def reset_visualizer_stats(self):
     self.moves_evaluated = 0
     self.total_moves_found = 0
     self.current_best_evaluation = 0
 
+  def get_disambiguation(self, game, piece, row, col):
+    """
+    The file, rank or square SAN adds when another piece of the same type can also move to (row, col).
+    """
+    others = [other for other in game.board.get_all_pieces(piece.color)
+              if other is not piece and other.type == piece.type and (row, col) in other.valid_moves]
+    if not others:
+      return ""
+    history = game.move_history
+    if all(other.col != piece.col for other in others):
+      return history.get_file(piece.col)
+    if all(other.row != piece.row for other in others):
+      return str(8 - piece.row)
+    return history.get_file(piece.col) + str(8 - piece.row)
+
   def computer_move(self, game, move):
-    game.board.previous_move = (move[0].row, move[0].col), move[1]
-    game.board.material.update_advantages(game.board)
-    game.board.move(move[0], move[1][0], move[1][1])
-    move[0].has_moved = True
+    """
+    Plays a searched (packed) move on the game in the window, with its notation, captures, castling, en passant and
+    promotion.
+    """
+    history = game.move_history
+    flags = move >> 12
+    from_square, (row, col) = divmod(move & 63, 8), divmod((move >> 6) & 63, 8)
+    piece = game.board.get_piece(from_square[0], from_square[1])
+    target = game.board.get_piece(row, col)
+
+    if flags == KING_CASTLE or flags == QUEEN_CASTLE:
+      castling_rook = game.board.get_piece(row, 7 if flags == KING_CASTLE else 0)
+      game.castle(piece, castling_rook, [], game.board)
+      move_str = game.board.move_notation
+
+    else:
+      if flags == EP_CAPTURE:
+        target = game.board.get_piece(from_square[0], col)
+      if target != 0:
+        game.board.remove_piece(target)
+        game.capture(target)
+
+      capture = "x" if target != 0 else ""
+      if isinstance(piece, pawn.Pawn):
+        move_str = (history.get_file(from_square[1]) + "x" if capture else "") + history.get_file(col) + str(8 - row)
+      else:
+        move_str = piece.letter + self.get_disambiguation(game, piece, row, col) + capture + \
+                   history.get_file(col) + str(8 - row)
+
+      game.board.move(piece, row, col)
+      if isinstance(piece, (rook.Rook, king.King)):
+        piece.can_castle = False
+      piece.has_moved = True
+
+      if flags & PROMOTION:
+        promoted = self.PROMOTION_TYPES[flags & 3](row, col, piece.color)
+        game.board.remove_piece(piece)
+        game.board.add_piece(promoted)
+        move_str += "=" + promoted.letter
+
+    history.move_log.append(game.move_creates_check(move_str))
+    game.board.previous_move = [from_square, (row, col)]
+    game.board.en_passant_target = ((from_square[0] + row) // 2, col) if flags == DOUBLE_PAWN_PUSH else None
     game.update_game()
     game.check_game_status()
 
@@ -80,24 +80,27 @@ class Human(object):
     if isinstance(self.selected_piece, King) and isinstance(piece, Rook) and self.selected_piece.color == piece.color and (row, col) in self.valid_moves:
       dangerous_squares = self.game.get_dangerous_squares()
       if self.game.castle(self.selected_piece, piece, dangerous_squares, self.game.board):
+        en_passant_target = None
         move_str = self.game.board.move_notation
         move_str = self.game.move_creates_check(move_str)
         self.game.move_history.move_log.append(move_str)
         self.game.board.previous_move = [(prev_row, prev_col), (row, col)]
+        self.game.board.en_passant_target = en_passant_target
         self.game.update_game()
         self.game.update_screen(self.valid_moves, self.game.board)
 
     # Capturing an enemy piece
     if isinstance(piece, (Pawn, Knight, Bishop, Rook, Queen)) and self.selected_piece.color != piece.color:
-      self.game.board.board[row][col] = 0
+      self.game.board.remove_piece(piece)
       self.game.board.move(self.selected_piece, row, col)
 
       # If moving the piece puts you in check, undo it
       if self.game.king_checked():
         self.game.board.move(self.selected_piece, prev_row, prev_col)
-        self.game.board.board[row][col] = piece
+        self.game.board.restore_piece(piece)
         return False
       else:
+        en_passant_target = None
         if isinstance(self.selected_piece, (Rook, King)):
           self.selected_piece.can_castle = False
 
@@ -106,8 +109,6 @@ class Human(object):
               self.game.move_history.get_file(col) + str(abs(8 - row))
 
         elif isinstance(self.selected_piece, Pawn):
-          self.selected_piece.vulnerable_to_en_passant = False
-
           move_str = self.game.move_history.get_file(
             prev_col) + "x" + self.game.move_history.get_file(col) + str(abs(8 - row))
           if self.game.detect_promotion(self.selected_piece):
@@ -117,6 +118,7 @@ class Human(object):
         move_str = self.game.move_creates_check(move_str)
         self.game.move_history.move_log.append(move_str)
         self.game.board.previous_move = [(prev_row, prev_col), (row, col)]
+        self.game.board.en_passant_target = en_passant_target
         self.game.update_game()
 
     # Moving to an empty square
@@ -128,6 +130,7 @@ class Human(object):
         self.game.board.move(self.selected_piece, prev_row, prev_col)
         return False
       else:
+        en_passant_target = None
         if isinstance(self.selected_piece, (Knight, Bishop, Rook, Queen, King)):
           move_str = self.selected_piece.letter + \
             self.game.move_history.get_file(col) + str(abs(8 - row))
@@ -137,19 +140,16 @@ class Human(object):
             self.selected_piece.can_castle = False
 
         elif isinstance(self.selected_piece, Pawn):
-          # If a pawn only moves 1 square, it is not vulnerable to en passant
+          # A pawn that moves 2 squares can be captured en passant on the square it skipped
           if abs(self.selected_piece.row - prev_row) == 2:
-            self.selected_piece.vulnerable_to_en_passant = True
-          else:
-            self.selected_piece.vulnerable_to_en_passant = False
+            en_passant_target = ((row + prev_row) // 2, col)
 
           # Pawn captures by en passant
           if self.selected_piece.direction == "Up":
             piece = self.game.board.board[self.selected_piece.row +
                                           1][self.selected_piece.col]
             if isinstance(piece, Pawn):
-              self.game.board.board[self.selected_piece.row +
-                                    1][self.selected_piece.col] = 0
+              self.game.board.remove_piece(piece)
               self.game.capture(piece)
               move_str = self.game.move_history.get_file(
                 col) + "x" + str(abs(8 - row))
@@ -161,7 +161,7 @@ class Human(object):
           else:
             piece = self.game.board.board[self.selected_piece.row - 1][self.selected_piece.col]
             if isinstance(piece, Pawn):
-              self.game.board.board[self.selected_piece.row - 1][self.selected_piece.col] = 0
+              self.game.board.remove_piece(piece)
               self.game.capture(piece)
               move_str = self.game.move_history.get_file(col) + "x" + str(abs(8 - row))
 
@@ -174,6 +174,7 @@ class Human(object):
         move_str = self.game.move_creates_check(move_str)
         self.game.move_history.move_log.append(move_str)
         self.game.board.previous_move = [(prev_row, prev_col), (row, col)]
+        self.game.board.en_passant_target = en_passant_target
         self.game.update_game()
 
     # Check if stalemate or checkmate
@@ -189,6 +190,7 @@ class Human(object):
     return True
 
   def promote(self, choice, row, col):
-    self.game.board.board[row][col] = choice(row, col, self.color)
+    self.game.board.remove_piece(self.game.board.get_piece(row, col))
+    self.game.board.add_piece(choice(row, col, self.color))
     self.promoting = False
-    self.game.board.material.update_advantages(self.game.board)
+    self.game.board.material.update_advantages()
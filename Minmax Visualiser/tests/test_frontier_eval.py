@@ -0,0 +1,62 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.pop("CHESS_POSITION_STORE", None)
+pytest.importorskip("numpy")
+
+from game.game import Game
+from game.fen import START_FEN, load_fen
+from game.moves import move_to_string
+from players.computer_player_test import Computer
+
+
+# castling both ways, en passant (after 1. d4 in the last one) and promotions with and without a capture
+FENS = [
+  START_FEN,
+  "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+  "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+  "rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1",
+]
+
+
+def setup(fen):
+  game = Game(None, "White", 0, 1)
+  color = load_fen(game, fen)
+  engine = Computer(color, 1)
+  engine.tree_capture = None
+  engine.search_listeners = []
+  game.computer = engine
+  board = game.board
+  board.hash = engine.zobrist.calculate_hash(board)
+  board.pawn_hash = engine.zobrist.calculate_pawn_hash(board)
+  return engine, game, board, color
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_scores_match_the_evaluation(fen):
+  engine, game, board, color = setup(fen)
+  moves, scores, pending = engine.evaluate_frontier(board, game, engine.get_all_moves(board, game, color), color)
+  for move, score, entry in zip(moves, scores, pending):
+    if entry is not None:
+      score = engine.resolve_frontier_score(board, game, move, score, entry)
+    engine.simulate_move(board, game, move)
+    assert score == engine.calculate_evaluation(board), move_to_string(move)
+    engine.undo_move(board, game, move)
+
+  # the children whose pawn structure was cached are best first for the side to move
+  cached = [score for score, entry in zip(scores, pending) if entry is None]
+  assert cached == sorted(cached, reverse=color == engine.WHITE)
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_search_is_the_same_without_it(fen):
+  results = []
+  for frontier_eval in (True, False):
+    engine, game, board, color = setup(fen)
+    engine.frontier_eval = frontier_eval
+    score, move, _ = engine.search(board, game, 3)
+    assert (engine.frontier is not None) == frontier_eval
+    results.append((score, move))
+  assert results[0] == results[1]
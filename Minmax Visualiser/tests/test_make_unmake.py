@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.game import Game
+from game.moves import EP_CAPTURE, encode_move, move_to_string
+from players.computer_player_test import Computer
+
+
+def setup(*moves):
+  """
+  The starting position after moves, in coordinate notation, with white to move again.
+  """
+  game = Game(None, "White", 0, 1)
+  game.board.initiate_pieces()
+  engine = Computer("White", 1)
+  game.computer = engine
+  board = game.board
+  board.hash = engine.zobrist.calculate_hash(board)
+  board.pawn_hash = engine.zobrist.calculate_pawn_hash(board)
+  for index, name in enumerate(moves):
+    color = engine.WHITE if index % 2 == 0 else engine.BLACK
+    engine.simulate_move(board, game, find_move(engine, game, name, color))
+  # the moves above are never taken back
+  board.undo_stack.ply = 0
+  return engine, game, board
+
+
+def find_move(engine, game, name, color):
+  return next(move for move in engine.get_all_moves(game.board, game, color) if move_to_string(move) == name)
+
+
+def snapshot(board, game):
+  squares = tuple((id(piece), piece.type, piece.color, piece.row, piece.col, getattr(piece, "can_castle", None))
+                  if piece else None for row in board.board for piece in row)
+  return squares, game.half_moves, game.full_moves, board.hash, board.pawn_hash
+
+
+def piece_at(board, name):
+  piece = board.board[8 - int(name[1])]["abcdefgh".index(name[0])]
+  return (piece.type, piece.color) if piece else None
+
+
+def test_every_move_is_undone():
+  for moves in ((), ("e2e4", "d7d5"), ("g1f3", "g8f6", "g2g3", "g7g6", "f1g2", "f8g7")):
+    engine, game, board = setup(*moves)
+    before = snapshot(board, game)
+    for move in engine.get_all_moves(board, game, engine.WHITE):
+      engine.simulate_move(board, game, move)
+      engine.undo_move(board, game, move)
+      assert snapshot(board, game) == before, move_to_string(move)
+    assert board.undo_stack.ply == 0
+
+
+def test_capture():
+  engine, game, board = setup("e2e4", "d7d5")
+  move = find_move(engine, game, "e4d5", engine.WHITE)
+  engine.simulate_move(board, game, move)
+  assert piece_at(board, "d5") == ("Pawn", "White")
+  assert piece_at(board, "e4") is None
+  assert game.half_moves == 0
+  assert board.hash == engine.zobrist.calculate_hash(board) ^ engine.zobrist.black_to_move
+
+
+def test_castling():
+  engine, game, board = setup("g1f3", "g8f6", "g2g3", "g7g6", "f1g2", "f8g7")
+  before = snapshot(board, game)
+  move = find_move(engine, game, "e1g1", engine.WHITE)
+  engine.simulate_move(board, game, move)
+  assert piece_at(board, "g1") == ("King", "White")
+  assert piece_at(board, "f1") == ("Rook", "White")
+  assert piece_at(board, "h1") is None
+  assert not board.board[7][6].can_castle and not board.board[7][5].can_castle
+  assert board.hash == engine.zobrist.calculate_hash(board) ^ engine.zobrist.black_to_move
+
+  engine.undo_move(board, game, move)
+  assert snapshot(board, game) == before
+  assert board.board[7][4].can_castle and board.board[7][7].can_castle
+
+
+def test_en_passant():
+  # after 1. e4 a6 2. e5 d5, exd6 takes the pawn on d5
+  engine, game, board = setup("e2e4", "a7a6", "e4e5", "d7d5")
+  before = snapshot(board, game)
+  move = encode_move(3 * 8 + 4, 2 * 8 + 3, EP_CAPTURE)
+  engine.simulate_move(board, game, move)
+  assert piece_at(board, "d6") == ("Pawn", "White")
+  assert piece_at(board, "d5") is None
+  assert piece_at(board, "e5") is None
+
+  engine.undo_move(board, game, move)
+  assert snapshot(board, game) == before
+  assert piece_at(board, "d5") == ("Pawn", "Black")
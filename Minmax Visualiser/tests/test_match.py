@@ -0,0 +1,77 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from match import MatchResult, expected_score, get_elo, sprt_llr
+
+
+def make_result(wins, draws, losses, elo0=0, elo1=10):
+  result = MatchResult(elo0, elo1, alpha=0.05, beta=0.05)
+  result.wins, result.draws, result.losses = wins, draws, losses
+  return result
+
+
+def test_elo_and_expected_score_are_inverse():
+  for elo in (-300, -50, 0, 25, 400):
+    assert get_elo(expected_score(elo)) == pytest.approx(elo)
+
+
+def test_sprt_llr_without_games():
+  assert sprt_llr(0, 0, 0, 0, 10) == 0.0
+
+
+def test_sprt_llr_follows_the_score():
+  assert sprt_llr(30, 40, 10, 0, 10) > 0
+  assert sprt_llr(10, 40, 30, 0, 10) < 0
+  # an even score is closer to elo0 = 0 than to elo1 = 10
+  assert sprt_llr(20, 40, 20, 0, 10) < 0
+  assert sprt_llr(60, 40, 20, 0, 10) > sprt_llr(30, 20, 10, 0, 10)
+
+
+def test_sprt_llr_of_one_sided_start_is_finite():
+  result = make_result(3, 0, 0)
+  assert result.llr() < result.upper_bound
+  assert result.decision() is None
+
+
+def test_decision():
+  assert make_result(400, 200, 100).decision() == "H1"
+  assert make_result(100, 200, 400).decision() == "H0"
+  assert make_result(10, 20, 9).decision() is None
+
+
+def test_add():
+  result = make_result(0, 0, 0)
+  result.add("1-0", engine1_white=True)
+  result.add("1-0", engine1_white=False)
+  result.add("0-1", engine1_white=False)
+  result.add("1/2-1/2", engine1_white=True)
+  assert (result.wins, result.draws, result.losses) == (2, 1, 1)
+
+
+def test_elo_of_even_score():
+  elo, low, high = make_result(10, 20, 10).elo()
+  assert elo == pytest.approx(0)
+  assert low == pytest.approx(-high)
+  assert low < 0 < high
+
+
+def test_elo_interval_of_one_sided_results():
+  elo, low, high = make_result(8, 0, 0).elo()
+  assert 0 < low < elo < high
+  assert elo < 2400
+
+  elo, low, high = make_result(0, 8, 0).elo()
+  assert low < elo < high
+
+
+def test_elo_interval_narrows_with_games():
+  _, low, high = make_result(12, 10, 8).elo()
+  _, more_low, more_high = make_result(120, 100, 80).elo()
+  assert more_high - more_low < high - low
+
+
+def test_to_dict_without_games():
+  assert make_result(0, 0, 0).to_dict()["elo_95"] == [0, 0]
@@ -0,0 +1,128 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.pop("CHESS_POSITION_STORE", None)
+
+from game.game import Game
+from game.fen import START_FEN, load_fen
+from game.moves import move_to_string
+from players.computer_player_test import Computer
+
+
+KIWIPETE_FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+POSITION_3_FEN = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+POSITION_4_FEN = "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"
+
+
+def setup(fen):
+  game = Game(None, "White", 0, 1)
+  color = load_fen(game, fen)
+  engine = Computer(color, 1)
+  game.computer = engine
+  board = game.board
+  board.hash = full_hash(engine, board, color)
+  board.pawn_hash = engine.zobrist.calculate_pawn_hash(board)
+  return engine, game, board, color
+
+
+def full_hash(engine, board, color):
+  """
+  The hash search computes from scratch, which the incremental updates of simulate_move have to match.
+  """
+  zobrist = engine.zobrist
+  board_hash = zobrist.calculate_hash(board)
+  if color == engine.BLACK:
+    board_hash ^= zobrist.black_to_move
+  if board.en_passant_target:
+    board_hash ^= zobrist.en_passant[board.en_passant_target[1]]
+  return board_hash
+
+
+def snapshot(board, game):
+  squares = tuple((piece.type, piece.color, piece.row, piece.col, getattr(piece, "can_castle", None)) if piece else None
+                  for row in board.board for piece in row)
+  piece_lists = tuple(tuple(id(piece) for piece in board.pieces[color]) for color in ("White", "Black"))
+  return (squares, piece_lists, board.en_passant_target, game.half_moves, game.full_moves, board.hash,
+          board.pawn_hash)
+
+
+def check_position(engine, board, color, move):
+  name = move_to_string(move)
+  assert board.hash == full_hash(engine, board, color), name
+  assert board.pawn_hash == engine.zobrist.calculate_pawn_hash(board), name
+
+  # the piece lists hold exactly the pieces on the board, and every piece knows its index
+  for side in ("White", "Black"):
+    listed = list(board.pieces[side])
+    on_board = [piece for row in board.board for piece in row if piece and piece.color == side]
+    assert sorted(map(id, listed)) == sorted(map(id, on_board)), name
+    assert all(piece.list_index == index for index, piece in enumerate(listed)), name
+
+  # only a double pawn push leaves an en passant square, the one the pawn passed over
+  from_row, to_row, to_col = (move & 63) >> 3, (move >> 9) & 7, (move >> 6) & 7
+  moved = board.board[to_row][to_col]
+  expected = ((from_row + to_row) // 2, to_col) if moved.type == "Pawn" and abs(to_row - from_row) == 2 else None
+  assert board.en_passant_target == expected, name
+
+
+def perft(engine, game, board, color, depth):
+  """
+  Counts the leaf nodes of the legal move tree. Every position is compared with what the incremental updates should
+  give, and every undo_move with the position before the move.
+  """
+  if depth == 0:
+    return 1
+
+  other = engine.BLACK if color == engine.WHITE else engine.WHITE
+  king = board.get_king(color)
+  in_check = engine.is_in_check(board, color)
+  nodes = 0
+  for move in engine.get_all_moves(board, game, color):
+    before = snapshot(board, game)
+    if not engine.make_legal_move(board, game, move, king, in_check, other):
+      continue
+    check_position(engine, board, other, move)
+    nodes += perft(engine, game, board, other, depth - 1)
+    engine.undo_move(board, game, move)
+    assert snapshot(board, game) == before, move_to_string(move)
+  return nodes
+
+
+@pytest.mark.parametrize("fen, depth, nodes", [
+  (START_FEN, 3, 8902),
+  (KIWIPETE_FEN, 2, 2039),
+  (POSITION_3_FEN, 3, 2812),
+  (POSITION_4_FEN, 2, 264),
+])
+def test_perft(fen, depth, nodes):
+  engine, game, board, color = setup(fen)
+  assert perft(engine, game, board, color, depth) == nodes
+  assert board.undo_stack.ply == 0
+
+
+def test_castling_rights_change_the_hash():
+  hashes = set()
+  for rights in ("KQkq", "Kkq", "Qkq", "kq", "-"):
+    engine, game, board, color = setup(f"r3k2r/8/8/8/8/8/8/R3K2R w {rights} - 0 1")
+    hashes.add(board.hash)
+  assert len(hashes) == 5
+
+
+def test_rook_capture_removes_castling_rights():
+  # Rxa8 gives up white's queenside right and takes black's
+  engine, game, board, color = setup("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+  move = next(move for move in engine.get_all_moves(board, game, color) if move_to_string(move) == "a1a8")
+  engine.simulate_move(board, game, move)
+  check_position(engine, board, engine.BLACK, move)
+  assert board.hash == setup("R3k2r/8/8/8/8/8/8/4K2R b Kk - 0 1")[2].hash
+
+
+def test_castling_needs_empty_squares_up_to_the_rook():
+  for fen, castling in (("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", {"e1c1", "e1g1"}),
+                        ("r3k2r/8/8/8/8/8/8/RN2K2R w KQkq - 0 1", {"e1g1"}),
+                        ("r3k2r/8/8/8/8/8/8/R3K1NR w KQkq - 0 1", {"e1c1"})):
+    engine, game, board, color = setup(fen)
+    moves = {move_to_string(move) for move in engine.get_all_moves(board, game, color)}
+    assert moves & {"e1c1", "e1g1"} == castling, fen
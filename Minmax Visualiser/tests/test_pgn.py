@@ -0,0 +1,122 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.pop("CHESS_POSITION_STORE", None)
+
+from game.game import Game
+from game.fen import load_fen
+from game.moves import move_to_string
+from game.pgn import parse_san, read_games, split_movetext
+from players.computer_player_test import Computer, MATE_SCORE
+from analyze_pgn import MATE_LOSS_SCORE, get_cp_loss
+
+
+def setup(fen):
+  game = Game(None, "White", 0, 1)
+  color = load_fen(game, fen)
+  computer = Computer(color, 1)
+  game.computer = computer
+  # parse_san makes moves to test them, which updates the hashes a search would have set up
+  game.board.hash = computer.zobrist.calculate_hash(game.board)
+  game.board.pawn_hash = computer.zobrist.calculate_pawn_hash(game.board)
+  return computer, game, color
+
+
+def parse(fen, san):
+  computer, game, color = setup(fen)
+  return move_to_string(parse_san(computer, game, san, color))
+
+
+def test_move_numbers_and_result():
+  assert split_movetext("1. e4 e5 2.Nf3 Nc6 3. Bb5 1-0") == ["e4", "e5", "Nf3", "Nc6", "Bb5"]
+
+
+def test_black_move_numbers():
+  assert split_movetext("12... Nf6 13. Bg5 13...Be7 *") == ["Nf6", "Bg5", "Be7"]
+
+
+def test_comments():
+  text = "1. e4 {the king's pawn (best by test)} e5 ; a line comment with 2. d4\n2. Nf3 1/2-1/2"
+  assert split_movetext(text) == ["e4", "e5", "Nf3"]
+
+
+def test_nested_variations():
+  text = "1. e4 e5 (1... c5 2. Nf3 (2. c3 d5) 2... d6) 2. Nf3 (2. f4 exf4) Nc6 0-1"
+  assert split_movetext(text) == ["e4", "e5", "Nf3", "Nc6"]
+
+
+def test_nags_and_annotations():
+  assert split_movetext("1. e4 $1 e5 $2 2. Qh5?! Nc6 $14 *") == ["e4", "e5", "Qh5?!", "Nc6"]
+  assert parse("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2", "Qh5?!") == "d1h5"
+
+
+def test_read_games(tmp_path):
+  path = tmp_path / "games.pgn"
+  path.write_text('[White "A"]\n[Black "B"]\n\n1. e4 e5 1-0\n\n[White "C"]\n\n1. d4 {comment} d5 *\n')
+  games = list(read_games(str(path)))
+  assert [game.headers.get("White") for game in games] == ["A", "C"]
+  assert [game.moves for game in games] == [["e4", "e5"], ["d4", "d5"]]
+
+
+def test_disambiguation_by_file():
+  fen = "4k3/8/8/8/8/5N2/8/1N2K3 w - - 0 1"
+  assert parse(fen, "Nbd2") == "b1d2"
+  assert parse(fen, "Nfd2") == "f3d2"
+  with pytest.raises(ValueError):
+    parse(fen, "Nd2")
+
+
+def test_disambiguation_by_rank():
+  fen = "4k3/8/8/R7/8/8/8/R3K3 w - - 0 1"
+  assert parse(fen, "R1a3") == "a1a3"
+  assert parse(fen, "R5a3") == "a5a3"
+
+
+def test_pinned_piece_needs_no_disambiguation():
+  # the knight on d2 is pinned by the bishop on b4, so Nf3 can only be the knight on g1
+  assert parse("4k3/8/8/8/1b6/8/3N4/4K1N1 w - - 0 1", "Nf3") == "g1f3"
+
+
+def test_promotion():
+  fen = "3r4/4P3/8/8/8/8/8/k3K3 w - - 0 1"
+  assert parse(fen, "e8=Q") == "e7e8q"
+  assert parse(fen, "e8Q+") == "e7e8q"
+  assert parse(fen, "exd8=N") == "e7d8n"
+  with pytest.raises(ValueError):
+    parse(fen, "e8")
+
+
+def test_castling():
+  fen = "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1"
+  assert parse(fen, "O-O") == "e1g1"
+  assert parse(fen, "O-O-O+") == "e1c1"
+  assert parse(fen.replace(" w ", " b "), "0-0") == "e8g8"
+  assert parse(fen.replace(" w ", " b "), "O-O-O") == "e8c8"
+
+
+def test_unknown_move():
+  with pytest.raises(ValueError):
+    parse("4k3/8/8/8/8/8/8/4K3 w - - 0 1", "Nf3")
+
+
+def test_pinned_piece_cannot_move():
+  # Nc3 matches only the knight on e2, which is pinned by the rook on e8
+  with pytest.raises(ValueError):
+    parse("4r1k1/8/8/8/8/8/4N3/4K3 w - - 0 1", "Nc3")
+
+
+def test_cannot_castle_through_check():
+  with pytest.raises(ValueError):
+    parse("4k3/8/8/8/8/8/5r2/4K2R w K - 0 1", "O-O")
+
+
+def test_mate_scores_are_capped_in_cp_loss():
+  assert get_cp_loss(120, 80, "White") == 40
+  assert get_cp_loss(120, 80, "Black") == 0
+  # missing a mate in 3 costs MATE_LOSS_SCORE minus the eval of the played move
+  assert get_cp_loss(MATE_SCORE - 5, 50, "White") == MATE_LOSS_SCORE - 50
+  assert get_cp_loss(5 - MATE_SCORE, -MATE_SCORE + 9, "Black") == 0
+  assert get_cp_loss(-200, 8 - MATE_SCORE, "White") == MATE_LOSS_SCORE - 200
+  assert get_cp_loss(None, 50, "White") is None
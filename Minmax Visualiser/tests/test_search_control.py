@@ -0,0 +1,40 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.search_control import TIME_CHECK_INTERVAL, SearchAborted, SearchControl, SearchLimits
+
+
+def test_stop_before_start_holds():
+  control = SearchControl()
+  control.stop()
+  control.start(SearchLimits(3))
+  assert control.next_check == 0
+  with pytest.raises(SearchAborted):
+    control.check(0)
+
+
+def test_schedule_check_keeps_a_stop():
+  control = SearchControl()
+  control.start(SearchLimits(3, hard_time=10))
+  control.schedule_check(0)
+  assert control.next_check == TIME_CHECK_INTERVAL
+
+  control.stop()
+  control.schedule_check(100)
+  assert control.next_check == 0
+  assert not control.iteration_done(100, False)
+
+
+def test_resume():
+  control = SearchControl()
+  control.stop()
+  control.resume()
+  control.start(SearchLimits(3, nodes=500))
+  assert control.next_check == float("inf")
+  assert control.iteration_done(100, False)
+  assert control.next_check == 500
+  with pytest.raises(SearchAborted):
+    control.check(500)
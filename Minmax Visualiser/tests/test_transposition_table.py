@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.game import Game
+from players.computer_player_test import Computer
+
+
+def setup():
+  game = Game(None, "White", 0, 3)
+  game.board.initiate_pieces()
+  engine = Computer("White", 3)
+  # the searches must not be sent to the web visualizer
+  engine.tree_capture = None
+  engine.search_listeners = []
+  game.computer = engine
+  return engine, game, game.board
+
+
+def test_iterations_probe_the_table():
+  engine, game, board = setup()
+  _, _, stats = engine.search(board, game, 3)
+  assert stats.tt_probes > 0
+  assert 0 < stats.tt_hits <= stats.tt_probes
+  assert stats.tt_cutoffs <= stats.tt_hits
+  assert len(engine.transposition_table) > 0
+
+
+def test_search_leaves_the_position_unchanged():
+  engine, game, board = setup()
+  before = [[(piece.type, piece.color) if piece else None for piece in row] for row in board.board]
+  engine.search(board, game, 3)
+  assert [[(piece.type, piece.color) if piece else None for piece in row] for row in board.board] == before
+  assert board.hash == engine.zobrist.calculate_hash(board)
+  assert board.undo_stack.ply == 0
+
+
+def test_search_again_from_the_table():
+  engine, game, board = setup()
+  score, move, _ = engine.search(board, game, 3)
+  again_score, again_move, stats = engine.search(board, game, 3)
+  # the root is always searched, but everything below it is now in the table
+  assert (again_score, again_move) == (score, move)
+  assert stats.tt_cutoffs > 0
+  fresh_engine, fresh_game, fresh_board = setup()
+  assert stats.nodes < fresh_engine.search(fresh_board, fresh_game, 3)[2].nodes
@@ -0,0 +1,118 @@
+import os
+import sys
+import pytest
+
+# the web app imports the store as a top level module, from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web"))
+
+from tree_store import FLAG_SCORED, SearchTree, TreeStore
+
+
+def make_delta(search_id, seq, first, parent, move, updates=(), reset=False, done=False):
+  return {
+    "search_id": search_id,
+    "seq": seq,
+    "iteration": 1,
+    "root_maximizing": True,
+    "reset": reset,
+    "done": done,
+    "first": first,
+    "parent": list(parent),
+    "move": list(move),
+    "updates": [list(update) for update in updates],
+  }
+
+
+def make_tree():
+  """
+  The root has three children: e2e4 with a subtree of 4 nodes and depth 2, d2d4 with 2 nodes and g1f3 alone.
+  e2e4 and d2d4 are scored, g1f3 is not.
+  """
+  tree = SearchTree("search", 1, True)
+  tree.apply_delta(make_delta("search", 1, 0, [-1, 0, 0, 0], ["Root", "e2e4", "d2d4", "g1f3"], reset=True))
+  tree.apply_delta(make_delta("search", 2, 4, [1, 1, 4, 2], ["e7e5", "d7d5", "g1f3", "d7d5"],
+                              updates=[(1, 30, FLAG_SCORED), (2, 50, FLAG_SCORED)]))
+  return tree
+
+
+def test_out_of_order_delta_raises():
+  tree = make_tree()
+  with pytest.raises(ValueError):
+    tree.apply_delta(make_delta("search", 4, 10, [3], ["e7e5"]))
+  assert len(tree) == 8
+
+
+def test_subtree_aggregates():
+  size, depth = make_tree().aggregates()
+  assert list(size) == [8, 4, 2, 1, 2, 1, 1, 1]
+  assert list(depth) == [3, 2, 1, 0, 1, 0, 0, 0]
+
+
+def test_aggregates_follow_new_nodes():
+  tree = make_tree()
+  tree.aggregates()
+  tree.apply_delta(make_delta("search", 3, 8, [3], ["e7e5"]))
+  size, depth = tree.aggregates()
+  assert size[0] == 9 and size[3] == 2 and depth[3] == 1
+
+
+def page_moves(page):
+  return [child["move"] for child in page["children"]]
+
+
+def test_children_sorted_by_score_with_cursor():
+  tree = make_tree()
+  first = tree.children_page(0, 0, 2, "score")
+  assert first["total"] == 3
+  # the root maximizes: best score first, unscored children last
+  assert page_moves(first) == ["d2d4", "e2e4"]
+  second = tree.children_page(0, first["offset"] + first["limit"], 2, "score")
+  assert page_moves(second) == ["g1f3"]
+
+
+def test_children_sorted_by_score_for_minimizing_node():
+  tree = make_tree()
+  tree.apply_delta(make_delta("search", 3, 8, [], [], updates=[(4, 20, FLAG_SCORED), (5, -10, FLAG_SCORED)]))
+  assert page_moves(tree.children_page(1, 0, 10, "score")) == ["d7d5", "e7e5"]
+
+
+def test_children_sorted_by_size_with_cursor():
+  tree = make_tree()
+  assert page_moves(tree.children_page(0, 0, 1, "size")) == ["e2e4"]
+  assert page_moves(tree.children_page(0, 1, 1, "size")) == ["d2d4"]
+  assert page_moves(tree.children_page(0, 2, 1, "size")) == ["g1f3"]
+  assert page_moves(tree.children_page(0, 3, 1, "size")) == []
+
+
+def test_reset_replaces_the_tree():
+  store = TreeStore()
+  store.apply_delta(make_delta("search", 1, 0, [-1, 0], ["Root", "e2e4"], reset=True))
+  store.apply_delta(make_delta("search", 2, 0, [-1], ["Root"], reset=True))
+  assert len(store.get_tree("search")) == 1
+
+
+def test_store_rejects_a_delta_without_its_start():
+  store = TreeStore(max_searches=1)
+  store.apply_delta(make_delta("a", 1, 0, [-1, 0], ["Root", "e2e4"], reset=True))
+
+  # the reset delta of b was lost, so its next delta must not evict a
+  with pytest.raises(ValueError):
+    store.apply_delta(make_delta("b", 2, 1, [0], ["e2e4"]))
+  with pytest.raises(ValueError):
+    store.apply_delta(make_delta("a", 3, 5, [1], ["e7e5"]))
+  assert [summary["search_id"] for summary in store.searches()] == ["a"]
+  assert store.get_tree("latest").search_id == "a"
+  assert len(store.get_tree("a")) == 2
+
+
+def test_oldest_search_is_evicted():
+  store = TreeStore(max_searches=2)
+  for search_id in ("a", "b"):
+    store.apply_delta(make_delta(search_id, 1, 0, [-1], ["Root"], reset=True))
+
+  # resetting a makes it the most recent search, so b is the one evicted by c
+  store.apply_delta(make_delta("a", 2, 0, [-1], ["Root"], reset=True))
+  store.apply_delta(make_delta("c", 1, 0, [-1], ["Root"], reset=True))
+  assert [summary["search_id"] for summary in store.searches()] == ["a", "c"]
+  assert store.get_tree("latest").search_id == "c"
+  assert store.children("b", 0) is None
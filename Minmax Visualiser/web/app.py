@@ -1,5 +1,8 @@
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
 from flask_cors import CORS
+from tree_store import TreeStore
+import json
+import queue
 import threading
 import time
 import os
@@ -12,9 +15,46 @@ templates_dir = os.path.join(current_dir, 'templates')
 app = Flask(__name__, template_folder=templates_dir)
 CORS(app)
 
-# Store minimax tree data
+# Store the sampled minimax tree of the last finished search
 minimax_tree_data = {}
 
+# Indexed trees of the latest searches, served page by page by the /tree endpoints
+tree_store = TreeStore()
+
+# Deltas of the current search, replayed to browsers that connect or reconnect while it runs.
+# Every delta is kept as a full event and as a small progress event for pages that browse the tree store instead.
+stream_lock = threading.Lock()
+current_search_id = None
+current_search_deltas = []
+subscribers = set()
+
+
+class Subscriber(object):
+    """
+    One connected browser. If it falls too far behind it is dropped; its EventSource then reconnects and
+    resumes from the last event id it received.
+    """
+    def __init__(self, progress_only, max_pending=1000):
+        self.progress_only = progress_only
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = False
+
+
+def format_event(search_id, seq, event, payload):
+    # payload is compact JSON without newlines, so it fits in a single data line
+    return f"id: {search_id}:{seq}\nevent: {event}\ndata: {payload}\n\n"
+
+
+def progress_payload(delta):
+    return json.dumps({"search_id": delta["search_id"], "seq": delta["seq"], "iteration": delta["iteration"],
+                       "nodes": delta["first"] + len(delta["parent"]), "done": delta["done"]}, separators=(",", ":"))
+
+
+def parse_last_event_id(last_event_id):
+    search_id, _, seq = (last_event_id or "").rpartition(":")
+    return search_id, int(seq) if seq.isdigit() else 0
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -25,7 +65,7 @@ def receive_minimax_data():
     data = request.json
     if data:
         minimax_tree_data = data
-        print("Received minimax data:", data)  # For debugging
+        print(f"Received minimax tree {data.get('search_id')}: {len(data.get('parent', []))} of {data.get('captured_nodes')} captured nodes")
         return jsonify({"status": "success", "message": "Data received"}), 200
     return jsonify({"status": "error", "message": "No data received"}), 400
 
@@ -33,17 +73,109 @@ def receive_minimax_data():
 def get_minimax_data():
     return jsonify(minimax_tree_data)
 
+@app.route('/minimax_delta', methods=['POST'])
+def receive_minimax_delta():
+    global current_search_id, current_search_deltas
+    delta = request.get_json(silent=True)
+    if not delta or "search_id" not in delta or "seq" not in delta:
+        return jsonify({"status": "error", "message": "Expected a delta with a search_id and seq"}), 400
+
+    try:
+        tree_store.apply_delta(delta)
+    except ValueError as error:
+        return jsonify({"status": "error", "message": str(error)}), 409
+
+    message = format_event(delta["search_id"], delta["seq"], "delta", request.get_data(as_text=True))
+    progress = format_event(delta["search_id"], delta["seq"], "progress", progress_payload(delta))
+    with stream_lock:
+        if delta["search_id"] != current_search_id:
+            current_search_id = delta["search_id"]
+            current_search_deltas = []
+        current_search_deltas.append((delta["seq"], message, progress))
+
+        for subscriber in list(subscribers):
+            try:
+                subscriber.queue.put_nowait(progress if subscriber.progress_only else message)
+            except queue.Full:
+                subscriber.dropped = True
+                subscribers.discard(subscriber)
+
+    return jsonify({"status": "success"}), 200
+
+@app.route('/stream')
+def stream():
+    """
+    Server-Sent Events stream of search deltas. New browsers first receive the deltas of the running search,
+    reconnecting browsers only the ones after their Last-Event-ID. With ?progress=1 only small progress events
+    (search id, iteration, node count) are sent, for pages that load the tree through the /tree endpoints.
+    """
+    last_search_id, last_seq = parse_last_event_id(request.headers.get("Last-Event-ID"))
+    subscriber = Subscriber(request.args.get("progress") == "1")
+
+    with stream_lock:
+        resume_from = last_seq if last_search_id == current_search_id else 0
+        backlog = [progress if subscriber.progress_only else message
+                   for seq, message, progress in current_search_deltas if seq > resume_from]
+        subscribers.add(subscriber)
+
+    def events():
+        try:
+            yield "retry: 1000\n\n"
+            for message in backlog:
+                yield message
+            while not subscriber.dropped:
+                try:
+                    yield subscriber.queue.get(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            with stream_lock:
+                subscribers.discard(subscriber)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/tree/searches', methods=['GET'])
+def get_tree_searches():
+    return jsonify(tree_store.searches())
+
+@app.route('/tree/<search_id>/node/<int:node_id>', methods=['GET'])
+def get_tree_node(search_id, node_id):
+    """
+    One node of a stored search tree (search_id may be "latest") with its subtree size, depth and child statistics.
+    """
+    node = tree_store.node(search_id, node_id)
+    if node is None:
+        return jsonify({"status": "error", "message": "Unknown search or node"}), 404
+    return jsonify(node)
+
+@app.route('/tree/<search_id>/node/<int:node_id>/children', methods=['GET'])
+def get_tree_children(search_id, node_id):
+    """
+    One page of a node's children. Query parameters: offset, limit (at most 500) and sort (index, score or size).
+    """
+    offset = max(0, request.args.get("offset", 0, type=int))
+    limit = min(500, max(1, request.args.get("limit", 50, type=int)))
+    sort = request.args.get("sort", "index")
+    if sort not in ("index", "score", "size"):
+        return jsonify({"status": "error", "message": "sort must be index, score or size"}), 400
+
+    page = tree_store.children(search_id, node_id, offset, limit, sort)
+    if page is None:
+        return jsonify({"status": "error", "message": "Unknown search or node"}), 404
+    return jsonify(page)
+
 def run_flask_app():
-    # Use a specific host and port for Flask to avoid conflicts
-    app.run(host='127.0.0.1', port=5000, debug=False)
+    # Use a specific host and port for Flask to avoid conflicts; every SSE client holds a thread, so keep it threaded
+    app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
 
 if __name__ == '__main__':
     # Run Flask in a separate thread
     flask_thread = threading.Thread(target=run_flask_app)
     flask_thread.daemon = True # Allows the main program to exit even if the thread is running
     flask_thread.start()
-    
+
     print("Flask server running on http://127.0.0.1:5000")
     # Keep the main thread alive to allow Flask thread to run
     while True:
-        time.sleep(1) 
\ No newline at end of file
+        time.sleep(1)
@@ -0,0 +1,174 @@
+import threading
+from array import array
+
+
+# Node flags, see game/tree_capture.py
+FLAG_SCORED = 1
+FLAG_PRUNED = 2
+
+
+class SearchTree(object):
+  """
+  One captured search tree, indexed for random access: parallel arrays per node plus a child list per node.
+  Subtree sizes and depths are derived lazily in a single reverse pass, because a parent always has a smaller
+  index than its children.
+  """
+  def __init__(self, search_id, iteration, root_maximizing):
+    self.search_id = search_id
+    self.iteration = iteration
+    self.root_maximizing = root_maximizing
+    self.done = False
+    self.parent = array("i")
+    self.score = array("i")
+    self.flags = array("B")
+    self.ply = array("B")
+    self.move = []
+    self.children = []
+    self._aggregates = None
+
+  def __len__(self):
+    return len(self.parent)
+
+  def apply_delta(self, delta):
+    first = delta["first"]
+    for offset, (parent, move) in enumerate(zip(delta["parent"], delta["move"])):
+      node = first + offset
+      if node != len(self.parent):
+        raise ValueError(f"Delta {delta['seq']} of search {self.search_id} starts at node {first}, expected {len(self.parent)}")
+
+      self.parent.append(parent)
+      self.move.append(move)
+      self.score.append(0)
+      self.flags.append(0)
+      self.ply.append(self.ply[parent] + 1 if parent >= 0 else 0)
+      self.children.append(array("i"))
+      if parent >= 0:
+        self.children[parent].append(node)
+
+    for node, score, flags in delta["updates"]:
+      self.score[node] = score
+      self.flags[node] = flags
+
+    self.done = delta["done"]
+    self._aggregates = None
+
+  def aggregates(self):
+    """
+    Returns (subtree_size, subtree_depth) arrays, recomputed only after the tree changed.
+    """
+    if self._aggregates is None:
+      size = array("i", [1]) * len(self.parent)
+      depth = array("i", [0]) * len(self.parent)
+      for node in range(len(self.parent) - 1, 0, -1):
+        parent = self.parent[node]
+        size[parent] += size[node]
+        depth[parent] = max(depth[parent], depth[node] + 1)
+      self._aggregates = (size, depth)
+    return self._aggregates
+
+  def maximizing(self, node):
+    return self.root_maximizing == (self.ply[node] % 2 == 0)
+
+  def node_info(self, node, with_stats=True):
+    size, depth = self.aggregates()
+    scored = self.flags[node] & FLAG_SCORED
+    info = {
+      "id": node,
+      "parent": self.parent[node],
+      "move": self.move[node],
+      "score": self.score[node] if scored else None,
+      "flags": self.flags[node],
+      "ply": self.ply[node],
+      "child_count": len(self.children[node]),
+      "subtree_size": size[node],
+      "subtree_depth": depth[node],
+    }
+
+    if with_stats:
+      child_scores = [self.score[child] for child in self.children[node] if self.flags[child] & FLAG_SCORED]
+      info["stats"] = {
+        "scored_children": len(child_scores),
+        "pruned_children": sum(1 for child in self.children[node] if self.flags[child] & FLAG_PRUNED),
+        "min_child_score": min(child_scores) if child_scores else None,
+        "max_child_score": max(child_scores) if child_scores else None,
+        "best_child_score": (max if self.maximizing(node) else min)(child_scores) if child_scores else None,
+      }
+    return info
+
+  def children_page(self, node, offset, limit, sort):
+    children = list(self.children[node])
+    if sort == "score":
+      # best moves for the player to move first, unscored children last
+      sign = -1 if self.maximizing(node) else 1
+      children.sort(key=lambda child: (not self.flags[child] & FLAG_SCORED, sign * self.score[child]))
+    elif sort == "size":
+      size, _ = self.aggregates()
+      children.sort(key=lambda child: -size[child])
+
+    page = children[offset:offset + limit]
+    return {
+      "search_id": self.search_id,
+      "node": self.node_info(node),
+      "offset": offset,
+      "limit": limit,
+      "total": len(children),
+      "children": [self.node_info(child, with_stats=False) for child in page],
+    }
+
+  def summary(self):
+    return {"search_id": self.search_id, "iteration": self.iteration, "nodes": len(self.parent), "done": self.done}
+
+
+class TreeStore(object):
+  """
+  Thread-safe store of the most recent search trees, fed with the engine's streamed deltas.
+  """
+  def __init__(self, max_searches=4):
+    self.max_searches = max_searches
+    self.lock = threading.Lock()
+    self.trees = {}
+    self.latest = None
+
+  def apply_delta(self, delta):
+    """
+    Adds a delta to its search's tree. A delta that doesn't continue the tree where it ends raises a ValueError
+    before anything changes, so it can't replace or evict a tree or become the latest search.
+    """
+    with self.lock:
+      tree = self.trees.get(delta["search_id"])
+      if not delta["reset"]:
+        if tree is None:
+          raise ValueError(f"Delta {delta['seq']} continues search {delta['search_id']}, which has no tree")
+        if delta["first"] != len(tree):
+          raise ValueError(f"Delta {delta['seq']} of search {delta['search_id']} starts at node {delta['first']}, "
+                           f"expected {len(tree)}")
+
+      if tree is None or delta["reset"]:
+        tree = SearchTree(delta["search_id"], delta["iteration"], delta["root_maximizing"])
+        self.trees.pop(delta["search_id"], None)
+        self.trees[delta["search_id"]] = tree
+        while len(self.trees) > self.max_searches:
+          self.trees.pop(next(iter(self.trees)))
+      self.latest = delta["search_id"]
+      tree.apply_delta(delta)
+
+  def get_tree(self, search_id):
+    return self.trees.get(self.latest if search_id == "latest" else search_id)
+
+  def searches(self):
+    with self.lock:
+      return [tree.summary() for tree in self.trees.values()]
+
+  def node(self, search_id, node):
+    with self.lock:
+      tree = self.get_tree(search_id)
+      if tree is None or not 0 <= node < len(tree):
+        return None
+      return dict(tree.node_info(node), search_id=tree.search_id, tree=tree.summary())
+
+  def children(self, search_id, node, offset=0, limit=50, sort="index"):
+    with self.lock:
+      tree = self.get_tree(search_id)
+      if tree is None or not 0 <= node < len(tree):
+        return None
+      return tree.children_page(node, offset, limit, sort)